@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenAI-compatible server for local load tests
+Answers /v1/chat/completions after a configurable delay, so the API can be
+exercised without network access or paid tokens. With ``"stream": true`` the
+answer is sent as SSE chunks, the first after --first-token-delay and the
+rest every --token-delay seconds:
+
+    python benchmarks/fake_openai_server.py --port 9000 --delay 2.0
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 python -m src.api.main
+"""
+
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Fake OpenAI API")
+app.state.delay = 1.0
+app.state.jitter = 0.0
+app.state.requests = 0
+# Client (host, port) pairs seen; fewer than requests means connections are reused
+app.state.connections = set()
+app.state.first_token_delay = 0.3
+app.state.token_delay = 0.05
+app.state.stream_tokens = 20
+app.state.streams_completed = 0
+app.state.streams_cancelled = 0
+
+
+def stream_chunks(completion_id: str, model: str, content: str):
+    async def chunks():
+        completed = False
+        try:
+            await asyncio.sleep(app.state.first_token_delay)
+            tokens = [f"{content} "] + [f"token{i} " for i in range(app.state.stream_tokens - 1)]
+            for i, token in enumerate(tokens):
+                if i:
+                    await asyncio.sleep(app.state.token_delay)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+            completed = True
+        finally:
+            if completed:
+                app.state.streams_completed += 1
+            else:
+                app.state.streams_cancelled += 1
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.requests += 1
+    if request.client is not None:
+        app.state.connections.add((request.client.host, request.client.port))
+    content = f"Fake answer #{app.state.requests}"
+    if body.get("stream"):
+        return stream_chunks(f"chatcmpl-{uuid.uuid4().hex[:12]}", body.get("model", "gpt-4o-mini"), content)
+
+    await asyncio.sleep(max(0.0, app.state.delay + random.uniform(-app.state.jitter, app.state.jitter)))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "requests": app.state.requests,
+        "connections": len(app.state.connections),
+        "delay": app.state.delay,
+        "jitter": app.state.jitter,
+        "streams_completed": app.state.streams_completed,
+        "streams_cancelled": app.state.streams_cancelled
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds to wait before answering")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Random +/- seconds added to the delay")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="Seconds before the first streamed chunk")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Seconds between streamed chunks")
+    parser.add_argument("--stream-tokens", type=int, default=20, help="Chunks per streamed answer")
+    args = parser.parse_args()
+
+    app.state.delay = args.delay
+    app.state.jitter = args.jitter
+    app.state.first_token_delay = args.first_token_delay
+    app.state.token_delay = args.token_delay
+    app.state.stream_tokens = args.stream_tokens
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
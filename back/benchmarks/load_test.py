@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Event-loop responsiveness load test
+Measures latency of cheap endpoints (/ and /conversations/history) first on
+an idle server, then while /openai/chat is saturated with concurrent calls.
+With blocking work offloaded from the event loop the p99 of the cheap
+endpoints should stay flat between the two phases.
+
+    python benchmarks/fake_openai_server.py --delay 2.0 &
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 python -m src.api.main &
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+PROBE_PATHS = ["/", "/conversations/history?limit=20"]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies) * 1000
+    return {
+        "count": int(values.size),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "max_ms": round(float(values.max()), 2)
+    }
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event, latencies: List[float],
+                interval: float):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(path)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+        await asyncio.sleep(interval)
+
+
+async def saturate(client: httpx.AsyncClient, stop: asyncio.Event, counters: Dict[str, int]):
+    while not stop.is_set():
+        try:
+            response = await client.post("/openai/chat", json={"message": "What is happening in this video?"})
+            counters[str(response.status_code)] = counters.get(str(response.status_code), 0) + 1
+        except httpx.HTTPError as e:
+            counters[type(e).__name__] = counters.get(type(e).__name__, 0) + 1
+
+
+async def run_phase(client: httpx.AsyncClient, duration: float, saturators: int, interval: float):
+    stop = asyncio.Event()
+    latencies = {path: [] for path in PROBE_PATHS}
+    counters: Dict[str, int] = {}
+
+    tasks = [asyncio.create_task(probe(client, path, stop, latencies[path], interval)) for path in PROBE_PATHS]
+    tasks += [asyncio.create_task(saturate(client, stop, counters)) for _ in range(saturators)]
+
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.wait(tasks, timeout=60)
+
+    return {
+        "saturators": saturators,
+        "chat_responses": counters,
+        "endpoints": {path: summarize(values) for path, values in latencies.items()}
+    }
+
+
+async def main(args):
+    headers = {"X-User-ID": args.user_id}
+    limits = httpx.Limits(max_connections=args.saturators + 16)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=120, limits=limits) as client:
+        # Make sure the user exists and has a (fake) key so /openai/chat reaches the model call
+        await client.post("/users/login", json={"user_id": args.user_id, "name": "load-test"})
+        await client.post("/users/openai-key/save", json={"api_key": args.api_key})
+
+        # The first completions pay one-off costs (lazy SDK imports, response model schemas)
+        # on the event loop; keep them out of the measured phases
+        await asyncio.gather(*[
+            client.post("/openai/chat", json={"message": "warm-up"}) for _ in range(args.warmup)
+        ])
+
+        idle = await run_phase(client, args.duration, 0, args.interval)
+        loaded = await run_phase(client, args.duration, args.saturators, args.interval)
+
+    report = {"idle": idle, "saturated": loaded}
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    # Flag a regression if p99 under load grows beyond the allowed factor
+    failed = False
+    for path in PROBE_PATHS:
+        idle_p99 = idle["endpoints"][path].get("p99_ms", 0)
+        loaded_p99 = loaded["endpoints"][path].get("p99_ms", 0)
+        if loaded_p99 > max(idle_p99 * args.max_p99_ratio, args.min_p99_ms):
+            print(f"p99 of {path} degraded: {idle_p99} ms idle -> {loaded_p99} ms saturated", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check event-loop latency while /openai/chat is saturated")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--user-id", default="load_test_user")
+    parser.add_argument("--api-key", default="sk-fake-load-test")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per phase")
+    parser.add_argument("--saturators", type=int, default=64, help="Concurrent /openai/chat callers")
+    parser.add_argument("--interval", type=float, default=0.05, help="Pause between probe requests")
+    parser.add_argument("--warmup", type=int, default=4, help="/openai/chat calls before measuring")
+    parser.add_argument("--max-p99-ratio", type=float, default=3.0)
+    parser.add_argument("--min-p99-ms", type=float, default=50.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+
+    sys.exit(asyncio.run(main(parser.parse_args())))
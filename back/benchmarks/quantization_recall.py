@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Quantized index recall report
+Compares int8 and binary QuantizedIndex search against the exact full scan
+that MultimodalRetriever.search falls back to (``exact=True``): recall@k of
+the code ranking alone, recall@k after rescoring the candidates with the
+full-precision vectors, memory per vector and query latency.
+
+    python benchmarks/quantization_recall.py --collection multimodal_documents --field image_embedding
+    python benchmarks/quantization_recall.py --collection user_conversations --field combined_embedding
+    python benchmarks/quantization_recall.py --synthetic 100000 --dim 512 --output recall.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.config import settings
+from src.utils.quantization import QUANTIZATION_MODES
+from src.utils.scoring import normalize_rows, top_k_indices
+from src.utils.vector_index import QuantizedIndex
+
+
+def load_vectors(collection_name: str, field: str, limit: int) -> np.ndarray:
+    from src.database.mongodb_client import MongoDBClient
+    from src.database.queries import fetch_embeddings
+    from src.utils.scoring import stack_embeddings
+
+    db_client = MongoDBClient()
+    if not db_client.connect():
+        raise SystemExit("Failed to connect to MongoDB")
+    try:
+        collection = db_client.get_collection(collection_name)
+        _, embeddings = fetch_embeddings(collection, {}, field)
+    finally:
+        db_client.close()
+    matrix, _ = stack_embeddings(embeddings[:limit] if limit else embeddings)
+    return matrix
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    # Clustered like real embeddings rather than uniform on the sphere
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, count)
+    return centers[assignment] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def recall(expected: List[np.ndarray], found: List[List[int]], k: int) -> float:
+    hits = sum(len(set(exact[:k].tolist()) & set(result[:k])) for exact, result in zip(expected, found))
+    return round(hits / (k * len(expected)), 4)
+
+
+def evaluate(vectors: np.ndarray, queries: np.ndarray, k: int) -> Dict[str, Any]:
+    vectors = normalize_rows(vectors)
+    ids = [str(i) for i in range(len(vectors))]
+    candidate_k = max(k * settings.VECTOR_INDEX_CANDIDATE_FACTOR, settings.VECTOR_INDEX_MIN_CANDIDATES)
+
+    started = time.perf_counter()
+    expected = [top_k_indices(vectors @ query, k) for query in normalize_rows(queries)]
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    report = {
+        "vectors": len(vectors),
+        "dim": vectors.shape[1],
+        "queries": len(queries),
+        "k": k,
+        "float32": {"bytes_per_vector": vectors.shape[1] * 4, "query_ms": round(exact_ms, 3)}
+    }
+    for mode in QUANTIZATION_MODES:
+        index = QuantizedIndex(vectors.shape[1], mode)
+        index.add(ids, vectors)
+
+        approximate, rescored = [], []
+        started = time.perf_counter()
+        for query in queries:
+            candidates, _ = index.search(query, candidate_k * index.oversample)
+            positions = np.asarray([int(doc_id) for doc_id in candidates], dtype=np.int64)
+            approximate.append(positions[:k].tolist())
+            # Same rescoring the retriever does with the vectors fetched from MongoDB
+            exact_scores = vectors[positions] @ normalize_rows(query)[0]
+            rescored.append(positions[top_k_indices(exact_scores, k)].tolist())
+        query_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        report[mode] = {
+            "bytes_per_vector": round(index.nbytes / len(index), 2),
+            "compression": round(vectors.shape[1] * 4 / (index.nbytes / len(index)), 1),
+            "candidates": candidate_k * index.oversample,
+            f"recall@{k}_codes_only": recall(expected, approximate, k),
+            f"recall@{k}_rescored": recall(expected, rescored, k),
+            "query_ms": round(query_ms, 3)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and memory of int8 / binary quantized vector indexes")
+    parser.add_argument("--collection", default="multimodal_documents")
+    parser.add_argument("--field", default="image_embedding")
+    parser.add_argument("--limit", type=int, default=0, help="Use at most this many stored vectors")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random clustered vectors instead of MongoDB")
+    parser.add_argument("--dim", type=int, default=512, help="Dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.3,
+                        help="Gaussian noise added to sampled vectors so queries are not exact copies")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+    else:
+        vectors = load_vectors(args.collection, args.field, args.limit)
+    if len(vectors) == 0:
+        raise SystemExit("No vectors to evaluate")
+
+    rng = np.random.default_rng(1)
+    sample = normalize_rows(vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)])
+    queries = sample + args.noise * rng.standard_normal(sample.shape).astype(np.float32) / np.sqrt(sample.shape[1])
+
+    report = evaluate(vectors, queries, args.k)
+    report["source"] = "synthetic" if args.synthetic else f"{args.collection}.{args.field}"
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
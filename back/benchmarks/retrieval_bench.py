@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Retrieval, conversation-search and ingest benchmark
+Seeds a synthetic corpus (clustered 1024-d text and 512-d CLIP-sized
+embeddings, like bge-m3 and CLIP ViT-B/32) and measures the hot paths:
+MultimodalRetriever.search (text and image), hybrid_search,
+POST /conversations/search, DataIngestion.batch_ingest_texts and embedding
+throughput. Reports p50/p95/p99 latency, QPS, process memory and recall@k
+against the exact scan as JSON; --baseline compares with an earlier report
+and exits with 1 on regressions.
+
+Models are replaced by deterministic stub encoders so it runs on CPU-only
+machines without model downloads (--real-models uses the real ones).
+MongoDB is an in-process mongomock unless --backend mongod; mongomock keeps
+everything in Python objects, so use a local mongod for the 1m corpus.
+
+    python benchmarks/retrieval_bench.py --size 10k --output bench_10k.json
+    python benchmarks/retrieval_bench.py --size 100k --backend mongod --reuse --baseline bench_100k.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import asyncio
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+from PIL import Image
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from load_test import summarize
+from src.config import settings
+from src.database import mongodb_client
+from src.database.embedding_codec import encode_document_embeddings, encode_embedding
+from src.database.queries import fetch_embeddings
+from src.database.schemas import SearchQuery
+from src.models.embeddings import MultimodalEmbedder
+from src.utils.scoring import normalize_rows, rank_embeddings
+
+logger = logging.getLogger("benchmark")
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+TEXT_DIM = 1024
+CLIP_DIM = 512
+SUITES = ("retrieval", "hybrid", "conversations", "embedding", "ingest")
+TOPIC_PATTERN = re.compile(r"^topic (\d+)\b")
+
+
+class SyntheticCorpus:
+    """Documents and queries drawn around shared topic centroids, so nearest
+    neighbours are meaningful and recall against the exact scan is informative.
+
+    Text is "topic <n> ..." and images are tiny solid images whose colour
+    encodes the topic; the stub encoders map both back to the topic centroid
+    plus deterministic per-item noise.
+    """
+
+    def __init__(self, topics: int = 256, noise: float = 0.8, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.topics = topics
+        self.noise = noise
+        self.text_centers = normalize_rows(rng.standard_normal((topics, TEXT_DIM)))
+        self.clip_centers = normalize_rows(rng.standard_normal((topics, CLIP_DIM)))
+
+    def _vector(self, centers: np.ndarray, topic: int, key: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(key.encode()))
+        dim = centers.shape[1]
+        vector = centers[topic % self.topics] + self.noise * rng.standard_normal(dim) / np.sqrt(dim)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def text_topic(self, text: str) -> int:
+        match = TOPIC_PATTERN.match(text)
+        return int(match.group(1)) if match else zlib.crc32(text.encode()) % self.topics
+
+    def text_vector(self, text: str) -> np.ndarray:
+        return self._vector(self.text_centers, self.text_topic(text), text)
+
+    def clip_text_vector(self, text: str) -> np.ndarray:
+        return self._vector(self.clip_centers, self.text_topic(text), "clip:" + text)
+
+    @staticmethod
+    def image(topic: int, variant: int) -> Image.Image:
+        return Image.new("RGB", (8, 8), (topic % 256, topic // 256 % 256, variant % 256))
+
+    def image_vector(self, image) -> np.ndarray:
+        if isinstance(image, str):
+            image = Image.open(image)
+        red, green, blue = image.convert("RGB").getpixel((0, 0))
+        return self._vector(self.clip_centers, red + 256 * green, f"image:{red}:{green}:{blue}")
+
+    def documents(self, start: int, count: int, rng: np.random.Generator):
+        """60% text, 25% frame (image only) and 15% multimodal documents"""
+        now = datetime.utcnow()
+        for i in range(start, start + count):
+            topic = int(rng.integers(self.topics))
+            kind = rng.random()
+            text = f"topic {topic} document {i}"
+            doc = {
+                "metadata": {"topic": topic, "year": 2000 + i % 25, "source": f"source_{i % 7}"},
+                "created_at": now,
+                "updated_at": now
+            }
+            if kind < 0.6:
+                doc.update(content_type="text", text_content=text, text_embedding=self.text_vector(text).tolist())
+            elif kind < 0.85:
+                image = self.image(topic, i)
+                doc.update(content_type="frame", image_embedding=self.image_vector(image).tolist())
+            else:
+                image_vector = self.image_vector(self.image(topic, i))
+                text_vector = self.clip_text_vector(text)
+                multimodal = image_vector + text_vector
+                doc.update(
+                    content_type="multimodal",
+                    text_content=text,
+                    text_embedding=self.text_vector(text).tolist(),
+                    image_embedding=image_vector.tolist(),
+                    multimodal_embedding=(multimodal / np.linalg.norm(multimodal)).tolist()
+                )
+            yield encode_document_embeddings(doc)
+
+
+def install_stub_models(corpus: SyntheticCorpus, latency_ms: float) -> MultimodalEmbedder:
+    """Swap the encoders of the shared embedder for the corpus' stub encoders.
+
+    Everything around the encoders (validation, query cache, scheduler) stays
+    real; ``latency_ms`` per batch stands in for model time.
+    """
+    embedder = MultimodalEmbedder()
+
+    def pause():
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    def encode_texts(texts: List[str]) -> np.ndarray:
+        pause()
+        return np.stack([corpus.text_vector(text) for text in texts])
+
+    def encode_images(images: List[Any]) -> np.ndarray:
+        pause()
+        return np.stack([corpus.image_vector(image) for image in images])
+
+    def embed_multimodal_components(texts, images) -> Dict[str, np.ndarray]:
+        texts = [texts] if isinstance(texts, str) else texts
+        images = [images] if isinstance(images, (str, Image.Image)) else images
+        pause()
+        image_embeds = np.stack([corpus.image_vector(image) for image in images])
+        text_embeds = np.stack([corpus.clip_text_vector(text) for text in texts])
+        return {"image": image_embeds, "text": text_embeds, "multimodal": normalize_rows(image_embeds + text_embeds)}
+
+    embedder._encode_texts = encode_texts
+    embedder._encode_images = encode_images
+    embedder.embed_multimodal_components = embed_multimodal_components
+    return embedder
+
+
+def configure_backend(args):
+    settings.MONGODB_DB_NAME = args.db_name
+    # Benchmark queries must reach the encoders, not a cache file from an earlier run
+    settings.EMBEDDING_CACHE_PERSIST = False
+    if args.backend == "mock":
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("--backend mock needs mongomock (pip install mongomock)")
+        client = mongomock.MongoClient()
+        mongodb_client.MongoClient = lambda *a, **k: client
+    else:
+        settings.MONGODB_URI = args.mongodb_uri
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError):
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def timed(func: Callable, inputs: Sequence[Any], warmup: int = 3) -> Dict[str, Any]:
+    for item in inputs[:warmup]:
+        func(item)
+    latencies = []
+    results = []
+    started = time.perf_counter()
+    for item in inputs:
+        call_started = time.perf_counter()
+        results.append(func(item))
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    return {"latency": summarize(latencies), "qps": round(len(inputs) / elapsed, 1), "results": results}
+
+
+def recall_at_k(expected: List[List[Any]], found: List[List[Any]]) -> float:
+    hits = sum(len(set(e) & set(f)) for e, f in zip(expected, found))
+    total = sum(len(e) for e in expected)
+    return round(hits / total, 4) if total else 1.0
+
+
+def seed_documents(collection, corpus: SyntheticCorpus, size: int, batch_size: int = 5000):
+    rng = np.random.default_rng(1)
+    for start in range(0, size, batch_size):
+        collection.insert_many(list(corpus.documents(start, min(batch_size, size - start), rng)), ordered=False)
+        logger.info(f"Seeded {min(start + batch_size, size)}/{size} documents")
+
+
+def seed_conversations(collection, corpus: SyntheticCorpus, count: int, users: int, batch_size: int = 5000):
+    rng = np.random.default_rng(2)
+    now = datetime.utcnow()
+    batch = []
+    for i in range(count):
+        topic = int(rng.integers(corpus.topics))
+        question, answer = f"topic {topic} question {i}", f"answer {i}"
+        batch.append({
+            "user_id": f"bench_user_{i % users}",
+            "conversation_id": f"conv_bench_{i}",
+            "question": question,
+            "answer": answer,
+            "combined_embedding": encode_embedding(corpus.text_vector(f"{question} {answer}").tolist()),
+            "video_id": None,
+            "timestamp": float(i),
+            "created_at": now
+        })
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    logger.info(f"Seeded {count} conversations for {users} users")
+
+
+def text_queries(corpus: SyntheticCorpus, count: int, seed: int = 3) -> List[str]:
+    # Every query string is new, so the query embedding cache never answers
+    rng = np.random.default_rng(seed)
+    return [f"topic {int(rng.integers(corpus.topics))} query {i} {seed}" for i in range(count)]
+
+
+def image_queries(corpus: SyntheticCorpus, count: int) -> List[Image.Image]:
+    rng = np.random.default_rng(4)
+    return [corpus.image(int(rng.integers(corpus.topics)), 255 - i % 200) for i in range(count)]
+
+
+def run_retrieval(retriever, corpus: SyntheticCorpus, args) -> Dict[str, Any]:
+    report = {}
+    for field in ("text_embedding", "image_embedding"):
+        started = time.perf_counter()
+        index = retriever.index_registry.get_index(field, retriever.collection)
+        report[f"{field}_index_build_s"] = round(time.perf_counter() - started, 2)
+        report[f"{field}_index_bytes"] = index.nbytes if index is not None else 0
+
+    def ids(results):
+        return [result.document.id for result in results]
+
+    texts = text_queries(corpus, args.queries)
+    exact = timed(lambda q: ids(retriever.search(SearchQuery(query_text=q, top_k=args.k, exact=True))), texts)
+    indexed = timed(lambda q: ids(retriever.search(SearchQuery(query_text=q, top_k=args.k))), texts)
+    report["text"] = {
+        "latency": indexed["latency"], "qps": indexed["qps"],
+        f"recall@{args.k}": recall_at_k(exact["results"], indexed["results"]),
+        "exact_latency": exact["latency"], "exact_qps": exact["qps"]
+    }
+
+    images = image_queries(corpus, args.queries)
+    exact = timed(lambda image: ids(retriever.search(SearchQuery(top_k=args.k, exact=True), image)), images)
+    indexed = timed(lambda image: ids(retriever.search(SearchQuery(top_k=args.k), image)), images)
+    report["image"] = {
+        "latency": indexed["latency"], "qps": indexed["qps"],
+        f"recall@{args.k}": recall_at_k(exact["results"], indexed["results"]),
+        "exact_latency": exact["latency"], "exact_qps": exact["qps"]
+    }
+    return report
+
+
+def run_hybrid(retriever, corpus: SyntheticCorpus, args) -> Dict[str, Any]:
+    pairs = list(zip(text_queries(corpus, args.queries, seed=5), image_queries(corpus, args.queries)))
+    result = timed(lambda pair: retriever.hybrid_search(pair[0], pair[1], 0.5, args.k), pairs)
+    return {"latency": result["latency"], "qps": result["qps"]}
+
+
+def run_conversations(corpus: SyntheticCorpus, args) -> Dict[str, Any]:
+    import httpx
+    import src.api.main as main
+
+    main.create_conversation_indexes()
+    collection = main.user_conversations_collection
+    queries = text_queries(corpus, args.queries, seed=6)
+    users = [f"bench_user_{i % args.users}" for i in range(len(queries))]
+
+    async def search_all():
+        transport = httpx.ASGITransport(app=main.app)
+        cold, warm, found = [], [], []
+        seen = set()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for query, user_id in zip(queries, users):
+                started = time.perf_counter()
+                response = await client.post(
+                    "/conversations/search", json={"query": query, "top_k": args.k}, headers={"X-User-ID": user_id}
+                )
+                elapsed = time.perf_counter() - started
+                response.raise_for_status()
+                (warm if user_id in seen else cold).append(elapsed)
+                seen.add(user_id)
+                found.append([item["conversation_id"] for item in response.json()["results"]])
+        return cold, warm, found
+
+    started = time.perf_counter()
+    cold, warm, found = asyncio.run(search_all())
+    elapsed = time.perf_counter() - started
+
+    # Exact answers: every conversation of the user scored with the same 0.4 threshold
+    expected = []
+    for query, user_id in zip(queries, users):
+        doc_ids, embeddings = fetch_embeddings(collection, {"user_id": user_id}, "combined_embedding")
+        ranked = rank_embeddings(corpus.text_vector(query), embeddings, args.k, threshold=0.4)
+        conversation_ids = {
+            doc["_id"]: doc["conversation_id"]
+            for doc in collection.find({"_id": {"$in": [doc_ids[p] for p, _ in ranked]}}, {"conversation_id": 1})
+        }
+        expected.append([conversation_ids[doc_ids[p]] for p, _ in ranked])
+
+    if main.embedding_scheduler is not None:
+        main.embedding_scheduler.stop()
+    return {
+        "cold_latency": summarize(cold),
+        "latency": summarize(warm),
+        "qps": round(len(queries) / elapsed, 1),
+        f"recall@{args.k}": recall_at_k(expected, found),
+        "cache": main.conversation_cache.stats()
+    }
+
+
+def run_embedding(embedder: MultimodalEmbedder, corpus: SyntheticCorpus, args) -> Dict[str, Any]:
+    report = {}
+    for batch_size in (1, 32):
+        texts = text_queries(corpus, batch_size * 20, seed=7 + batch_size)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        result = timed(lambda batch: embedder.embed_text(batch, use_cache=False), batches, warmup=1)
+        report[f"text_batch_{batch_size}"] = {
+            "latency": result["latency"], "items_per_s": round(result["qps"] * batch_size, 1)
+        }
+        images = image_queries(corpus, batch_size * 20)
+        batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+        result = timed(lambda batch: embedder.embed_image(batch, use_cache=False), batches, warmup=1)
+        report[f"image_batch_{batch_size}"] = {
+            "latency": result["latency"], "items_per_s": round(result["qps"] * batch_size, 1)
+        }
+    return report
+
+
+def run_ingest(ingestion, corpus: SyntheticCorpus, args) -> Dict[str, Any]:
+    texts = text_queries(corpus, args.ingest_docs, seed=9)
+    batches = [texts[i:i + args.ingest_batch] for i in range(0, len(texts), args.ingest_batch)]
+    metadata = [{"benchmark": "ingest"}] * args.ingest_batch
+    result = timed(lambda batch: ingestion.batch_ingest_texts(batch, metadata[:len(batch)]), batches, warmup=0)
+    ingestion.collection.delete_many({"metadata.benchmark": "ingest"})
+    return {"batch_size": args.ingest_batch, "latency": result["latency"], "docs_per_s": round(result["qps"] * args.ingest_batch, 1)}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_ratio: float, path: str = "") -> List[str]:
+    """Regressions of p95 latency, throughput and recall between two reports"""
+    regressions = []
+    for key, value in report.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        name = f"{path}.{key}" if path else key
+        if old is None:
+            continue
+        if isinstance(value, dict):
+            regressions += compare(value, old, max_ratio, name)
+        elif key == "p95_ms" and value > old * max_ratio:
+            regressions.append(f"{name}: {old} -> {value}")
+        elif key in ("qps", "items_per_s", "docs_per_s") and value < old / max_ratio:
+            regressions.append(f"{name}: {old} -> {value}")
+        elif key.startswith("recall@") and value < old - 0.02:
+            regressions.append(f"{name}: {old} -> {value}")
+    return regressions
+
+
+def main(args) -> int:
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    configure_backend(args)
+
+    size = SIZES.get(args.size.lower()) or int(args.size)
+    suites = args.suites.split(",") if args.suites else list(SUITES)
+    corpus = SyntheticCorpus(topics=args.topics)
+    embedder = MultimodalEmbedder() if args.real_models else install_stub_models(corpus, args.model_latency_ms)
+
+    from src.utils.data_ingestion import DataIngestion
+    from src.utils.retrieval import MultimodalRetriever
+
+    memory = {"start_mb": rss_mb()}
+    ingestion = DataIngestion()
+    documents = ingestion.collection
+    conversations = ingestion.db_client.get_collection("user_conversations")
+    conversation_count = args.conversations or min(size, 50_000)
+    if not (args.reuse and documents.estimated_document_count() == size):
+        documents.delete_many({})
+        started = time.perf_counter()
+        seed_documents(documents, corpus, size)
+        memory["seed_documents_s"] = round(time.perf_counter() - started, 1)
+    if not (args.reuse and conversations.estimated_document_count() == conversation_count):
+        conversations.delete_many({})
+        seed_conversations(conversations, corpus, conversation_count, args.users)
+    memory["after_seed_mb"] = rss_mb()
+
+    retriever = MultimodalRetriever(embedder=embedder)
+    report: Dict[str, Any] = {
+        "config": {
+            "size": size, "conversations": conversation_count, "users": args.users, "backend": args.backend,
+            "models": "real" if args.real_models else "stub", "queries": args.queries, "k": args.k,
+            "vector_index": settings.VECTOR_INDEX_TYPE, "quantization": settings.VECTOR_INDEX_QUANTIZATION
+        },
+        "suites": {}
+    }
+    runners = {
+        "retrieval": lambda: run_retrieval(retriever, corpus, args),
+        "hybrid": lambda: run_hybrid(retriever, corpus, args),
+        "conversations": lambda: run_conversations(corpus, args),
+        "embedding": lambda: run_embedding(embedder, corpus, args),
+        "ingest": lambda: run_ingest(ingestion, corpus, args)
+    }
+    for suite in SUITES:
+        if suite not in suites:
+            continue
+        logger.info(f"Running {suite} benchmark")
+        report["suites"][suite] = runners[suite]()
+        memory[f"after_{suite}_mb"] = rss_mb()
+    report["memory"] = memory
+
+    print(json.dumps(report, indent=2, default=str))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, default=str))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report["suites"], baseline.get("suites", {}), args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark retrieval, conversation search and ingestion")
+    parser.add_argument("--size", default="10k", help="Corpus size: 10k, 100k, 1m or a number of documents")
+    parser.add_argument("--conversations", type=int, default=0, help="Seeded conversations (default min(size, 50000))")
+    parser.add_argument("--users", type=int, default=10, help="Users the conversations are spread over")
+    parser.add_argument("--topics", type=int, default=256, help="Topic clusters in the synthetic corpus")
+    parser.add_argument("--suites", help=f"Comma-separated subset of {','.join(SUITES)}")
+    parser.add_argument("--queries", type=int, default=200, help="Measured queries per suite")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ingest-docs", type=int, default=2048)
+    parser.add_argument("--ingest-batch", type=int, default=64)
+    parser.add_argument("--backend", choices=("mock", "mongod"), default="mock")
+    parser.add_argument("--mongodb-uri", default="mongodb://localhost:27017/?directConnection=true")
+    parser.add_argument("--db-name", default="multimodal_rag_bench", help="Database the corpus is written to")
+    parser.add_argument("--reuse", action="store_true", help="Keep an already seeded corpus of the same size (mongod)")
+    parser.add_argument("--real-models", action="store_true", help="Use CLIP/bge-m3 instead of stub encoders")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated time per stub encoder batch")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="Allowed p95 growth / throughput drop factor before failing")
+
+    sys.exit(main(parser.parse_args()))
@@ -5,21 +5,43 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Query
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List
 from pydantic import BaseModel
-import shutil
+import uuid
+import asyncio
 import logging
+import threading
 import json
+import math
 from datetime import datetime
 
 from src.database.schemas import SearchQuery, ContentType, VideoInfo, FrameData, ChatData, ConversationSearchRequest, ChatRoomData, ConversationSearchResult, User, UserRegistrationRequest, UserLoginRequest, OpenAIKeyRequest, OpenAIKeyTestRequest
 from src.utils.data_ingestion import DataIngestion
+from src.utils.bulk_ingestion import iter_ndjson
+from src.utils.video_ingestion import VideoIngestion
+from src.utils.jobs import JobQueue, JOB_STATUSES
+from src.utils.job_handlers import register_default_handlers
 from src.utils.retrieval import MultimodalRetriever
-from src.utils.conversation_manager import ConversationManager
+from src.utils.vector_index import VectorIndexRegistry
+from src.utils.filter_planner import build_metadata_query
+from src.utils.conversation_cache import ConversationEmbeddingCache
+from src.utils.temporal_index import TemporalIndexCache
+from src.utils.blob_store import BlobStore
+from src.utils.chat_messages import ChatMessageStore, ChatRoomMigrating
+from src.utils.answer_cache import SemanticAnswerCache
+from src.utils.vision_frames import FramePreprocessor, PreparedFrame
+from src.utils.openai_clients import OpenAIClientPool, UserRecordCache
+from src.utils import uploads
+from src.utils.uploads import UploadTooLarge
+from src.models.embeddings import MultimodalEmbedder
+from src.models.embedding_scheduler import EmbeddingScheduler
+from src.database.queries import fetch_embeddings, fetch_documents_by_ids, EXCLUDE_EMBEDDINGS
+from src.database.embedding_codec import encode_embedding
+from src.utils.executors import run_inference, run_io, inference_executor, io_executor, ExecutorBusyError
 from src.config import settings
 
 # Configure logging to use back/data/logs directory
@@ -57,17 +79,25 @@ async def extract_user_id(request: Request, call_next):
     response = await call_next(request)
     return response
 
-ingestion_service = DataIngestion()
-retrieval_service = MultimodalRetriever()
-conversation_manager = ConversationManager()
+# Cheap to construct: models load on first use or in the startup warm-up
+embedder = MultimodalEmbedder()
+embedding_scheduler = EmbeddingScheduler(embedder=embedder) if settings.EMBEDDING_BATCHING_ENABLED else None
 
-from src.database.mongodb_client import MongoDBClient
+from src.database.mongodb_client import MongoDBClient, get_pool_stats
 db_client = MongoDBClient()
-db_client.connect()
+db_client.connect(verify=False)
 users_collection = db_client.get_collection("users")
 user_conversations_collection = db_client.get_collection("user_conversations")
 user_chat_rooms_collection = db_client.get_collection("user_chat_rooms")
 
+conversation_cache = ConversationEmbeddingCache()
+blob_store = BlobStore()
+chat_messages = ChatMessageStore()
+answer_cache = SemanticAnswerCache()
+frame_preprocessor = FramePreprocessor()
+openai_clients = OpenAIClientPool()
+user_records = UserRecordCache(users_collection)
+
 UPLOAD_DIR = settings.UPLOADS_DIR
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -90,12 +120,79 @@ class ChatRoomSaveRequest(BaseModel):
     room_id: str
     name: str
     messages: List[Dict[str, Any]]
+    # seq of messages[0]: clients send only the messages added since their last save.
+    # Without it, messages is the whole room and only the unsaved tail is stored
+    base_seq: Optional[int] = None
     captured_frame: Optional[str] = None
     frame_time: Optional[str] = None
     video_current_time: Optional[float] = None
     video_id: Optional[str] = None
 
 
+# Services that connect to MongoDB and create indexes are built on first use
+_services: Dict[str, Any] = {}
+_services_lock = threading.Lock()
+warmup_state: Dict[str, Any] = {"started": False, "finished": False, "error": None}
+
+
+def _create_service(name: str):
+    with _services_lock:
+        if name not in _services:
+            if name == "ingestion":
+                _services[name] = DataIngestion()
+            elif name == "video":
+                _services[name] = VideoIngestion(embedder=embedder)
+            else:
+                _services[name] = MultimodalRetriever(embedder=embedding_scheduler or embedder)
+        return _services[name]
+
+
+async def get_ingestion_service() -> DataIngestion:
+    return _services.get("ingestion") or await run_blocking(_create_service, "ingestion")
+
+
+async def get_retrieval_service() -> MultimodalRetriever:
+    return _services.get("retrieval") or await run_blocking(_create_service, "retrieval")
+
+
+async def get_video_service() -> VideoIngestion:
+    return _services.get("video") or await run_blocking(_create_service, "video")
+
+
+# Long-running ingestion runs as persistent jobs; workers use the same lazy services
+job_queue = JobQueue()
+register_default_handlers(job_queue, _create_service)
+
+
+def job_accepted(job_id: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+    )
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    job["_id"] = str(job["_id"])
+    for field in ("created_at", "started_at", "finished_at", "heartbeat_at"):
+        if job.get(field) is not None:
+            job[field] = job[field].isoformat()
+    return job
+
+
+def warm_up():
+    warmup_state["started"] = True
+    try:
+        _create_service("ingestion")
+        _create_service("retrieval")
+        embedder.load(settings.MODEL_WARMUP_MODELS)
+        warmup_state["error"] = None
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}")
+        warmup_state["error"] = str(e)
+    finally:
+        warmup_state["finished"] = True
+
+
 def get_user_id_from_request(request: Request) -> str:
     user_id = request.state.user_id
     if not user_id:
@@ -103,17 +200,223 @@ def get_user_id_from_request(request: Request) -> str:
     return user_id
 
 
+async def run_blocking(func, *args, **kwargs):
+    try:
+        return await run_io(func, *args, **kwargs)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def run_model(func, *args, **kwargs):
+    try:
+        return await run_inference(func, *args, **kwargs)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def store_upload(file: UploadFile) -> str:
+    """Move an uploaded image into the blob store; returns its SHA-256 digest"""
+    try:
+        uploads.check_upload_size(file, settings.MAX_IMAGE_UPLOAD_BYTES)
+        return await run_blocking(blob_store.put_stream, file.file, file.content_type, settings.MAX_IMAGE_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+async def read_image_upload(file: UploadFile):
+    """Decode a query image in memory; nothing is written to disk"""
+    try:
+        data = await uploads.read_upload(file, settings.MAX_IMAGE_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        return await run_blocking(uploads.decode_image, data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+
+
+async def save_video_upload(file: UploadFile, path: Path):
+    try:
+        await run_blocking(uploads.copy_upload, file, path, settings.MAX_VIDEO_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+async def embed_text(texts):
+    if embedding_scheduler is not None:
+        return await embedding_scheduler.embed_text_async(texts)
+    return await run_model(embedder.embed_text, texts)
+
+
+def load_user_conversation_embeddings(user_id: str):
+    return fetch_embeddings(user_conversations_collection, {"user_id": user_id}, "combined_embedding")
+
+
+def load_conversation_vectors(doc_ids: List[Any]):
+    # Full-precision rescoring of candidates from a quantized conversation cache
+    return fetch_embeddings(user_conversations_collection, {"_id": {"$in": doc_ids}}, "combined_embedding")
+
+
+def load_conversation_timeline(key):
+    # Served by the (user_id, video_id, timestamp) index
+    user_id, video_id = key
+    conversations = user_conversations_collection.find(
+        {"user_id": user_id, "video_id": video_id}, {"_id": 1, "timestamp": 1}
+    ).sort("timestamp", 1)
+    ids, timestamps = [], []
+    for conv in conversations:
+        ids.append(conv["_id"])
+        timestamps.append(float(conv.get("timestamp", 0.0)))
+    return ids, timestamps, None
+
+
+# Per (user_id, video_id) sorted timestamps for time-window lookups
+conversation_timelines = TemporalIndexCache(load_conversation_timeline)
+
+
+def create_conversation_indexes():
+    user_conversations_collection.create_index([("user_id", 1), ("video_id", 1), ("timestamp", 1)])
+    chat_messages.create_indexes()
+
+
 @app.get("/")
 async def root():
     return {"message": "Multimodal MongoDB RAG API", "status": "active"}
 
 
+@app.get("/ready")
+async def readiness():
+    models = {name: embedder.is_loaded(name) for name in settings.MODEL_WARMUP_MODELS}
+    services = {name: name in _services for name in ("ingestion", "retrieval")}
+    ready = all(models.values()) and all(services.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "model_loading": settings.MODEL_LOADING,
+            "models": models,
+            "services": services,
+            "load_seconds": embedder.load_seconds,
+            "warmup_error": warmup_state["error"]
+        }
+    )
+
+
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        await run_blocking(create_conversation_indexes)
+    except Exception as e:
+        logger.error(f"Failed to create conversation indexes: {e}")
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    try:
+        await run_blocking(job_queue.start)
+    except Exception as e:
+        logger.error(f"Failed to start job workers: {e}")
+
+
+_upload_cleanup_task: Optional[asyncio.Task] = None
+
+
+async def cleanup_uploads_periodically():
+    while True:
+        try:
+            await run_blocking(uploads.cleanup_stale_uploads)
+        except Exception as e:
+            logger.warning(f"Upload cleanup failed: {e}")
+        await asyncio.sleep(settings.UPLOAD_CLEANUP_INTERVAL_SECONDS)
+
+
+@app.on_event("startup")
+async def start_upload_cleanup():
+    global _upload_cleanup_task
+    _upload_cleanup_task = asyncio.create_task(cleanup_uploads_periodically())
+
+
+@app.on_event("startup")
+async def start_model_warmup():
+    if settings.MODEL_LOADING == "lazy":
+        return
+    warmup = asyncio.get_running_loop().run_in_executor(None, warm_up)
+    if settings.MODEL_LOADING == "eager":
+        await warmup
+
+
+@app.get("/metrics/embeddings")
+async def embedding_metrics():
+    return {
+        "batching_enabled": embedding_scheduler is not None,
+        "scheduler": embedding_scheduler.stats() if embedding_scheduler is not None else None,
+        "conversation_cache": conversation_cache.stats(),
+        "vector_indexes": VectorIndexRegistry().stats(),
+        "conversation_timelines": conversation_timelines.stats(),
+        "query_embedding_cache": embedder.cache.stats() if embedder.cache is not None else None
+    }
+
+
+@app.get("/metrics/search")
+async def search_metrics():
+    retrieval_service = await get_retrieval_service()
+    return {"filters": retrieval_service.filter_planner.stats()}
+
+
+@app.get("/metrics/chat")
+async def chat_metrics():
+    return {
+        "answer_cache": answer_cache.stats(),
+        "vision_frames": frame_preprocessor.stats(),
+        "openai_clients": openai_clients.stats(),
+        "user_cache": user_records.stats()
+    }
+
+
+@app.get("/metrics/executors")
+async def executor_metrics():
+    return {
+        "inference": inference_executor.stats(),
+        "io": io_executor.stats()
+    }
+
+
+@app.get("/metrics/blobs")
+async def blob_metrics():
+    return await run_blocking(blob_store.stats)
+
+
+@app.get("/metrics/jobs")
+async def job_metrics():
+    return await run_blocking(job_queue.stats)
+
+
+@app.get("/metrics/mongodb")
+async def mongodb_metrics():
+    return get_pool_stats()
+
+
+@app.on_event("shutdown")
+async def shutdown_embedding_scheduler():
+    if embedding_scheduler is not None:
+        embedding_scheduler.stop()
+    embedder.save_cache()
+    await openai_clients.aclose()
+    inference_executor.shutdown(wait=False)
+    io_executor.shutdown(wait=False)
+    job_queue.stop()
+    if _upload_cleanup_task is not None:
+        _upload_cleanup_task.cancel()
+
+
 # User Management Endpoints
 @app.post("/users/register")
 async def register_user(request: UserRegistrationRequest):
     try:
         # Check if user already exists
-        existing_user = users_collection.find_one({"user_id": request.user_id})
+        existing_user = await run_blocking(users_collection.find_one, {"user_id": request.user_id})
         if existing_user:
             return {"message": "User already exists", "user_id": request.user_id, "status": "exists"}
         
@@ -131,13 +434,15 @@ async def register_user(request: UserRegistrationRequest):
             "updated_at": datetime.utcnow()
         }
         
-        result = users_collection.insert_one(user_data)
+        result = await run_blocking(users_collection.insert_one, user_data)
         return {
             "message": "User registered successfully",
             "user_id": request.user_id,
             "document_id": str(result.inserted_id),
             "status": "created"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error registering user: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -147,7 +452,7 @@ async def register_user(request: UserRegistrationRequest):
 async def login_user(request: UserLoginRequest):
     try:
         # Find or create user
-        user = users_collection.find_one({"user_id": request.user_id})
+        user = await run_blocking(users_collection.find_one, {"user_id": request.user_id})
         
         if not user:
             # Auto-register user on first login
@@ -163,11 +468,12 @@ async def login_user(request: UserLoginRequest):
                 "last_login": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             }
-            result = users_collection.insert_one(user_data)
-            user = users_collection.find_one({"_id": result.inserted_id})
+            result = await run_blocking(users_collection.insert_one, user_data)
+            user = await run_blocking(users_collection.find_one, {"_id": result.inserted_id})
         else:
             # Update last login
-            users_collection.update_one(
+            await run_blocking(
+                users_collection.update_one,
                 {"user_id": request.user_id},
                 {"$set": {"last_login": datetime.utcnow(), "updated_at": datetime.utcnow()}}
             )
@@ -184,6 +490,8 @@ async def login_user(request: UserLoginRequest):
             },
             "status": "success"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error during login: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -193,7 +501,7 @@ async def login_user(request: UserLoginRequest):
 async def get_user_profile(request: Request):
     try:
         user_id = get_user_id_from_request(request)
-        user = users_collection.find_one({"user_id": user_id})
+        user = await run_blocking(users_collection.find_one, {"user_id": user_id})
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -212,6 +520,8 @@ async def get_user_profile(request: Request):
                 "last_login": user["last_login"].isoformat()
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting user profile: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -227,8 +537,9 @@ async def test_openai_key(request: Request, key_request: OpenAIKeyTestRequest):
         import openai
         
         try:
-            client = openai.OpenAI(api_key=key_request.api_key)
-            response = client.chat.completions.create(
+            # Not pooled: an untested key must not replace the user's pooled client
+            client = openai_clients.create(key_request.api_key)
+            response = await client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": key_request.test_message}],
                 max_tokens=50
@@ -260,6 +571,8 @@ async def test_openai_key(request: Request, key_request: OpenAIKeyTestRequest):
                 "error": str(api_error)
             }
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error testing OpenAI key: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -275,7 +588,8 @@ async def save_openai_key(request: Request, key_request: OpenAIKeyRequest):
         encrypted_key = base64.b64encode(key_request.api_key.encode()).decode()
         
         # Update user with encrypted API key
-        result = users_collection.update_one(
+        result = await run_blocking(
+            users_collection.update_one,
             {"user_id": user_id},
             {
                 "$set": {
@@ -285,6 +599,8 @@ async def save_openai_key(request: Request, key_request: OpenAIKeyRequest):
                 }
             }
         )
+        user_records.invalidate(user_id)
+        openai_clients.invalidate(user_id)
         
         if result.modified_count > 0:
             return {
@@ -294,6 +610,8 @@ async def save_openai_key(request: Request, key_request: OpenAIKeyRequest):
         else:
             raise HTTPException(status_code=404, detail="User not found")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving OpenAI key: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -303,7 +621,7 @@ async def save_openai_key(request: Request, key_request: OpenAIKeyRequest):
 async def get_openai_key_status(request: Request):
     try:
         user_id = get_user_id_from_request(request)
-        user = users_collection.find_one({"user_id": user_id})
+        user = await run_blocking(user_records.get, user_id)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -314,6 +632,8 @@ async def get_openai_key_status(request: Request):
             "last_updated": user.get("updated_at", user.get("created_at")).isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting OpenAI key status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -324,7 +644,8 @@ async def delete_openai_key(request: Request):
     try:
         user_id = get_user_id_from_request(request)
         
-        result = users_collection.update_one(
+        result = await run_blocking(
+            users_collection.update_one,
             {"user_id": user_id},
             {
                 "$unset": {"openai_api_key": ""},
@@ -334,6 +655,8 @@ async def delete_openai_key(request: Request):
                 }
             }
         )
+        user_records.invalidate(user_id)
+        openai_clients.invalidate(user_id)
         
         if result.modified_count > 0:
             return {
@@ -343,6 +666,8 @@ async def delete_openai_key(request: Request):
         else:
             raise HTTPException(status_code=404, detail="User not found")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting OpenAI key: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -351,12 +676,19 @@ async def delete_openai_key(request: Request):
 @app.post("/ingest/text")
 async def ingest_text(
     text: str = Form(...),
-    metadata: Optional[str] = Form(None)
+    metadata: Optional[str] = Form(None),
+    async_mode: bool = Query(False, alias="async")
 ):
     try:
         metadata_dict = eval(metadata) if metadata else {}
-        doc_id = ingestion_service.ingest_text(text, metadata_dict)
+        if async_mode:
+            job_id = await run_blocking(job_queue.submit, "ingest_text", {"text": text, "metadata": metadata_dict})
+            return job_accepted(job_id)
+        ingestion_service = await get_ingestion_service()
+        doc_id = await run_model(ingestion_service.ingest_text, text, metadata_dict)
         return {"document_id": doc_id, "status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error ingesting text: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -365,18 +697,36 @@ async def ingest_text(
 @app.post("/ingest/image")
 async def ingest_image(
     file: UploadFile = File(...),
-    metadata: Optional[str] = Form(None)
+    metadata: Optional[str] = Form(None),
+    async_mode: bool = Query(False, alias="async")
 ):
     try:
-        # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Identical uploads share one file; names never collide
+        image_hash = await store_upload(file)
+        file_path = blob_store.path(image_hash)
         
         metadata_dict = eval(metadata) if metadata else {}
-        doc_id = ingestion_service.ingest_image(str(file_path), metadata_dict)
+        if async_mode:
+            job_id = await run_blocking(
+                job_queue.submit, "ingest_image",
+                {"image_path": str(file_path), "image_hash": image_hash, "metadata": metadata_dict}
+            )
+            return job_accepted(job_id)
+        ingestion_service = await get_ingestion_service()
+        try:
+            doc_id = await run_model(ingestion_service.ingest_image, str(file_path), metadata_dict, image_hash)
+        except Exception:
+            await run_blocking(blob_store.release, image_hash)
+            raise
         
-        return {"document_id": doc_id, "status": "success", "file_path": str(file_path)}
+        return {
+            "document_id": doc_id,
+            "status": "success",
+            "file_path": str(file_path),
+            "image_url": BlobStore.url(image_hash)
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error ingesting image: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -386,29 +736,130 @@ async def ingest_image(
 async def ingest_multimodal(
     text: str = Form(...),
     file: UploadFile = File(...),
-    metadata: Optional[str] = Form(None)
+    metadata: Optional[str] = Form(None),
+    async_mode: bool = Query(False, alias="async")
 ):
     try:
-        # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        image_hash = await store_upload(file)
+        file_path = blob_store.path(image_hash)
         
         metadata_dict = eval(metadata) if metadata else {}
-        doc_id = ingestion_service.ingest_multimodal(text, str(file_path), metadata_dict)
+        if async_mode:
+            job_id = await run_blocking(
+                job_queue.submit, "ingest_multimodal",
+                {"text": text, "image_path": str(file_path), "image_hash": image_hash, "metadata": metadata_dict}
+            )
+            return job_accepted(job_id)
+        ingestion_service = await get_ingestion_service()
+        try:
+            doc_id = await run_model(
+                ingestion_service.ingest_multimodal, text, str(file_path), metadata_dict, image_hash
+            )
+        except Exception:
+            await run_blocking(blob_store.release, image_hash)
+            raise
         
         return {"document_id": doc_id, "status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error ingesting multimodal content: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Progress of recent bulk ingests in this process, by ingest_id
+bulk_ingest_progress: Dict[str, Dict[str, Any]] = {}
+MAX_TRACKED_BULK_INGESTS = 100
+
+
+def iterate_request_body(request: Request, loop: asyncio.AbstractEventLoop) -> Iterator[bytes]:
+    """Pull the request body chunk by chunk from a worker thread"""
+    chunks = request.stream().__aiter__()
+    
+    async def next_chunk():
+        try:
+            return await chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    while True:
+        chunk = asyncio.run_coroutine_threadsafe(next_chunk(), loop).result()
+        if chunk is None:
+            return
+        yield chunk
+
+
+def model_executor_runner(loop: asyncio.AbstractEventLoop):
+    """Run a function on the inference executor from a worker thread and wait for it"""
+    def run(func, *args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(run_model(func, *args, **kwargs), loop).result()
+    return run
+
+
+def track_bulk_ingest(ingest_id: str, stats: Dict[str, Any], status: str):
+    bulk_ingest_progress[ingest_id] = {**stats, "status": status}
+    while len(bulk_ingest_progress) > MAX_TRACKED_BULK_INGESTS:
+        bulk_ingest_progress.pop(next(iter(bulk_ingest_progress)))
+
+
+@app.post("/ingest/bulk")
+async def ingest_bulk(request: Request, batch_size: Optional[int] = None, ingest_id: Optional[str] = None):
+    """NDJSON body, one record per line: {"text", "image_path" | "image_base64", "metadata", "content_type"}"""
+    ingest_id = ingest_id or f"bulk_{uuid.uuid4().hex[:12]}"
+    try:
+        ingestion_service = await get_ingestion_service()
+        loop = asyncio.get_running_loop()
+        records = iter_ndjson(iterate_request_body(request, loop))
+        track_bulk_ingest(ingest_id, {}, "running")
+        # The body loop lasts as long as the upload, so it runs on the I/O executor and
+        # takes an inference slot only for each batch's forward passes
+        stats = await run_blocking(
+            ingestion_service.bulk_ingest, records, batch_size,
+            progress_callback=lambda progress: track_bulk_ingest(ingest_id, progress, "running"),
+            embed_runner=model_executor_runner(loop),
+            # Callers may only reference images the server already holds, never arbitrary files
+            image_root=settings.UPLOADS_DIR
+        )
+        track_bulk_ingest(ingest_id, stats, "completed")
+        
+        return {"ingest_id": ingest_id, "status": "success", **stats}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in bulk ingest {ingest_id}: {e}")
+        track_bulk_ingest(ingest_id, bulk_ingest_progress.get(ingest_id, {}), "failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/ingest/bulk/{ingest_id}")
+async def get_bulk_ingest_progress(ingest_id: str):
+    progress = bulk_ingest_progress.get(ingest_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Bulk ingest not found")
+    return {"ingest_id": ingest_id, **progress}
+
+
+def parse_metadata_filter(metadata_filter: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not metadata_filter:
+        return None
+    try:
+        parsed = json.loads(metadata_filter)
+        if not isinstance(parsed, dict):
+            raise ValueError("metadata_filter must be a JSON object")
+        build_metadata_query(parsed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid metadata_filter: {e}")
+    return parsed
+
+
 @app.post("/search/text")
 async def search_by_text(
     query: str = Form(...),
     top_k: int = Form(10),
     content_type: Optional[str] = Form(None),
-    threshold: Optional[float] = Form(0.4)
+    threshold: Optional[float] = Form(0.4),
+    exact: bool = Form(False),
+    metadata_filter: Optional[str] = Form(None)
 ):
     try:
         content_type_enum = ContentType(content_type) if content_type else None
@@ -418,9 +869,12 @@ async def search_by_text(
             query_text=query,
             top_k=top_k,
             content_type=content_type_enum,
-            threshold=threshold
+            threshold=threshold,
+            exact=exact,
+            metadata_filter=parse_metadata_filter(metadata_filter)
         )
-        results = retrieval_service.search(search_query)
+        retrieval_service = await get_retrieval_service()
+        results = await run_model(retrieval_service.search, search_query)
         
         return {
             "query": query,
@@ -431,11 +885,14 @@ async def search_by_text(
                     "content_type": result.document.content_type,
                     "text_content": result.document.text_content,
                     "image_path": result.document.image_path,
+                    "image_url": result.document.image_url,
                     "metadata": result.document.metadata
                 }
                 for result in results
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in text search: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -445,19 +902,21 @@ async def search_by_text(
 async def search_by_image(
     file: UploadFile = File(...),
     top_k: int = Form(10),
-    content_type: Optional[str] = Form(None)
+    content_type: Optional[str] = Form(None),
+    metadata_filter: Optional[str] = Form(None)
 ):
     try:
-        # Save uploaded file
-        file_path = UPLOAD_DIR / f"query_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        metadata_filter_dict = parse_metadata_filter(metadata_filter)
+        image = await read_image_upload(file)
         
         content_type_enum = ContentType(content_type) if content_type else None
-        results = retrieval_service.search_by_image(str(file_path), top_k, content_type_enum)
+        retrieval_service = await get_retrieval_service()
+        results = await run_model(
+            retrieval_service.search_by_image, image, top_k, content_type_enum, metadata_filter_dict
+        )
         
         return {
-            "query_image": str(file_path),
+            "query_image": file.filename,
             "results": [
                 {
                     "document_id": str(result.document.id),
@@ -465,11 +924,14 @@ async def search_by_image(
                     "content_type": result.document.content_type,
                     "text_content": result.document.text_content,
                     "image_path": result.document.image_path,
+                    "image_url": result.document.image_url,
                     "metadata": result.document.metadata
                 }
                 for result in results
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in image search: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -482,16 +944,14 @@ async def search_multimodal(
     top_k: int = Form(10)
 ):
     try:
-        # Save uploaded file
-        file_path = UPLOAD_DIR / f"query_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        image = await read_image_upload(file)
         
-        results = retrieval_service.search_multimodal(text, str(file_path), top_k)
+        retrieval_service = await get_retrieval_service()
+        results = await run_model(retrieval_service.search_multimodal, text, image, top_k)
         
         return {
             "query_text": text,
-            "query_image": str(file_path),
+            "query_image": file.filename,
             "results": [
                 {
                     "document_id": str(result.document.id),
@@ -499,11 +959,14 @@ async def search_multimodal(
                     "content_type": result.document.content_type,
                     "text_content": result.document.text_content,
                     "image_path": result.document.image_path,
+                    "image_url": result.document.image_url,
                     "metadata": result.document.metadata
                 }
                 for result in results
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in multimodal search: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -520,18 +983,14 @@ async def hybrid_search(
         if not text and not file:
             raise ValueError("At least one of text or image must be provided")
         
-        image_path = None
-        if file:
-            file_path = UPLOAD_DIR / f"query_{file.filename}"
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            image_path = str(file_path)
+        image = await read_image_upload(file) if file else None
         
-        results = retrieval_service.hybrid_search(text, image_path, text_weight, top_k)
+        retrieval_service = await get_retrieval_service()
+        results = await run_model(retrieval_service.hybrid_search, text, image, text_weight, top_k)
         
         return {
             "query_text": text,
-            "query_image": image_path,
+            "query_image": file.filename if file else None,
             "text_weight": text_weight,
             "results": [
                 {
@@ -540,11 +999,14 @@ async def hybrid_search(
                     "content_type": result.document.content_type,
                     "text_content": result.document.text_content,
                     "image_path": result.document.image_path,
+                    "image_url": result.document.image_url,
                     "metadata": result.document.metadata
                 }
                 for result in results
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in hybrid search: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -556,6 +1018,7 @@ async def hybrid_search(
 # async def search_json(request: TextSearchRequest):
     try:
         content_type_enum = ContentType(request.content_type) if request.content_type else None
+        retrieval_service = await get_retrieval_service()
         results = retrieval_service.search_by_text(request.query, request.top_k, content_type_enum)
         
         return {
@@ -595,6 +1058,7 @@ async def hybrid_search(
                 tmp_file.write(image_data)
                 image_path = tmp_file.name
         
+        retrieval_service = await get_retrieval_service()
         results = retrieval_service.hybrid_search(
             request.text, 
             image_path, 
@@ -626,68 +1090,299 @@ async def hybrid_search(
 
 
 
+def serialize_video(video: Dict[str, Any]) -> Dict[str, Any]:
+    video["_id"] = str(video["_id"])
+    return video
+
+
 @app.post("/videos/upload")
 async def upload_video(
     file: UploadFile = File(...),
     title: str = Form(...),
-    metadata: Optional[str] = Form(None)
+    metadata: Optional[str] = Form(None),
+    sample_fps: Optional[float] = Form(None),
+    sampling: Optional[str] = Form(None)
 ):
     try:
         metadata_dict = json.loads(metadata) if metadata else {}
+        if sampling is not None and sampling not in ("keyframes", "fps"):
+            raise HTTPException(status_code=400, detail="sampling must be 'keyframes' or 'fps'")
         
-        video_info = VideoInfo(
-            title=title,
-            filename=file.filename,
-            file_path="",
-            metadata=metadata_dict
-        )
+        # Stored under a generated name; frames are extracted in the background
+        suffix = Path(file.filename or "").suffix or ".mp4"
+        video_path = settings.VIDEOS_DIR / f"{uuid.uuid4().hex}{suffix}"
+        await save_video_upload(file, video_path)
         
-        video_id = str(video_info.id) if video_info.id else "temp_video_id"
+        video_service = await get_video_service()
+        video_id = await run_blocking(
+            video_service.register_video, title, file.filename, str(video_path), metadata_dict
+        )
+        job_id = await run_blocking(
+            job_queue.submit, "extract_video_frames",
+            {"video_id": video_id, "sample_fps": sample_fps, "sampling": sampling}
+        )
         
         return {
             "video_id": video_id,
             "title": title,
             "filename": file.filename,
-            "status": "success"
+            "status": "success",
+            "processing_status": "queued",
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing video info: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/blobs/{digest}")
+async def get_blob(digest: str):
+    blob = await run_blocking(blob_store.get, digest)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    # Content-addressed, so the response never changes
+    return FileResponse(
+        blob_store.path(digest),
+        media_type=blob["content_type"],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+
+@app.get("/videos/{video_id}")
+async def get_video(video_id: str):
+    try:
+        video_service = await get_video_service()
+        video = await run_blocking(video_service.get_video, video_id)
+        if video is None:
+            raise HTTPException(status_code=404, detail="Video not found")
+        return serialize_video(video)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting video {video_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def serialize_frame(frame: Dict[str, Any]) -> Dict[str, Any]:
+    frame["_id"] = str(frame["_id"])
+    frame["image_url"] = "/uploads/" + Path(frame["image_path"]).relative_to(UPLOAD_DIR).as_posix()
+    return frame
+
+
+@app.get("/videos/{video_id}/frames")
+async def get_video_frames(video_id: str, skip: int = 0, limit: int = 100,
+                           start: Optional[float] = None, end: Optional[float] = None):
+    try:
+        query: Dict[str, Any] = {"video_id": video_id}
+        if start is not None or end is not None:
+            query["timestamp"] = {}
+            if start is not None:
+                query["timestamp"]["$gte"] = start
+            if end is not None:
+                query["timestamp"]["$lte"] = end
+        video_service = await get_video_service()
+        frames = await run_blocking(
+            lambda: list(
+                video_service.frames.find(query, {"image_embedding": 0})
+                .sort("timestamp", 1).skip(skip).limit(limit)
+            )
+        )
+        return {"video_id": video_id, "frames": [serialize_frame(frame) for frame in frames], "skip": skip, "limit": limit}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting frames of video {video_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/videos/{video_id}/frames/search")
+async def search_video_frames(
+    video_id: str,
+    file: UploadFile = File(...),
+    top_k: int = Form(10),
+    start: Optional[float] = Form(None),
+    end: Optional[float] = Form(None)
+):
+    try:
+        image = await read_image_upload(file)
+        
+        video_service = await get_video_service()
+        query_embedding = (await run_model(video_service.embedder.embed_image, image))[0]
+        frames = await run_blocking(video_service.search_frames, video_id, query_embedding, top_k, start, end)
+        if frames is None:
+            raise HTTPException(status_code=404, detail="Video not found")
+        return {"video_id": video_id, "start": start, "end": end, "results": [serialize_frame(frame) for frame in frames]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching frames of video {video_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/frames/save")
 async def save_frame(
     file: UploadFile = File(...),
     timestamp: float = Form(...),
-    metadata: Optional[str] = Form(None)
+    metadata: Optional[str] = Form(None),
+    async_mode: bool = Query(False, alias="async")
 ):
     try:
-        frame_path = UPLOAD_DIR / f"frame_{timestamp}_{file.filename}"
-        with open(frame_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        image_hash = await store_upload(file)
+        frame_path = blob_store.path(image_hash)
         
         metadata_dict = json.loads(metadata) if metadata else {}
         metadata_dict['timestamp'] = timestamp
         metadata_dict['content_type'] = 'frame'
         
-        doc_id = ingestion_service.ingest_image(str(frame_path), metadata_dict)
+        if async_mode:
+            job_id = await run_blocking(
+                job_queue.submit, "save_frame",
+                {"image_path": str(frame_path), "image_hash": image_hash, "timestamp": timestamp, "metadata": metadata_dict}
+            )
+            return job_accepted(job_id)
+        
+        ingestion_service = await get_ingestion_service()
+        try:
+            doc_id = await run_model(ingestion_service.ingest_image, str(frame_path), metadata_dict, image_hash)
+        except Exception:
+            await run_blocking(blob_store.release, image_hash)
+            raise
         
         return {
             "frame_id": doc_id,
             "timestamp": timestamp,
             "image_path": str(frame_path),
+            "image_url": BlobStore.url(image_hash),
             "status": "success"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving frame: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, type: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    try:
+        if status is not None and status not in JOB_STATUSES:
+            raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(JOB_STATUSES)}")
+        jobs = await run_blocking(job_queue.list_jobs, status, type, limit)
+        return {"jobs": [serialize_job(job) for job in jobs]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing jobs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    try:
+        job = await run_blocking(job_queue.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return serialize_job(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    try:
+        job = await run_blocking(job_queue.cancel, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return serialize_job(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Note: Disabled /chats/save endpoint to prevent duplicate key errors
 # Only using conversation storage (Q+A+image) now
 
 
 
+def store_question_image(question_image: str) -> str:
+    import base64
+    
+    # Base64 (optionally a data URL) -> blob store; the same frame shared by several
+    # conversations is stored once and reference counted
+    image_data = base64.b64decode(question_image.split(',')[1] if ',' in question_image else question_image)
+    return blob_store.put(image_data)
+
+
+def conversation_image_url(conv: Dict[str, Any]) -> Optional[str]:
+    # Conversations saved before the blob store still carry the base64 image
+    if conv.get("image_hash"):
+        return BlobStore.url(conv["image_hash"])
+    return conv.get("question_image")
+
+
+def serialize_conversation(conv: Dict[str, Any]) -> Dict[str, Any]:
+    conv["_id"] = str(conv["_id"])
+    if isinstance(conv.get("created_at"), datetime):
+        conv["created_at"] = conv["created_at"].isoformat()
+    conv["question_image"] = conversation_image_url(conv)
+    return conv
+
+
+async def persist_conversation(user_id: str, question: str, answer: str, question_image: Optional[str] = None,
+                               timestamp: float = 0.0, video_id: Optional[str] = None):
+    """Embed and store one question/answer pair; returns (conversation_id, document _id)"""
+    # Generate unique conversation ID
+    import uuid
+    conversation_id = f"conv_{str(uuid.uuid4())[:8]}"
+    
+    # Generate combined embedding using the same method as RAG
+    combined_text = f"{question.strip()} {answer.strip()}"
+    combined_embedding = (await embed_text(combined_text))[0].tolist()
+    
+    # Only the image's hash is stored in the conversation
+    image_hash = None
+    if question_image:
+        try:
+            image_hash = await run_blocking(store_question_image, question_image)
+        except Exception as image_error:
+            logger.error(f"Error storing question image: {image_error}")
+            # 이미지 처리 실패해도 대화 저장은 계속 진행
+    
+    # Save to user-specific conversation collection
+    conversation_data = {
+        "user_id": user_id,
+        "conversation_id": conversation_id,
+        "question": question.strip(),
+        "answer": answer.strip(),
+        "image_hash": image_hash,
+        "context": {},
+        "metadata": {},
+        "timestamp": timestamp,
+        "video_id": video_id,
+        "combined_embedding": encode_embedding(combined_embedding),
+        "tags": [],
+        "created_at": datetime.utcnow()
+    }
+    
+    try:
+        result = await run_blocking(user_conversations_collection.insert_one, conversation_data)
+    except Exception:
+        if image_hash:
+            await run_blocking(blob_store.release, image_hash)
+        raise
+    conversation_cache.append(user_id, result.inserted_id, combined_embedding)
+    conversation_timelines.add((user_id, video_id), result.inserted_id, timestamp)
+    return conversation_id, result.inserted_id
+
+
 @app.post("/conversations/save")
 async def save_conversation(
     request: Request,
@@ -707,82 +1402,11 @@ async def save_conversation(
             raise HTTPException(status_code=400, detail="Answer cannot be empty")
             
         logger.info(f"Saving conversation for user {user_id}: Q='{question[:50]}...', A='{answer[:50]}...', has_image={bool(question_image)}")
-        
-        # Generate unique conversation ID
-        import uuid
-        conversation_id = f"conv_{str(uuid.uuid4())[:8]}"
-        
-        # Generate combined embedding using the same method as RAG
-        from src.models.embeddings import MultimodalEmbedder
-        embedder = MultimodalEmbedder()
-        
-        combined_text = f"{question.strip()} {answer.strip()}"
-        combined_embedding = embedder.embed_text(combined_text)[0].tolist()
-        
-        # Save to user-specific conversation collection
-        conversation_data = {
-            "user_id": user_id,
-            "conversation_id": conversation_id,
-            "question": question.strip(),
-            "answer": answer.strip(),
-            "question_image": question_image,
-            "context": {},
-            "metadata": {},
-            "timestamp": timestamp,
-            "combined_embedding": combined_embedding,
-            "tags": [],
-            "created_at": datetime.utcnow()
-        }
-        
-        result = user_conversations_collection.insert_one(conversation_data)
-        
-        # Process image if provided (save as shared video frame)
-        shared_image_path = None
-        if question_image:
-            try:
-                import base64
-                from pathlib import Path
-                import hashlib
-                
-                # Base64 디코딩
-                image_data = base64.b64decode(question_image.split(',')[1] if ',' in question_image else question_image)
-                
-                # 동영상 프레임 기준으로 공유 파일명 생성
-                if video_id and timestamp > 0:
-                    # video_id와 timestamp를 기준으로 파일명 생성 (공유)
-                    frame_filename = f"frame_{video_id}_{int(timestamp * 1000)}.jpg"
-                else:
-                    # video_id가 없으면 이미지 해시를 기준으로 파일명 생성
-                    image_hash = hashlib.md5(image_data).hexdigest()[:12]
-                    frame_filename = f"frame_unknown_{image_hash}.jpg"
-                
-                shared_image_path = UPLOAD_DIR / frame_filename
-                
-                # 파일이 이미 존재하지 않으면 저장
-                if not shared_image_path.exists():
-                    with open(shared_image_path, 'wb') as f:
-                        f.write(image_data)
-                    logger.info(f"Saved new shared frame image at: {shared_image_path}")
-                else:
-                    logger.info(f"Reusing existing shared frame image: {shared_image_path}")
-                
-                # 대화 데이터에 공유 이미지 경로 추가
-                user_conversations_collection.update_one(
-                    {"_id": result.inserted_id},
-                    {"$set": {
-                        "image_path": str(shared_image_path),
-                        "video_id": video_id,
-                        "shared_frame": True
-                    }}
-                )
-                    
-            except Exception as image_error:
-                logger.error(f"Error processing shared frame image: {image_error}")
-                # 이미지 처리 실패해도 대화 저장은 계속 진행
+        conversation_id, document_id = await persist_conversation(user_id, question, answer, question_image, timestamp, video_id)
         
         return {
             "conversation_id": conversation_id,
-            "document_id": str(result.inserted_id),
+            "document_id": str(document_id),
             "status": "success"
         }
     except HTTPException:
@@ -806,65 +1430,55 @@ async def search_conversations(http_request: Request, request: ConversationSearc
             
         if request.top_k <= 0 or request.top_k > 100:
             raise HTTPException(status_code=400, detail="top_k must be between 1 and 100")
+        
+        # Restrict to the video's time window before any vector scoring
+        candidate_ids = None
+        if request.video_id is not None or request.start_time is not None or request.end_time is not None:
+            timeline = await run_blocking(conversation_timelines.get, (user_id, request.video_id))
+            candidate_ids = timeline.ids_in_range(request.start_time, request.end_time)
+            if not candidate_ids:
+                return {"query": request.query, "results": []}
             
         logger.info(f"Conversation search request for user {user_id}: query='{request.query[:50]}...', top_k={request.top_k}")
         
         # Use vector similarity search like RAG system
-        from src.models.embeddings import MultimodalEmbedder
-        import numpy as np
-        
-        # Generate query embedding
-        embedder = MultimodalEmbedder()
-        query_embedding = embedder.embed_text(request.query.strip())[0]
+        query_embedding = (await embed_text(request.query.strip()))[0]
         
-        # Get all user conversations
-        conversations = list(user_conversations_collection.find({"user_id": user_id}))
-        logger.info(f"Found {len(conversations)} conversations to search for user {user_id}")
+        # Rank against the cached embedding matrix and apply threshold filter (0.4 = 40%)
+        ranked = await run_blocking(
+            conversation_cache.search,
+            user_id, query_embedding, request.top_k, load_user_conversation_embeddings, threshold=0.4,
+            candidate_ids=candidate_ids, vector_loader=load_conversation_vectors
+        )
         
-        if not conversations:
-            logger.info("No conversations found for user")
+        if not ranked:
+            logger.info("No matching conversations found for user")
             return {"query": request.query, "results": []}
         
-        results = []
-        for conv in conversations:
-            try:
-                # Check if combined_embedding exists
-                if not conv.get('combined_embedding'):
-                    logger.warning(f"Conversation {conv.get('conversation_id')} has no combined_embedding, skipping")
-                    continue
-                    
-                # Convert embedding to numpy array
-                doc_embedding = np.array(conv['combined_embedding'])
-                if doc_embedding.size == 0:
-                    continue
-                
-                # Compute similarity using the same method as RAG system
-                similarity = embedder.compute_similarity(
-                    query_embedding.reshape(1, -1), 
-                    doc_embedding.reshape(1, -1)
-                )[0]
-                
-                if np.isnan(similarity) or np.isinf(similarity):
-                    similarity = 0.0
-                
-                # Apply threshold filter (0.4 = 40%)
-                if similarity >= 0.4:
-                    results.append({
-                        "conversation_id": str(conv.get("conversation_id", "")),
-                        "question": str(conv.get("question", "")),
-                        "answer": str(conv.get("answer", "")),
-                        "question_image": conv.get("question_image"),
-                        "score": float(similarity),
-                        "timestamp": float(conv.get("timestamp", 0.0))
-                    })
-                
-            except Exception as result_error:
-                logger.error(f"Error processing conversation {conv.get('conversation_id', 'unknown')}: {result_error}")
-                continue
+        # Fetch only the top_k hits
+        conversations = {
+            conv["_id"]: conv
+            for conv in await run_blocking(
+                fetch_documents_by_ids,
+                user_conversations_collection,
+                [doc_id for doc_id, _ in ranked],
+                extra_filter={"user_id": user_id}
+            )
+        }
         
-        # Sort by similarity score (descending) and return top_k
-        results.sort(key=lambda x: x['score'], reverse=True)
-        final_results = results[:request.top_k]
+        final_results = []
+        for doc_id, similarity in ranked:
+            conv = conversations.get(doc_id)
+            if conv is None:
+                continue
+            final_results.append({
+                "conversation_id": str(conv.get("conversation_id", "")),
+                "question": str(conv.get("question", "")),
+                "answer": str(conv.get("answer", "")),
+                "question_image": conversation_image_url(conv),
+                "score": similarity,
+                "timestamp": float(conv.get("timestamp", 0.0))
+            })
         
         response_data = {
             "query": request.query,
@@ -881,28 +1495,58 @@ async def search_conversations(http_request: Request, request: ConversationSearc
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.get("/conversations/range")
+async def get_conversations_in_range(
+    request: Request,
+    video_id: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Conversations of one video between start and end seconds, in timestamp order"""
+    try:
+        user_id = get_user_id_from_request(request)
+        timeline = await run_blocking(conversation_timelines.get, (user_id, video_id))
+        doc_ids = timeline.ids_in_range(start, end)[:limit]
+        conversations = await run_blocking(
+            fetch_documents_by_ids,
+            user_conversations_collection,
+            doc_ids,
+            {"combined_embedding": 0},
+            {"user_id": user_id}
+        )
+        return {
+            "video_id": video_id,
+            "start": start,
+            "end": end,
+            "conversations": [serialize_conversation(conv) for conv in conversations]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting conversations in range: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/conversations/history")
 async def get_conversation_history(request: Request, limit: int = 50, offset: int = 0):
     try:
         user_id = get_user_id_from_request(request)
         
-        conversations = list(user_conversations_collection.find(
-            {"user_id": user_id}
-        ).sort("created_at", -1).skip(offset).limit(limit))
-        
-        # Convert ObjectId to string
-        for conv in conversations:
-            conv["_id"] = str(conv["_id"])
-            if "created_at" in conv:
-                conv["created_at"] = conv["created_at"].isoformat()
+        conversations = await run_blocking(lambda: list(user_conversations_collection.find(
+            {"user_id": user_id}, EXCLUDE_EMBEDDINGS
+        ).sort("created_at", -1).skip(offset).limit(limit)))
+        total = await run_blocking(user_conversations_collection.count_documents, {"user_id": user_id})
         
         return {
             "user_id": user_id,
-            "conversations": conversations,
-            "total": user_conversations_collection.count_documents({"user_id": user_id}),
+            "conversations": [serialize_conversation(conv) for conv in conversations],
+            "total": total,
             "limit": limit,
             "offset": offset
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting conversation history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -911,65 +1555,133 @@ async def get_conversation_history(request: Request, limit: int = 50, offset: in
 # Note: Removed get_conversations_by_video endpoint as we simplified to not use video_id
 
 
+def chat_room_image_url(room: Dict[str, Any]) -> Optional[str]:
+    # Rooms saved before the blob store still carry the base64 frame
+    if room.get("image_hash"):
+        return BlobStore.url(room["image_hash"])
+    return room.get("captured_frame")
+
+
+def serialize_chat_room(room: Dict[str, Any]) -> Dict[str, Any]:
+    room["_id"] = str(room["_id"])
+    for field in ("created_at", "updated_at"):
+        if isinstance(room.get(field), datetime):
+            room[field] = room[field].isoformat()
+    # Rooms not yet moved to the message buckets embed their messages
+    legacy_messages = room.pop("messages", None) or []
+    if legacy_messages and not room.get("last_message"):
+        room["last_message"] = legacy_messages[-1]
+    room["message_count"] = room.get("stats", {}).get("message_count", len(legacy_messages))
+    room["captured_frame"] = chat_room_image_url(room)
+    room.get("video_context", {}).pop("captured_frame", None)
+    room.pop("migrating", None)
+    return room
+
+
+# List endpoints only need the last message of rooms that still embed theirs
+CHAT_ROOM_LIST_PROJECTION = {"messages": {"$slice": -1}, "video_context.captured_frame": 0}
+
+
+def attach_chat_room_frame(user_id: str, room_id: str, captured_frame: str):
+    """Store the room's frame in the blob store unless the room already has one"""
+    try:
+        image_hash = store_question_image(captured_frame)
+    except ValueError as e:
+        logger.warning(f"Ignoring undecodable captured_frame for room {room_id}: {e}")
+        return
+    result = user_chat_rooms_collection.update_one(
+        {"user_id": user_id, "room_id": room_id, "image_hash": None, "captured_frame": None},
+        {"$set": {"image_hash": image_hash}}
+    )
+    if result.modified_count == 0:
+        blob_store.release(image_hash)
+
+
 @app.post("/chatrooms/save")
 async def save_chat_room(http_request: Request, request: ChatRoomSaveRequest):
     try:
         user_id = get_user_id_from_request(http_request)
+        key = {"user_id": user_id, "room_id": request.room_id}
+        base_seq = request.base_seq or 0
+        if base_seq < 0:
+            raise HTTPException(status_code=400, detail="base_seq must not be negative")
         
-        # Save chat room data to MongoDB with user isolation
-        chat_room_data = {
-            "user_id": user_id,
-            "room_id": request.room_id,
+        now = datetime.utcnow()
+        room_fields = {
             "name": request.name,
-            "description": "",
-            "messages": request.messages,
             "video_context": {
                 "video_id": request.video_id,
-                "captured_frame": request.captured_frame,
                 "frame_time": request.frame_time,
                 "video_current_time": request.video_current_time
             },
-            "captured_frame": request.captured_frame,
             "frame_time": request.frame_time,
             "video_current_time": request.video_current_time,
             "video_id": request.video_id,
-            "stats": {
-                "message_count": len(request.messages) if request.messages else 0
-            },
             "is_archived": False,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "updated_at": now
         }
+        if request.messages:
+            room_fields["last_message"] = request.messages[-1]
         
-        # Check if chat room already exists for this user
-        existing_room = user_chat_rooms_collection.find_one({
-            "user_id": user_id,
-            "room_id": request.room_id
-        })
-        
-        if existing_room:
-            # Update existing room
-            chat_room_data["updated_at"] = datetime.utcnow()
-            chat_room_data["stats"]["message_count"] = len(request.messages) if request.messages else 0
-            
-            result = user_chat_rooms_collection.update_one(
-                {"user_id": user_id, "room_id": request.room_id},
-                {"$set": chat_room_data}
+        # One upsert both writes the room fields and reserves seqs up to the end of this
+        # save; the count before it tells which of the sent messages are not stored yet
+        end_seq = base_seq + len(request.messages)
+        try:
+            previous = await run_blocking(
+                chat_messages.reserve,
+                user_chat_rooms_collection,
+                user_id,
+                request.room_id,
+                {
+                    "$set": room_fields,
+                    "$max": {"stats.message_count": end_seq},
+                    "$setOnInsert": {"user_id": user_id, "room_id": request.room_id, "description": "", "created_at": now}
+                },
+                {"stats": 1, "last_message": 1, "image_hash": 1, "captured_frame": 1},
+                blob_store
             )
-            return {
-                "room_id": request.room_id,
-                "status": "updated",
-                "modified_count": result.modified_count
-            }
-        else:
-            # Create new room
-            result = user_chat_rooms_collection.insert_one(chat_room_data)
-            return {
-                "room_id": request.room_id,
-                "status": "created",
-                "document_id": str(result.inserted_id)
-            }
+        except ChatRoomMigrating as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        created = previous is None
+        previous = previous or {}
+        stored_count = previous.get("stats", {}).get("message_count", 0)
+        
+        if stored_count < base_seq:
+            # The client missed earlier saves; give the reserved seqs back and ask for the full list
+            await run_blocking(
+                user_chat_rooms_collection.update_one,
+                {**key, "stats.message_count": end_seq},
+                {"$set": {"stats.message_count": stored_count, "last_message": previous.get("last_message")}}
+            )
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "base_seq is ahead of the stored messages", "message_count": stored_count}
+            )
+        
+        new_messages = request.messages[stored_count - base_seq:]
+        if new_messages:
+            try:
+                await run_blocking(chat_messages.append, user_id, request.room_id, stored_count, new_messages)
+            except Exception:
+                await run_blocking(
+                    user_chat_rooms_collection.update_one,
+                    {**key, "stats.message_count": end_seq},
+                    {"$set": {"stats.message_count": stored_count}}
+                )
+                raise
+        
+        if request.captured_frame and not previous.get("image_hash") and not previous.get("captured_frame"):
+            await run_blocking(attach_chat_room_frame, user_id, request.room_id, request.captured_frame)
+        
+        return {
+            "room_id": request.room_id,
+            "status": "created" if created else "updated",
+            "message_count": max(stored_count, end_seq),
+            "appended": len(new_messages)
+        }
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving chat room: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -980,24 +1692,18 @@ async def get_chat_rooms_by_video(request: Request, video_id: str):
     try:
         user_id = get_user_id_from_request(request)
         
-        chat_rooms = list(user_chat_rooms_collection.find({
+        chat_rooms = await run_blocking(lambda: list(user_chat_rooms_collection.find({
             "user_id": user_id,
             "video_id": video_id
-        }))
-        
-        # Convert ObjectId to string and datetime to isoformat for JSON serialization
-        for room in chat_rooms:
-            room["_id"] = str(room["_id"])
-            if "created_at" in room:
-                room["created_at"] = room["created_at"].isoformat()
-            if "updated_at" in room:
-                room["updated_at"] = room["updated_at"].isoformat()
+        }, CHAT_ROOM_LIST_PROJECTION)))
         
         return {
             "user_id": user_id,
             "video_id": video_id,
-            "chat_rooms": chat_rooms
+            "chat_rooms": [serialize_chat_room(room) for room in chat_rooms]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting chat rooms: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1008,59 +1714,83 @@ async def get_all_chat_rooms(request: Request, limit: int = 50, offset: int = 0)
     try:
         user_id = get_user_id_from_request(request)
         
-        chat_rooms = list(user_chat_rooms_collection.find({
+        chat_rooms = await run_blocking(lambda: list(user_chat_rooms_collection.find({
             "user_id": user_id,
             "is_archived": False
-        }).sort("updated_at", -1).skip(offset).limit(limit))
-        
-        # Convert ObjectId to string and datetime to isoformat for JSON serialization
-        for room in chat_rooms:
-            room["_id"] = str(room["_id"])
-            if "created_at" in room:
-                room["created_at"] = room["created_at"].isoformat()
-            if "updated_at" in room:
-                room["updated_at"] = room["updated_at"].isoformat()
+        }, CHAT_ROOM_LIST_PROJECTION).sort("updated_at", -1).skip(offset).limit(limit)))
+        total = await run_blocking(user_chat_rooms_collection.count_documents, {
+            "user_id": user_id,
+            "is_archived": False
+        })
         
         return {
             "user_id": user_id,
-            "chat_rooms": chat_rooms,
-            "total": user_chat_rooms_collection.count_documents({
-                "user_id": user_id,
-                "is_archived": False
-            }),
+            "chat_rooms": [serialize_chat_room(room) for room in chat_rooms],
+            "total": total,
             "limit": limit,
             "offset": offset
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting all chat rooms: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def release_conversation_images(conversations: List[Dict[str, Any]]) -> int:
+    """Drop the deleted conversations' image references; returns the number of files removed"""
+    images_deleted = blob_store.release_many(conv.get("image_hash") for conv in conversations)
+    # Legacy per-frame files may be shared, so only remove those no remaining conversation uses
+    for image_path in {conv.get("image_path") for conv in conversations if conv.get("image_path")}:
+        if user_conversations_collection.count_documents({"image_path": image_path}, limit=1) == 0:
+            images_deleted += delete_image_files([image_path])
+    return images_deleted
+
+
+def delete_image_files(image_paths: List[Optional[str]]) -> int:
+    images_deleted = 0
+    for image_path in image_paths:
+        if image_path:
+            try:
+                file_path = Path(image_path)
+                if file_path.exists():
+                    file_path.unlink()
+                    images_deleted += 1
+                    logger.info(f"Deleted image file: {image_path}")
+            except Exception as img_error:
+                logger.error(f"Error deleting image {image_path}: {img_error}")
+    return images_deleted
+
+
 @app.delete("/chatrooms/{room_id}")
 async def delete_chat_room(request: Request, room_id: str):
     try:
         user_id = get_user_id_from_request(request)
         
         # First check if chat room exists
-        existing_room = user_chat_rooms_collection.find_one({
+        existing_room = await run_blocking(user_chat_rooms_collection.find_one, {
             "user_id": user_id,
             "room_id": room_id
-        })
+        }, {"messages": 0})
         
         if not existing_room:
             raise HTTPException(status_code=404, detail="Chat room not found or access denied")
         
-        # Delete chat room from user_chat_rooms_collection
-        room_result = user_chat_rooms_collection.delete_one({
+        # Delete chat room from user_chat_rooms_collection, then its messages and frame
+        room_result = await run_blocking(user_chat_rooms_collection.delete_one, {
             "user_id": user_id,
             "room_id": room_id
         })
+        if room_result.deleted_count > 0:
+            await run_blocking(chat_messages.delete_room, user_id, room_id)
+            if existing_room.get("image_hash"):
+                await run_blocking(blob_store.release, existing_room["image_hash"])
         
         # Delete related conversations and images more precisely
         # Instead of using timestamp matching, we'll track conversations by chat room context
         video_id = existing_room.get("video_id")
         video_current_time = existing_room.get("video_current_time")
-        captured_frame = existing_room.get("captured_frame")
+        captured_frame = existing_room.get("captured_frame") or existing_room.get("image_hash")
         
         conversations_deleted = 0
         images_deleted = 0
@@ -1069,31 +1799,33 @@ async def delete_chat_room(request: Request, room_id: str):
         if captured_frame or (video_id and video_current_time is not None):
             delete_query = {"user_id": user_id}
             
-            # More precise matching: use exact timestamp match if available
+            # Chat rooms are per second of video (the frontend groups by floor(currentTime)),
+            # so match that second as a range instead of exact float equality
             if video_current_time is not None:
-                delete_query["timestamp"] = video_current_time
+                second = math.floor(video_current_time)
+                delete_query["timestamp"] = {"$gte": second, "$lt": second + 1}
+            if video_id:
+                # Conversations saved before video_id was recorded have none
+                delete_query["video_id"] = {"$in": [video_id, None]}
             
             # Find conversations to delete and their associated images before deleting
-            conversations_to_delete = list(user_conversations_collection.find(delete_query))
-            
-            # Delete associated image files
-            for conv in conversations_to_delete:
-                image_path = conv.get("image_path")
-                if image_path:
-                    try:
-                        from pathlib import Path
-                        file_path = Path(image_path)
-                        if file_path.exists():
-                            file_path.unlink()
-                            images_deleted += 1
-                            logger.info(f"Deleted image file: {image_path}")
-                    except Exception as img_error:
-                        logger.error(f"Error deleting image {image_path}: {img_error}")
+            conversations_to_delete = await run_blocking(
+                lambda: list(user_conversations_collection.find(delete_query, {"_id": 1, "image_path": 1, "image_hash": 1}))
+            )
             
-            # Delete the conversations
+            # Delete the conversations, then release their images
             if conversations_to_delete:
-                conv_result = user_conversations_collection.delete_many(delete_query)
+                conv_result = await run_blocking(
+                    user_conversations_collection.delete_many,
+                    {"_id": {"$in": [conv["_id"] for conv in conversations_to_delete]}}
+                )
                 conversations_deleted = conv_result.deleted_count
+                images_deleted = await run_blocking(release_conversation_images, conversations_to_delete)
+                conversation_cache.remove(user_id, [conv["_id"] for conv in conversations_to_delete])
+                for timeline_video_id in {video_id, None}:
+                    conversation_timelines.remove(
+                        (user_id, timeline_video_id), [conv["_id"] for conv in conversations_to_delete]
+                    )
         
         logger.info(f"Deleted chat room {room_id} for user {user_id}, also deleted {conversations_deleted} related conversations and {images_deleted} images")
         
@@ -1115,11 +1847,15 @@ async def delete_chat_room(request: Request, room_id: str):
 
 
 @app.get("/chatrooms/{room_id}/details")
-async def get_chat_room_details(request: Request, room_id: str):
+async def get_chat_room_details(request: Request, room_id: str, limit: int = settings.CHAT_MESSAGES_PAGE_SIZE,
+                                before_seq: Optional[int] = None):
+    """Room fields plus one page of messages, newest page first: pass the returned
+    first_seq as before_seq to load the page before it"""
     try:
         user_id = get_user_id_from_request(request)
+        limit = max(1, min(limit, settings.CHAT_MESSAGES_MAX_PAGE_SIZE))
         
-        room = user_chat_rooms_collection.find_one({
+        room = await run_blocking(user_chat_rooms_collection.find_one, {
             "user_id": user_id,
             "room_id": room_id
         })
@@ -1127,13 +1863,18 @@ async def get_chat_room_details(request: Request, room_id: str):
         if not room:
             raise HTTPException(status_code=404, detail="Chat room not found or access denied")
         
-        # Convert ObjectId to string and datetime to isoformat
-        room["_id"] = str(room["_id"])
-        if "created_at" in room:
-            room["created_at"] = room["created_at"].isoformat()
-        if "updated_at" in room:
-            room["updated_at"] = room["updated_at"].isoformat()
+        legacy_messages = room.get("messages")
+        room = serialize_chat_room(room)
+        end_seq = room["message_count"] if before_seq is None else max(0, min(before_seq, room["message_count"]))
+        first_seq = max(0, end_seq - limit)
+        if legacy_messages is not None:
+            messages = [{**message, "seq": seq} for seq, message in enumerate(legacy_messages)][first_seq:end_seq]
+        else:
+            messages = await run_blocking(chat_messages.page, user_id, room_id, end_seq, limit)
         
+        room["messages"] = messages
+        room["first_seq"] = first_seq
+        room["has_more"] = first_seq > 0
         return room
     except HTTPException:
         raise
@@ -1146,84 +1887,152 @@ class OpenAIChatRequest(BaseModel):
     message: str
     captured_frame: Optional[str] = None
     video_file_name: Optional[str] = None
+    # Always ask the model (the fresh answer still replaces the cached one)
+    bypass_cache: bool = False
+
+
+class OpenAIChatStreamRequest(OpenAIChatRequest):
+    # Store the finished answer as a searchable conversation (same as POST /conversations/save)
+    save_conversation: bool = False
+    timestamp: float = 0.0
+    video_id: Optional[str] = None
+
+
+async def get_user_openai_key(user_id: str) -> str:
+    # Get user's stored API key
+    user = await run_blocking(user_records.get, user_id)
+    if not user or not user.get("openai_api_key"):
+        raise HTTPException(status_code=400, detail="OpenAI API key not found. Please set your API key first.")
+    
+    # Decrypt API key
+    import base64
+    try:
+        encrypted_key = user["openai_api_key"]
+        return base64.b64decode(encrypted_key.encode()).decode()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid API key format. Please reset your API key.")
+
+
+async def prepare_chat_frame(chat_request: OpenAIChatRequest):
+    """(PreparedFrame, savings report) for the captured frame, or (None, None) without one"""
+    if not chat_request.captured_frame:
+        return None, None
+    try:
+        frame, cached = await run_blocking(frame_preprocessor.prepare, chat_request.captured_frame)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return frame, frame.report(cached)
+
+
+def build_chat_completion_request(chat_request: OpenAIChatRequest, frame: Optional[PreparedFrame]) -> Dict[str, Any]:
+    # Build messages
+    messages = [
+        {
+            "role": "system",
+            "content": f"당신은 비디오 분석 전문 AI입니다. 사용자가 업로드한 영상에 대해 질문하면 도움이 되는 답변을 해주세요. 현재 업로드된 영상: {chat_request.video_file_name or '없음'}{'. 현재 일시정지된 화면의 스크린샷이 함께 제공됩니다.' if chat_request.captured_frame else ''}"
+        }
+    ]
+    
+    # Add user message with or without image
+    if frame is not None:
+        messages.append({
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": chat_request.message
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": frame.data_url,
+                        "detail": frame.detail
+                    }
+                }
+            ]
+        })
+    else:
+        messages.append({
+            "role": "user",
+            "content": chat_request.message
+        })
+    
+    return {
+        "model": "gpt-4o-mini",
+        "messages": messages,
+        "max_tokens": 500,
+        "temperature": 0.7
+    }
+
+
+def openai_http_error(openai_error: Exception) -> HTTPException:
+    import openai
+    if isinstance(openai_error, openai.AuthenticationError):
+        return HTTPException(status_code=401, detail="Invalid OpenAI API key. Please check your API key.")
+    if isinstance(openai_error, openai.RateLimitError):
+        return HTTPException(status_code=429, detail="OpenAI API rate limit exceeded. Please try again later.")
+    logger.error(f"OpenAI API error: {openai_error}")
+    return HTTPException(status_code=500, detail=f"OpenAI API error: {str(openai_error)}")
+
+
+async def answer_cache_key(chat_request: OpenAIChatRequest, frame: Optional[PreparedFrame]):
+    """(video_file_name, frame hash, question embedding), or None if the embedding cannot be computed"""
+    try:
+        embeddings = await embed_text([chat_request.message])
+    except Exception as e:
+        logger.warning(f"Answer cache skipped: {e}")
+        return None
+    return chat_request.video_file_name, frame.phash if frame is not None else None, embeddings[0]
+
+
+async def lookup_cached_answer(chat_request: OpenAIChatRequest, frame: Optional[PreparedFrame]):
+    """(cache key, cached (answer, similarity) or None); the key is None when caching is off"""
+    # Near-identical questions about the same frame of the same video reuse the answer
+    cache_key = await answer_cache_key(chat_request, frame) if settings.ANSWER_CACHE_ENABLED else None
+    if cache_key is None:
+        return None, None
+    if chat_request.bypass_cache:
+        answer_cache.record_bypass()
+        return cache_key, None
+    return cache_key, answer_cache.lookup(*cache_key)
+
 
 @app.post("/openai/chat")
 async def openai_chat(request: Request, chat_request: OpenAIChatRequest):
     try:
         user_id = get_user_id_from_request(request)
+        api_key = await get_user_openai_key(user_id)
         
-        # Get user's stored API key
-        user = users_collection.find_one({"user_id": user_id})
-        if not user or not user.get("openai_api_key"):
-            raise HTTPException(status_code=400, detail="OpenAI API key not found. Please set your API key first.")
-        
-        # Decrypt API key
-        import base64
-        try:
-            encrypted_key = user["openai_api_key"]
-            api_key = base64.b64decode(encrypted_key.encode()).decode()
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid API key format. Please reset your API key.")
+        frame, vision = await prepare_chat_frame(chat_request)
+        cache_key, cached = await lookup_cached_answer(chat_request, frame)
+        if cached is not None:
+            return {
+                "message": cached[0],
+                "status": "success",
+                "cached": True,
+                "similarity": round(cached[1], 4),
+                "vision": vision
+            }
         
         # Initialize OpenAI client
-        import openai
-        client = openai.OpenAI(api_key=api_key)
-        
-        # Build messages
-        messages = [
-            {
-                "role": "system",
-                "content": f"당신은 비디오 분석 전문 AI입니다. 사용자가 업로드한 영상에 대해 질문하면 도움이 되는 답변을 해주세요. 현재 업로드된 영상: {chat_request.video_file_name or '없음'}{'. 현재 일시정지된 화면의 스크린샷이 함께 제공됩니다.' if chat_request.captured_frame else ''}"
-            }
-        ]
-        
-        # Add user message with or without image
-        if chat_request.captured_frame:
-            messages.append({
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": chat_request.message
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": chat_request.captured_frame,
-                            "detail": "high"
-                        }
-                    }
-                ]
-            })
-        else:
-            messages.append({
-                "role": "user",
-                "content": chat_request.message
-            })
+        client = await run_blocking(openai_clients.get, user_id, api_key)
         
         # Call OpenAI API
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            ai_response = response.choices[0].message.content
-            
-            return {
-                "message": ai_response,
-                "status": "success"
-            }
-            
-        except openai.AuthenticationError:
-            raise HTTPException(status_code=401, detail="Invalid OpenAI API key. Please check your API key.")
-        except openai.RateLimitError:
-            raise HTTPException(status_code=429, detail="OpenAI API rate limit exceeded. Please try again later.")
+            response = await client.chat.completions.create(**build_chat_completion_request(chat_request, frame))
         except Exception as openai_error:
-            logger.error(f"OpenAI API error: {openai_error}")
-            raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(openai_error)}")
+            raise openai_http_error(openai_error)
+        
+        ai_response = response.choices[0].message.content
+        if cache_key is not None and ai_response:
+            answer_cache.store(*cache_key, ai_response)
+        
+        return {
+            "message": ai_response,
+            "status": "success",
+            "cached": False,
+            "vision": vision
+        }
             
     except HTTPException:
         raise
@@ -1232,6 +2041,95 @@ async def openai_chat(request: Request, chat_request: OpenAIChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/openai/chat/stream")
+async def openai_chat_stream(request: Request, chat_request: OpenAIChatStreamRequest):
+    """/openai/chat as Server-Sent Events: ``delta`` events carry answer tokens as
+    they arrive, then one ``done`` event (or ``error``) ends the stream.
+
+    Errors before the first token (missing key, auth, rate limit) are plain HTTP
+    errors. When the client disconnects, the upstream request is closed, which
+    stops generation.
+    """
+    try:
+        user_id = get_user_id_from_request(request)
+        api_key = await get_user_openai_key(user_id)
+        
+        frame, vision = await prepare_chat_frame(chat_request)
+        cache_key, cached = await lookup_cached_answer(chat_request, frame)
+        stream = None
+        if cached is None:
+            client = await run_blocking(openai_clients.get, user_id, api_key)
+            try:
+                stream = await client.chat.completions.create(
+                    **build_chat_completion_request(chat_request, frame), stream=True
+                )
+            except Exception as openai_error:
+                raise openai_http_error(openai_error)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in OpenAI chat stream: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        answer_parts = []
+        try:
+            if cached is not None:
+                answer_parts.append(cached[0])
+                yield sse_event("delta", {"content": cached[0]})
+            else:
+                async for chunk in stream:
+                    if await request.is_disconnected():
+                        logger.info(f"Client disconnected, stopping chat stream for user {user_id}")
+                        return
+                    content = chunk.choices[0].delta.content if chunk.choices else None
+                    if content:
+                        answer_parts.append(content)
+                        yield sse_event("delta", {"content": content})
+        except asyncio.CancelledError:
+            logger.info(f"Client disconnected, stopping chat stream for user {user_id}")
+            raise
+        except Exception as e:
+            logger.error(f"OpenAI stream error: {e}")
+            yield sse_event("error", {"detail": f"OpenAI API error: {str(e)}"})
+            return
+        finally:
+            # Also runs when the response task is cancelled on disconnect
+            if stream is not None:
+                await stream.close()
+
+        answer = "".join(answer_parts)
+        done = {"message": answer, "status": "success", "cached": cached is not None, "vision": vision}
+        if cached is not None:
+            done["similarity"] = round(cached[1], 4)
+        elif cache_key is not None and answer:
+            answer_cache.store(*cache_key, answer)
+
+        if chat_request.save_conversation and chat_request.message.strip() and answer.strip():
+            try:
+                conversation_id, document_id = await persist_conversation(
+                    user_id, chat_request.message, answer, chat_request.captured_frame,
+                    chat_request.timestamp, chat_request.video_id
+                )
+                done["conversation_id"] = conversation_id
+                done["document_id"] = str(document_id)
+            except Exception as e:
+                logger.error(f"Error saving streamed conversation: {e}")
+                done["save_error"] = str(e)
+        yield sse_event("done", done)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering (e.g. nginx) so tokens are not held back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 
 if __name__ == "__main__":
     import uvicorn
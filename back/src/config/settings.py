@@ -10,6 +10,9 @@ MODELS_DIR = DATA_DIR / "models"
 DB_DIR = DATA_DIR / "db"
 CACHE_DIR = DATA_DIR / "cache" 
 UPLOADS_DIR = DATA_DIR / "uploads"
+VIDEOS_DIR = DATA_DIR / "videos"
+VIDEO_FRAMES_DIR = UPLOADS_DIR / "frames"  # served under /uploads/frames
+BLOBS_DIR = UPLOADS_DIR / "blobs"  # content-addressed images, served under /blobs/<sha256>
 
 # Model cache directories
 CLIP_CACHE_DIR = MODELS_DIR / "clip"
@@ -25,6 +28,143 @@ MONGODB_URI = f"mongodb://localhost:27017/?directConnection=true"
 MONGODB_DB_NAME = "multimodal_rag"
 MONGODB_DATA_DIR = DB_DIR / "mongodb"
 
+# Shared MongoDB connection pool (one per process, i.e. per uvicorn worker)
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "32"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = 300000
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = 10000
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = 5000
+MONGODB_CONNECT_TIMEOUT_MS = 5000
+MONGODB_SOCKET_TIMEOUT_MS = 60000
+MONGODB_READ_PREFERENCE = "primary"
+MONGODB_WRITE_CONCERN = 1
+MONGODB_APP_NAME = "multimodal-rag-api"
+
+# Embedding micro-batching
+EMBEDDING_BATCHING_ENABLED = True
+EMBEDDING_BATCH_MAX_SIZE = 32
+EMBEDDING_BATCH_MAX_WAIT_MS = 5
+
+# Model loading: "background" (warm up after the server starts), "lazy" (on first use)
+# or "eager" (before the server accepts requests)
+MODEL_LOADING = os.getenv("MODEL_LOADING", "background")
+MODEL_WARMUP_MODELS = ["text", "clip"]
+
+# Query embedding cache (inside MultimodalEmbedder)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_MAX_ENTRIES = 10000
+EMBEDDING_CACHE_TTL_SECONDS = 24 * 3600
+EMBEDDING_CACHE_PERSIST = True  # save to EMBEDDING_CACHE_PATH on shutdown, load on startup
+EMBEDDING_CACHE_PATH = CACHE_DIR / "query_embeddings.npz"
+
+# Bulk ingestion pipeline
+BULK_INGEST_BATCH_SIZE = 64  # records per embedding forward pass
+BULK_INGEST_WRITE_BATCH_SIZE = 500  # documents per insert_many
+BULK_INGEST_DECODE_WORKERS = 4
+BULK_INGEST_MAX_ERRORS_REPORTED = 100
+
+# Server-side video ingestion (frame extraction needs opencv-python-headless)
+VIDEO_FRAME_SAMPLING = "keyframes"  # "keyframes" (skip near-duplicate frames) | "fps" (every sampled frame)
+VIDEO_SAMPLE_FPS = 1.0  # candidate frames per second of video
+VIDEO_KEYFRAME_HASH_THRESHOLD = 10  # min dHash Hamming distance (of 64 bits) from the last kept frame
+VIDEO_KEYFRAME_MAX_GAP_SECONDS = 30.0  # keep a frame at least this often even without scene changes
+VIDEO_EMBED_BATCH_SIZE = 32
+VIDEO_FRAME_MAX_SIDE = 640  # longest side of the stored frame JPEGs
+VIDEO_FRAME_JPEG_QUALITY = 85
+VIDEO_WORKERS = 1  # videos processed concurrently
+
+# Background job queue (MongoDB "jobs" collection)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # worker threads in the API process; 0 = standalone workers only
+JOB_TYPE_CONCURRENCY = {"extract_video_frames": VIDEO_WORKERS}  # per-process caps by job type
+JOB_POLL_INTERVAL_SECONDS = 1.0
+JOB_HEARTBEAT_SECONDS = 10
+JOB_STALE_SECONDS = 60  # running jobs without a heartbeat for this long are requeued
+JOB_MAX_ATTEMPTS = 3
+JOB_CANCEL_CHECK_SECONDS = 1.0
+JOB_RETENTION_SECONDS = 7 * 24 * 3600  # finished jobs are removed by a TTL index
+
+# Embedding storage in MongoDB
+EMBEDDING_STORAGE_FORMAT = "float32"  # "float32" | "float16" (packed BSON Binary) | "list"
+
+# Vector index configuration
+VECTOR_INDEX_TYPE = "ivf"  # "ivf" | "flat"
+VECTOR_INDEX_NLIST = 256
+VECTOR_INDEX_NPROBE = 16
+VECTOR_INDEX_MIN_CANDIDATES = 100
+VECTOR_INDEX_CANDIDATE_FACTOR = 10
+VECTOR_INDEX_BUILD_BATCH_SIZE = 10000
+# None | "int8" | "binary": keep compact codes in RAM instead of float32 vectors
+# (4x / 32x smaller) and rescore the candidates with full vectors from MongoDB
+VECTOR_INDEX_QUANTIZATION = os.getenv("VECTOR_INDEX_QUANTIZATION") or None
+VECTOR_INDEX_BINARY_OVERSAMPLE = 4  # binary codes are coarse, so rescore 4x more candidates
+
+# Metadata filters on vector searches
+METADATA_INDEX_AUTO_CREATE = True  # False only reports the suggested indexes under /metrics/search
+METADATA_INDEX_MIN_QUERIES = 20  # a metadata key gets a (content_type, metadata.<key>) index after this many filtered searches
+METADATA_INDEX_MAX_KEYS = 16
+FILTER_PREFILTER_MAX_IDS = 50000  # filters matching at most this many documents score only those ids
+FILTER_PREFILTER_MAX_SELECTIVITY = 0.2  # ... and only if they match at most this fraction of the collection
+FILTER_POSTFILTER_MAX_CANDIDATES = 10000  # post-filter candidate pool is widened by 1/selectivity up to this
+FILTER_ESTIMATE_TTL_SECONDS = 60
+
+# Conversation embedding cache (per user)
+CONVERSATION_CACHE_MAX_USERS = 1000
+CONVERSATION_CACHE_MAX_BYTES = 512 * 1024 * 1024
+CONVERSATION_CACHE_TTL_SECONDS = 300
+CONVERSATION_CACHE_QUANTIZATION = os.getenv("CONVERSATION_CACHE_QUANTIZATION") or None  # None | "int8" | "binary"
+
+# Per-video timelines (sorted timestamps) used for time-window queries
+TEMPORAL_INDEX_MAX_ENTRIES = 512  # (user, video) conversation timelines / video frame timelines kept in memory
+TEMPORAL_INDEX_TTL_SECONDS = 300
+
+# Executors for blocking work called from async endpoints
+INFERENCE_WORKERS = 2
+INFERENCE_MAX_PENDING = 64
+IO_WORKERS = 16
+IO_MAX_PENDING = 256
+EXECUTOR_QUEUE_TIMEOUT_SECONDS = 30
+
+# Chat room messages ("user_chat_messages", appended per save instead of rewriting the room)
+CHAT_MESSAGE_BUCKET_SIZE = 50  # messages per bucket document
+CHAT_MESSAGES_PAGE_SIZE = 100  # default page of GET /chatrooms/{room_id}/details
+CHAT_MESSAGES_MAX_PAGE_SIZE = 1000
+CHAT_ROOM_MIGRATION_WAIT_SECONDS = 5  # a save waits this long for another save migrating the same legacy room
+
+# Uploads
+MAX_IMAGE_UPLOAD_BYTES = 20 * 1024 * 1024  # ingest, frame and query images (413 above this)
+MAX_VIDEO_UPLOAD_BYTES = 4 * 1024 * 1024 * 1024
+UPLOAD_TEMP_TTL_SECONDS = 3600  # stale temporary upload files older than this are removed
+UPLOAD_CLEANUP_INTERVAL_SECONDS = 600
+
+# OpenAI API
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # e.g. a local OpenAI-compatible server for testing
+OPENAI_TIMEOUT_SECONDS = 60
+OPENAI_CLIENT_POOL_SIZE = 1000  # per-user AsyncOpenAI clients kept (LRU)
+OPENAI_MAX_CONNECTIONS = 100  # shared keep-alive connection pool of all clients
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 20
+OPENAI_KEEPALIVE_EXPIRY_SECONDS = 60
+
+# Captured frames sent to the vision model (see src/utils/vision_frames.py)
+VISION_DETAIL = os.getenv("VISION_DETAIL", "auto")  # "auto" | "low" | "high"
+VISION_LOW_DETAIL_MAX_EDGE_DENSITY = 0.01  # "auto": frames with less edge content than this use "low"
+VISION_TILE_SNAP_MIN_SCALE = 0.8  # shrink at most this far to save a row/column of 512px tiles
+VISION_IMAGE_FORMAT = "JPEG"  # "JPEG" | "WEBP"
+VISION_IMAGE_QUALITY = 85
+VISION_FRAME_CACHE_MAX_ENTRIES = 256
+VISION_BASE_TOKENS = 85  # token estimate: base + per 512px tile ("high"), base only ("low")
+VISION_TILE_TOKENS = 170
+
+# Users documents cached for per-request API key lookups
+USER_CACHE_MAX_ENTRIES = 10000
+USER_CACHE_TTL_SECONDS = 30
+
+# Semantic answer cache for /openai/chat, keyed by (video_file_name, frame perceptual hash)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.92"))  # bge-m3 cosine
+ANSWER_CACHE_FRAME_MAX_DISTANCE = 4  # frame hashes at most this many bits apart count as the same frame
+ANSWER_CACHE_MAX_ENTRIES = 10000
+ANSWER_CACHE_TTL_SECONDS = 3600
+
 # API configuration
 API_HOST = "0.0.0.0"
 API_PORT = 8000
@@ -37,7 +177,7 @@ LOG_FILE = LOG_DIR / "app.log"
 def ensure_directories():
     """Create all necessary directories if they don't exist"""
     directories = [
-        DATA_DIR, MODELS_DIR, DB_DIR, CACHE_DIR, UPLOADS_DIR,
+        DATA_DIR, MODELS_DIR, DB_DIR, CACHE_DIR, UPLOADS_DIR, VIDEOS_DIR, VIDEO_FRAMES_DIR, BLOBS_DIR,
         CLIP_CACHE_DIR, TEXT_CACHE_DIR, TRANSFORMERS_CACHE_DIR, LOG_DIR, MONGODB_DATA_DIR
     ]
     
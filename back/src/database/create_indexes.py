@@ -98,6 +98,16 @@ def create_indexes():
             name="idx_user_room_access"
         )
         
+        logger.info("Creating indexes for user_chat_messages collection...")
+        
+        # One bucket document per (user_id, room_id, bucket) of CHAT_MESSAGE_BUCKET_SIZE messages
+        user_chat_messages_collection = db_client.get_collection("user_chat_messages")
+        user_chat_messages_collection.create_index(
+            [("user_id", 1), ("room_id", 1), ("bucket", 1)],
+            unique=True,
+            name="idx_room_message_buckets"
+        )
+        
         logger.info("All indexes created successfully!")
         return True
         
@@ -120,7 +130,8 @@ def list_indexes():
         collections = [
             ("users", db_client.get_collection("users")),
             ("user_conversations", db_client.get_collection("user_conversations")),
-            ("user_chat_rooms", db_client.get_collection("user_chat_rooms"))
+            ("user_chat_rooms", db_client.get_collection("user_chat_rooms")),
+            ("user_chat_messages", db_client.get_collection("user_chat_messages"))
         ]
         
         for collection_name, collection in collections:
@@ -0,0 +1,64 @@
+from typing import Any, Dict, Iterable, Optional, Union, List
+
+import numpy as np
+from bson.binary import Binary
+
+from ..config import settings
+
+# User-defined BSON binary subtypes tagging the packed little-endian dtype
+FLOAT32_SUBTYPE = 0x80
+FLOAT16_SUBTYPE = 0x81
+
+_SUBTYPE_DTYPES = {
+    FLOAT32_SUBTYPE: np.dtype("<f4"),
+    FLOAT16_SUBTYPE: np.dtype("<f2"),
+}
+_FORMAT_SUBTYPES = {
+    "float32": FLOAT32_SUBTYPE,
+    "float16": FLOAT16_SUBTYPE,
+}
+
+EMBEDDING_FIELDS = (
+    "text_embedding",
+    "image_embedding",
+    "multimodal_embedding",
+    "question_embedding",
+    "answer_embedding",
+    "combined_embedding",
+)
+
+
+def encode_embedding(vector: Any, storage_format: Optional[str] = None) -> Union[Binary, List[float], None]:
+    """Encode an embedding for MongoDB according to ``EMBEDDING_STORAGE_FORMAT``."""
+    if vector is None or isinstance(vector, Binary):
+        return vector
+    storage_format = storage_format or settings.EMBEDDING_STORAGE_FORMAT
+    if storage_format == "list":
+        return np.asarray(vector, dtype=np.float32).tolist() if isinstance(vector, np.ndarray) else list(vector)
+    if storage_format not in _FORMAT_SUBTYPES:
+        raise ValueError(f"Unknown embedding storage format: {storage_format}")
+    subtype = _FORMAT_SUBTYPES[storage_format]
+    packed = np.asarray(vector, dtype=_SUBTYPE_DTYPES[subtype]).tobytes()
+    return Binary(packed, subtype)
+
+
+def decode_embedding(value: Any) -> Optional[np.ndarray]:
+    """Decode a stored embedding; packed binaries are read with np.frombuffer without copying."""
+    if value is None:
+        return None
+    if isinstance(value, Binary):
+        dtype = _SUBTYPE_DTYPES.get(value.subtype)
+        if dtype is None:
+            raise ValueError(f"Unsupported embedding binary subtype: {value.subtype}")
+        return np.frombuffer(value, dtype=dtype)
+    if isinstance(value, np.ndarray):
+        return value
+    return np.asarray(value, dtype=np.float32)
+
+
+def encode_document_embeddings(doc: Dict[str, Any], storage_format: Optional[str] = None,
+                               fields: Iterable[str] = EMBEDDING_FIELDS) -> Dict[str, Any]:
+    for field in fields:
+        if doc.get(field) is not None:
+            doc[field] = encode_embedding(doc[field], storage_format)
+    return doc
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Conversation image migration script
+Moves base64 ``question_image`` strings (and legacy per-frame files) of
+existing conversations into the content-addressed blob store, leaving only
+the ``image_hash`` in each document
+"""
+
+import sys
+import base64
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from pymongo import UpdateOne
+from src.database.mongodb_client import MongoDBClient
+from src.utils.blob_store import BlobStore
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _image_bytes(conv):
+    question_image = conv.get("question_image")
+    if question_image:
+        return base64.b64decode(question_image.split(',')[1] if ',' in question_image else question_image)
+    image_path = conv.get("image_path")
+    if image_path and Path(image_path).exists():
+        return Path(image_path).read_bytes()
+    return None
+
+
+def migrate_conversations(collection, blob_store: BlobStore, batch_size: int = 200, dry_run: bool = False):
+    query = {
+        "image_hash": None,
+        "$or": [{"question_image": {"$nin": [None, ""]}}, {"image_path": {"$nin": [None, ""]}}]
+    }
+    projection = {"question_image": 1, "image_path": 1}
+
+    operations = []
+    migrated = 0
+    failed = 0
+    legacy_paths = set()
+    for conv in collection.find(query, projection, batch_size=batch_size):
+        try:
+            data = _image_bytes(conv)
+        except Exception as e:
+            logger.warning(f"  Skipping conversation {conv['_id']}: undecodable image ({e})")
+            failed += 1
+            continue
+
+        update = {"$unset": {"question_image": "", "image_path": "", "shared_frame": ""}}
+        if data is not None and not dry_run:
+            update["$set"] = {"image_hash": blob_store.put(data)}
+        if conv.get("image_path"):
+            legacy_paths.add(conv["image_path"])
+
+        migrated += 1
+        operations.append(UpdateOne({"_id": conv["_id"]}, update))
+        if len(operations) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(operations, ordered=False)
+            operations = []
+            logger.info(f"  {collection.name}: {migrated} conversations migrated")
+
+    if operations and not dry_run:
+        collection.bulk_write(operations, ordered=False)
+    return migrated, failed, legacy_paths
+
+
+def delete_legacy_files(collection, legacy_paths) -> int:
+    deleted = 0
+    for image_path in legacy_paths:
+        # Still referenced by a conversation that could not be migrated
+        if collection.count_documents({"image_path": image_path}, limit=1):
+            continue
+        path = Path(image_path)
+        if path.exists():
+            path.unlink()
+            deleted += 1
+    return deleted
+
+
+def migrate_blobs(batch_size: int = 200, dry_run: bool = False, delete_legacy: bool = False) -> bool:
+    """Move conversation images of every user into the blob store"""
+
+    db_client = MongoDBClient()
+    if not db_client.connect():
+        logger.error("Failed to connect to MongoDB")
+        return False
+
+    try:
+        collection = db_client.get_collection("user_conversations")
+        migrated, failed, legacy_paths = migrate_conversations(collection, BlobStore(), batch_size, dry_run)
+        action = "would be migrated" if dry_run else "migrated"
+        logger.info(f"user_conversations: {migrated} conversations {action}, {failed} skipped")
+
+        if delete_legacy and not dry_run:
+            deleted = delete_legacy_files(collection, legacy_paths)
+            logger.info(f"Deleted {deleted} legacy frame image files")
+        return True
+    except Exception as e:
+        logger.error(f"Error migrating conversation images: {e}")
+        return False
+    finally:
+        db_client.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move conversation images into the content-addressed blob store")
+    parser.add_argument("--batch-size", type=int, default=200, help="Documents per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Count documents without writing")
+    parser.add_argument("--delete-legacy-files", action="store_true",
+                        help="Remove the old frame_*.jpg files once no conversation references them")
+
+    args = parser.parse_args()
+
+    if migrate_blobs(args.batch_size, args.dry_run, args.delete_legacy_files):
+        logger.info("Conversation image migration completed successfully")
+    else:
+        logger.error("Conversation image migration failed")
+        sys.exit(1)
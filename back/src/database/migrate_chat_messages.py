@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Chat room message migration script
+Moves the embedded ``messages`` of chat rooms saved before the message
+buckets into "user_chat_messages" (and their base64 ``captured_frame`` into
+the blob store). Rooms are otherwise migrated one by one on their next save.
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.database.mongodb_client import MongoDBClient
+from src.utils.blob_store import BlobStore
+from src.utils.chat_messages import ChatMessageStore
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate_chat_messages(dry_run: bool = False) -> bool:
+    """Move the messages of every legacy chat room into message buckets"""
+
+    db_client = MongoDBClient()
+    if not db_client.connect():
+        logger.error("Failed to connect to MongoDB")
+        return False
+
+    try:
+        rooms_collection = db_client.get_collection("user_chat_rooms")
+        query = {"messages": {"$exists": True}}
+        if dry_run:
+            logger.info(f"user_chat_rooms: {rooms_collection.count_documents(query)} rooms would be migrated")
+            return True
+
+        store = ChatMessageStore()
+        store.create_indexes()
+        blob_store = BlobStore()
+        rooms = messages = failed = 0
+        for room in rooms_collection.find(query, {"user_id": 1, "room_id": 1}):
+            try:
+                messages += store.migrate_room(rooms_collection, room["user_id"], room["room_id"], blob_store)
+                rooms += 1
+            except Exception as e:
+                logger.warning(f"  Skipping room {room['room_id']}: {e}")
+                failed += 1
+            if rooms and rooms % 100 == 0:
+                logger.info(f"  user_chat_rooms: {rooms} rooms migrated")
+
+        logger.info(f"user_chat_rooms: {rooms} rooms ({messages} messages) migrated, {failed} skipped")
+        return True
+    except Exception as e:
+        logger.error(f"Error migrating chat room messages: {e}")
+        return False
+    finally:
+        db_client.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move embedded chat room messages into bucketed message documents")
+    parser.add_argument("--dry-run", action="store_true", help="Count rooms without writing")
+
+    args = parser.parse_args()
+
+    if migrate_chat_messages(args.dry_run):
+        logger.info("Chat room message migration completed successfully")
+    else:
+        logger.error("Chat room message migration failed")
+        sys.exit(1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Embedding storage migration script
+Converts embedding fields of existing documents in place to the configured
+storage format (packed float32/float16 BSON Binary, or plain arrays)
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from bson.binary import Binary
+from pymongo import UpdateOne
+from src.config import settings
+from src.database.mongodb_client import MongoDBClient
+from src.database.embedding_codec import EMBEDDING_FIELDS, decode_embedding, encode_embedding
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTIONS = ["multimodal_documents", "user_conversations", "conversations"]
+
+
+def _needs_conversion(value, storage_format: str) -> bool:
+    if storage_format == "list":
+        return isinstance(value, Binary)
+    return not isinstance(value, Binary) or value.subtype != encode_embedding([0.0], storage_format).subtype
+
+
+def migrate_collection(collection, storage_format: str, batch_size: int = 500, dry_run: bool = False) -> int:
+    projection = {field: 1 for field in EMBEDDING_FIELDS}
+    query = {"$or": [{field: {"$exists": True, "$ne": None}} for field in EMBEDDING_FIELDS]}
+
+    operations = []
+    converted = 0
+    for doc in collection.find(query, projection, batch_size=batch_size):
+        updates = {}
+        for field in EMBEDDING_FIELDS:
+            value = doc.get(field)
+            if value is not None and _needs_conversion(value, storage_format):
+                updates[field] = encode_embedding(decode_embedding(value), storage_format)
+        if not updates:
+            continue
+
+        converted += 1
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+        if len(operations) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(operations, ordered=False)
+            operations = []
+            logger.info(f"  {collection.name}: {converted} documents converted")
+
+    if operations and not dry_run:
+        collection.bulk_write(operations, ordered=False)
+    return converted
+
+
+def migrate_embeddings(storage_format: str, collection_names, batch_size: int = 500, dry_run: bool = False) -> bool:
+    """Convert embedding fields of the given collections to ``storage_format``"""
+
+    db_client = MongoDBClient()
+    if not db_client.connect():
+        logger.error("Failed to connect to MongoDB")
+        return False
+
+    try:
+        for collection_name in collection_names:
+            logger.info(f"Migrating {collection_name} embeddings to {storage_format}...")
+            converted = migrate_collection(
+                db_client.get_collection(collection_name), storage_format, batch_size, dry_run
+            )
+            action = "would be converted" if dry_run else "converted"
+            logger.info(f"{collection_name}: {converted} documents {action}")
+        return True
+    except Exception as e:
+        logger.error(f"Error migrating embeddings: {e}")
+        return False
+    finally:
+        db_client.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate stored embeddings to a new storage format")
+    parser.add_argument("--format", choices=["float32", "float16", "list"],
+                        default=settings.EMBEDDING_STORAGE_FORMAT, help="Target storage format")
+    parser.add_argument("--collections", nargs="+", default=DEFAULT_COLLECTIONS, help="Collections to migrate")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Count documents without writing")
+
+    args = parser.parse_args()
+
+    if migrate_embeddings(args.format, args.collections, args.batch_size, args.dry_run):
+        logger.info("Embedding migration completed successfully")
+    else:
+        logger.error("Embedding migration failed")
+        sys.exit(1)
@@ -1,5 +1,8 @@
 import os
-from pymongo import MongoClient
+import time
+import threading
+from collections import deque
+from pymongo import MongoClient, monitoring
 from pymongo.errors import ConnectionFailure
 from typing import Optional, Dict, Any
 import logging
@@ -8,18 +11,155 @@ from ..config import settings
 logger = logging.getLogger(__name__)
 
 
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Connection pool counters and check-out wait times for the shared client"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.pools_cleared = 0
+        self.wait_ms = deque(maxlen=window)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        # Check-out runs synchronously on the requesting thread
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures[str(event.reason)] = self.checkout_failures.get(str(event.reason), 0) + 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        waited_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_ms.append(waited_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self.wait_ms)
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pools_cleared": self.pools_cleared,
+                "wait_ms_mean": sum(waits) / len(waits) if waits else 0.0,
+                "wait_ms_p99": waits[int(len(waits) * 0.99)] if waits else 0.0,
+                "wait_ms_max": waits[-1] if waits else 0.0
+            }
+
+
+# One MongoClient (one pool, one set of monitor threads) per process, shared by
+# every MongoDBClient; closed when the last MongoDBClient is closed
+_shared_lock = threading.Lock()
+_shared_client: Optional[MongoClient] = None
+_shared_pid: Optional[int] = None
+_shared_refs = 0
+_pool_listener = PoolStatsListener()
+
+
+def _client_options() -> Dict[str, Any]:
+    return {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+        "readPreference": settings.MONGODB_READ_PREFERENCE,
+        "w": settings.MONGODB_WRITE_CONCERN,
+        "appname": settings.MONGODB_APP_NAME,
+        "event_listeners": [_pool_listener]
+    }
+
+
+def get_shared_client() -> MongoClient:
+    global _shared_client, _shared_pid, _shared_refs
+    with _shared_lock:
+        # A client inherited through fork() must not be reused by the child
+        if _shared_client is None or _shared_pid != os.getpid():
+            _shared_client = MongoClient(settings.MONGODB_URI, **_client_options())
+            _shared_pid = os.getpid()
+            _shared_refs = 0
+            logger.info(f"Created shared MongoDB client (maxPoolSize={settings.MONGODB_MAX_POOL_SIZE})")
+        _shared_refs += 1
+        return _shared_client
+
+
+def _release_shared_client():
+    global _shared_client, _shared_refs
+    with _shared_lock:
+        _shared_refs -= 1
+        if _shared_refs <= 0 and _shared_client is not None:
+            _shared_client.close()
+            _shared_client = None
+            _shared_refs = 0
+            logger.info("MongoDB connection closed")
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    return {
+        "client_created": _shared_client is not None,
+        "references": _shared_refs,
+        "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+        **_pool_listener.stats()
+    }
+
+
 class MongoDBClient:
     def __init__(self):
         self.client: Optional[MongoClient] = None
         self.db = None
         self.collection = None
-        
-    def connect(self) -> bool:
+
+    def connect(self, verify: bool = True) -> bool:
+        # With verify=False the server is contacted on the first operation instead
         try:
-            self.client = MongoClient(settings.MONGODB_URI)
-            self.client.admin.command('ping')
+            if self.client is None:
+                self.client = get_shared_client()
+            if verify:
+                self.client.admin.command('ping')
             self.db = self.client[settings.MONGODB_DB_NAME]
-            
+
             logger.info(f"Successfully connected to MongoDB: {settings.MONGODB_URI} -> {settings.MONGODB_DB_NAME}")
             logger.info(f"MongoDB data will be stored in: {settings.DB_DIR}")
             return True
@@ -27,13 +167,14 @@ class MongoDBClient:
             logger.error(f"Failed to connect to MongoDB: {e}")
             logger.info(f"Make sure MongoDB is running and accessible at {settings.MONGODB_URI}")
             return False
-    
+
     def get_collection(self, collection_name: str):
         if self.db is None:
             self.connect()
         return self.db[collection_name]
-    
+
     def close(self):
         if self.client:
-            self.client.close()
-            logger.info("MongoDB connection closed")
\ No newline at end of file
+            self.client = None
+            self.db = None
+            _release_shared_client()
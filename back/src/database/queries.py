@@ -0,0 +1,34 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .embedding_codec import decode_embedding, EMBEDDING_FIELDS
+
+# Embedding fields are only needed for ranking, never in responses
+EXCLUDE_EMBEDDINGS = {field: 0 for field in EMBEDDING_FIELDS}
+
+
+def fetch_embeddings(collection, mongo_query: Dict[str, Any], embedding_field: str,
+                     batch_size: int = 10000) -> Tuple[List[Any], List[Any]]:
+    """Phase one: load only ``_id`` and a single embedding field for ranking."""
+    doc_ids, embeddings = [], []
+    query = dict(mongo_query)
+    query.setdefault(embedding_field, {"$exists": True})
+    cursor = collection.find(query, {"_id": 1, embedding_field: 1}, batch_size=batch_size)
+    for doc in cursor:
+        doc_ids.append(doc["_id"])
+        embeddings.append(decode_embedding(doc.get(embedding_field)))
+    return doc_ids, embeddings
+
+
+def fetch_documents_by_ids(collection, doc_ids: Sequence[Any],
+                           projection: Optional[Dict[str, Any]] = None,
+                           extra_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Phase two: load the final documents with one ``$in`` query, in ``doc_ids`` order."""
+    if not doc_ids:
+        return []
+    query = dict(extra_filter or {})
+    query["_id"] = {"$in": list(doc_ids)}
+    documents = {
+        doc["_id"]: doc
+        for doc in collection.find(query, EXCLUDE_EMBEDDINGS if projection is None else projection)
+    }
+    return [documents[doc_id] for doc_id in doc_ids if doc_id in documents]
@@ -1,11 +1,12 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
 
 
 class ContentType(str, Enum):
     TEXT = "text"
+    IMAGE = "image"
     FRAME = "frame"
     CHAT = "chat"
     MULTIMODAL = "multimodal"
@@ -18,9 +19,10 @@ class Document(BaseModel):
     text_content: Optional[str] = None
     image_path: Optional[str] = None
     image_url: Optional[str] = None
-    text_embedding: Optional[List[float]] = None
-    image_embedding: Optional[List[float]] = None
-    multimodal_embedding: Optional[List[float]] = None
+    image_hash: Optional[str] = None  # SHA-256 of the image in the blob store
+    text_embedding: Optional[Union[List[float], bytes]] = None
+    image_embedding: Optional[Union[List[float], bytes]] = None
+    multimodal_embedding: Optional[Union[List[float], bytes]] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -40,6 +42,7 @@ class SearchQuery(BaseModel):
     top_k: int = 10
     threshold: Optional[float] = None
     metadata_filter: Optional[Dict[str, Any]] = None
+    exact: bool = False  # Brute-force scan instead of the vector index
 
 
 class SearchResult(BaseModel):
@@ -57,6 +60,10 @@ class VideoInfo(BaseModel):
     width: Optional[int] = None
     height: Optional[int] = None
     fps: Optional[float] = None
+    frame_count: Optional[int] = None
+    status: str = "uploaded"  # uploaded | processing | ready | failed | cancelled
+    frames_indexed: int = 0
+    error: Optional[str] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -74,7 +81,7 @@ class FrameData(BaseModel):
     frame_number: int
     timestamp: float
     image_path: str
-    image_embedding: Optional[List[float]] = None
+    image_embedding: Optional[Union[List[float], bytes]] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -92,7 +99,7 @@ class ChatData(BaseModel):
     timestamp: float
     chat_text: str
     username: Optional[str] = None
-    text_embedding: Optional[List[float]] = None
+    text_embedding: Optional[Union[List[float], bytes]] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -159,9 +166,9 @@ class ConversationData(BaseModel):
     context: Dict[str, Any] = Field(default_factory=dict)
     metadata: Dict[str, Any] = Field(default_factory=dict)
     timestamp: float = Field(default=0.0)
-    question_embedding: Optional[List[float]] = None
-    answer_embedding: Optional[List[float]] = None
-    combined_embedding: Optional[List[float]] = None
+    question_embedding: Optional[Union[List[float], bytes]] = None
+    answer_embedding: Optional[Union[List[float], bytes]] = None
+    combined_embedding: Optional[Union[List[float], bytes]] = None
     tags: List[str] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -175,6 +182,10 @@ class ConversationData(BaseModel):
 class ConversationSearchRequest(BaseModel):
     query: str
     top_k: int = 10
+    # Optional time window: only conversations of this video between start_time and end_time are scored
+    video_id: Optional[str] = None
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
 
 
 class ConversationSearchResult(BaseModel):
@@ -192,9 +203,12 @@ class ChatRoomData(BaseModel):
     room_id: str
     name: str
     description: Optional[str] = None
+    # Messages live in "user_chat_messages" buckets; only rooms saved before that embed them
     messages: List[Dict[str, Any]] = Field(default_factory=list)
+    last_message: Optional[Dict[str, Any]] = None
     video_context: Dict[str, Any] = Field(default_factory=dict)
     captured_frame: Optional[str] = None
+    image_hash: Optional[str] = None
     frame_time: Optional[str] = None
     video_current_time: Optional[float] = None
     video_id: Optional[str] = None
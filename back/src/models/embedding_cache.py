@@ -0,0 +1,139 @@
+import os
+import time
+import hashlib
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    # Same query modulo Unicode form or whitespace should hit the same entry
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"text:{model_name}:{digest}"
+
+
+def image_key(model_name: str, image: Union[str, Image.Image]) -> str:
+    hasher = hashlib.sha1()
+    if isinstance(image, Image.Image):
+        hasher.update(f"{image.mode}:{image.size}".encode())
+        hasher.update(image.tobytes())
+    else:
+        with open(image, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+    return f"image:{model_name}:{hasher.hexdigest()}"
+
+
+class EmbeddingCache:
+    """Thread-safe LRU/TTL cache of single embedding vectors keyed by strings.
+
+    Entries expire ``ttl_seconds`` after insertion; the least recently used
+    entry is evicted once ``max_entries`` is exceeded. With ``persist_path``
+    the cache can be saved to and loaded from a .npz file.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 persist_path: Optional[Union[str, Path]] = None):
+        self.max_entries = max_entries or settings.EMBEDDING_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.EMBEDDING_CACHE_TTL_SECONDS
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl_seconds:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, vector: np.ndarray, created_at: Optional[float] = None):
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self.entries[key] = (vector, created_at or time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> int:
+        path = Path(path or self.persist_path)
+        with self._lock:
+            items = list(self.entries.items())
+        arrays: Dict[str, Any] = {
+            "keys": np.array([key for key, _ in items], dtype=str),
+            "created_at": np.array([created_at for _, (_, created_at) in items], dtype=np.float64)
+        }
+        for i, (_, (vector, _)) in enumerate(items):
+            arrays[f"v{i}"] = vector
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved {len(items)} cached embeddings to {path}")
+        return len(items)
+
+    def load(self, path: Optional[Union[str, Path]] = None) -> int:
+        path = Path(path or self.persist_path)
+        if not path.exists():
+            return 0
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                keys = data["keys"]
+                created = data["created_at"]
+                now = time.time()
+                loaded = 0
+                # Oldest first so the LRU order survives the round trip
+                for i, key in enumerate(keys):
+                    if now - created[i] <= self.ttl_seconds:
+                        self.put(str(key), data[f"v{i}"], float(created[i]))
+                        loaded += 1
+        except Exception as e:
+            logger.warning(f"Could not load embedding cache from {path}: {e}")
+            return 0
+        logger.info(f"Loaded {loaded} cached embeddings from {path}")
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,223 @@
+import time
+import queue
+import asyncio
+import threading
+import logging
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _EncodeRequest:
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+def _set_result(future: Future, result: Any):
+    # A caller that gave up may have cancelled its future; that must not kill the batcher
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: Future, error: BaseException):
+    if not future.done():
+        future.set_exception(error)
+
+
+class _BatchStats:
+    def __init__(self):
+        self.requests = 0
+        self.items = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.batch_sizes: Counter = Counter()
+        self.total_wait_ms = 0.0
+
+    def record(self, batch: List[_EncodeRequest], batch_size: int):
+        now = time.monotonic()
+        self.requests += len(batch)
+        self.items += batch_size
+        self.batches += 1
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.batch_sizes[batch_size] += 1
+        self.total_wait_ms += sum((now - request.enqueued_at) * 1000 for request in batch)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "items": self.items,
+            "batches": self.batches,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "mean_queue_wait_ms": self.total_wait_ms / self.requests if self.requests else 0.0
+        }
+
+
+class EmbeddingScheduler:
+    """Dynamic micro-batching in front of MultimodalEmbedder.
+
+    Concurrent embed_text / embed_image calls are queued per modality and a
+    background worker runs one batched forward pass for everything collected
+    within ``max_wait_ms`` or up to ``max_batch_size`` items. It exposes the
+    same embed_* methods as MultimodalEmbedder, so it can be passed anywhere an
+    embedder is expected.
+    """
+
+    MODALITIES = ("text", "image")
+
+    def __init__(self, embedder=None, max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None):
+        self._embedder = embedder
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_BATCH_MAX_WAIT_MS) / 1000
+        self.queues: Dict[str, "queue.Queue[_EncodeRequest]"] = {m: queue.Queue() for m in self.MODALITIES}
+        self.stats_by_modality: Dict[str, _BatchStats] = {m: _BatchStats() for m in self.MODALITIES}
+        self.cache_hits = 0
+        self._workers: Dict[str, threading.Thread] = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from .embeddings import MultimodalEmbedder
+            self._embedder = MultimodalEmbedder()
+        return self._embedder
+
+    def start(self):
+        with self._lock:
+            self._stop.clear()
+            for modality in self.MODALITIES:
+                worker = self._workers.get(modality)
+                if worker is None or not worker.is_alive():
+                    worker = threading.Thread(
+                        target=self._run, args=(modality,), name=f"embedding-batcher-{modality}", daemon=True
+                    )
+                    worker.start()
+                    self._workers[modality] = worker
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for worker in self._workers.values():
+            worker.join(timeout)
+        self._workers = {}
+
+    def _lookup_cached(self, modality: str, items: List[Any]) -> Optional[np.ndarray]:
+        # Only text keys are cheap enough to compute on the caller's thread (image keys hash
+        # the file), and only once the embedder exists, as loading it must not happen here
+        if modality != "text" or self._embedder is None or not hasattr(self._embedder, "lookup_cached"):
+            return None
+        if not all(isinstance(item, str) for item in items):
+            return None
+        return self._embedder.lookup_cached(modality, [item.strip() for item in items])
+
+    def _submit(self, modality: str, items: Union[Any, List[Any]]) -> Future:
+        if not isinstance(items, list):
+            items = [items]
+
+        cached = self._lookup_cached(modality, items)
+        if cached is not None:
+            self.cache_hits += 1
+            future: Future = Future()
+            future.set_result(cached)
+            return future
+
+        worker = self._workers.get(modality)
+        if worker is None or not worker.is_alive():
+            self.start()
+        request = _EncodeRequest(items)
+        self.queues[modality].put(request)
+        return request.future
+
+    def _collect(self, modality: str) -> List[_EncodeRequest]:
+        pending = self.queues[modality]
+        try:
+            first = pending.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        size = len(first.items)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.items)
+        return batch
+
+    def _encode(self, modality: str, items: List[Any]) -> np.ndarray:
+        if modality == "text":
+            return self.embedder.embed_text(items)
+        return self.embedder.embed_image(items)
+
+    def _run(self, modality: str):
+        while not self._stop.is_set():
+            # Requests whose callers already gave up (cancelled futures) are not encoded
+            batch = [request for request in self._collect(modality) if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            items = [item for request in batch for item in request.items]
+            self.stats_by_modality[modality].record(batch, len(items))
+            try:
+                embeddings = self._encode(modality, items)
+            except Exception as e:
+                logger.warning(f"Batched {modality} encode of {len(items)} items failed, retrying per request: {e}")
+                for request in batch:
+                    try:
+                        _set_result(request.future, self._encode(modality, request.items))
+                    except Exception as request_error:
+                        _set_exception(request.future, request_error)
+                continue
+
+            offset = 0
+            for request in batch:
+                _set_result(request.future, embeddings[offset:offset + len(request.items)])
+                offset += len(request.items)
+
+    def embed_text(self, texts: Union[str, List[str]]) -> np.ndarray:
+        return self._submit("text", texts).result()
+
+    def embed_image(self, images) -> np.ndarray:
+        return self._submit("image", images).result()
+
+    async def embed_text_async(self, texts: Union[str, List[str]]) -> np.ndarray:
+        return await asyncio.wrap_future(self._submit("text", texts))
+
+    async def embed_image_async(self, images) -> np.ndarray:
+        return await asyncio.wrap_future(self._submit("image", images))
+
+    def embed_multimodal(self, texts, images) -> np.ndarray:
+        return self.embedder.embed_multimodal(texts, images)
+
+    def embed_multimodal_components(self, texts, images) -> Dict[str, np.ndarray]:
+        return self.embedder.embed_multimodal_components(texts, images)
+
+    def compute_similarity(self, query_embedding: np.ndarray, document_embeddings: np.ndarray) -> np.ndarray:
+        return self.embedder.compute_similarity(query_embedding, document_embeddings)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            modality: {
+                "queue_depth": self.queues[modality].qsize(),
+                **self.stats_by_modality[modality].as_dict()
+            }
+            for modality in self.MODALITIES
+        }
+        stats["served_from_cache"] = self.cache_hits
+        return stats
@@ -1,17 +1,25 @@
-import torch
+import time
+import threading
 import numpy as np
 from PIL import Image
-from typing import List, Union, Optional
-from transformers import CLIPProcessor, CLIPModel
-from sentence_transformers import SentenceTransformer
+from typing import Dict, List, Union, Optional
 import logging
 import os
 from ..config import settings
+from .embedding_cache import EmbeddingCache, text_key, image_key
 
 logger = logging.getLogger(__name__)
 
+MODEL_NAMES = ("text", "clip")
+
 
 class MultimodalEmbedder:
+    """CLIP (image/multimodal) and sentence-transformer (text) encoders.
+
+    Constructing the embedder is cheap. torch/transformers are imported and
+    each model is loaded on first use (or by ``load``), so an endpoint only
+    pays for the model it actually needs.
+    """
     _instance = None
     _initialized = False
     
@@ -23,32 +31,140 @@ class MultimodalEmbedder:
     def __init__(self):
         if MultimodalEmbedder._initialized:
             return
-            
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        
+        self._device = None
+        self._clip_model = None
+        self._clip_processor = None
+        self._text_model = None
+        self._load_locks = {name: threading.Lock() for name in MODEL_NAMES}
+        self.load_seconds: Dict[str, float] = {}
+        
+        # Cache of query embeddings; repeated searches skip the encoder
+        self.cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.cache = EmbeddingCache(
+                persist_path=settings.EMBEDDING_CACHE_PATH if settings.EMBEDDING_CACHE_PERSIST else None
+            )
+            if self.cache.persist_path is not None:
+                self.cache.load()
+        
+        MultimodalEmbedder._initialized = True
+        logger.info(f"CLIP model: {settings.CLIP_MODEL_NAME} (cached in {settings.CLIP_CACHE_DIR})")
+        logger.info(f"Text model: {settings.TEXT_MODEL_NAME} (cached in {settings.TEXT_CACHE_DIR})")
+        logger.info(f"Data directory: {settings.DATA_DIR}")
+    
+    @property
+    def device(self):
+        if self._device is None:
+            import torch
+            self._device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        return self._device
+    
+    def _load_clip(self):
+        from transformers import CLIPProcessor, CLIPModel
         
         # CLIP model for image and multimodal embeddings
-        self.clip_model = CLIPModel.from_pretrained(
+        self._clip_processor = CLIPProcessor.from_pretrained(
             settings.CLIP_MODEL_NAME,
             cache_dir=str(settings.CLIP_CACHE_DIR)
-        ).to(self.device)
-        self.clip_processor = CLIPProcessor.from_pretrained(
+        )
+        self._clip_model = CLIPModel.from_pretrained(
             settings.CLIP_MODEL_NAME,
             cache_dir=str(settings.CLIP_CACHE_DIR)
-        )
+        ).to(self.device)
+    
+    def _load_text(self):
+        from sentence_transformers import SentenceTransformer
         
         # Sentence transformer for text embeddings
-        self.text_model = SentenceTransformer(
+        self._text_model = SentenceTransformer(
             settings.TEXT_MODEL_NAME,
             cache_folder=str(settings.TEXT_CACHE_DIR)
         )
-        
-        MultimodalEmbedder._initialized = True
-        logger.info(f"Initialized models on {self.device}")
-        logger.info(f"CLIP model: {settings.CLIP_MODEL_NAME} (cached in {settings.CLIP_CACHE_DIR})")
-        logger.info(f"Text model: {settings.TEXT_MODEL_NAME} (cached in {settings.TEXT_CACHE_DIR})")
-        logger.info(f"Data directory: {settings.DATA_DIR}")
     
-    def embed_text(self, texts: Union[str, List[str]]) -> np.ndarray:
+    def is_loaded(self, name: str) -> bool:
+        if name == "clip":
+            return self._clip_model is not None
+        return self._text_model is not None
+    
+    def load(self, names=MODEL_NAMES):
+        """Load the given models ("text", "clip") if they are not loaded yet"""
+        for name in names:
+            if name not in self._load_locks:
+                raise ValueError(f"Unknown model: {name}")
+            if self.is_loaded(name):
+                continue
+            with self._load_locks[name]:
+                if self.is_loaded(name):
+                    continue
+                started = time.perf_counter()
+                if name == "clip":
+                    self._load_clip()
+                else:
+                    self._load_text()
+                self.load_seconds[name] = time.perf_counter() - started
+                logger.info(f"Loaded {name} model on {self.device} in {self.load_seconds[name]:.1f}s")
+    
+    @property
+    def clip_model(self):
+        if self._clip_model is None:
+            self.load(["clip"])
+        return self._clip_model
+    
+    @property
+    def clip_processor(self):
+        if self._clip_processor is None or self._clip_model is None:
+            self.load(["clip"])
+        return self._clip_processor
+    
+    @property
+    def text_model(self):
+        if self._text_model is None:
+            self.load(["text"])
+        return self._text_model
+    
+    def _cache_keys(self, modality: str, items: list) -> List[str]:
+        if modality == "text":
+            return [text_key(settings.TEXT_MODEL_NAME, item) for item in items]
+        return [image_key(settings.CLIP_MODEL_NAME, item) for item in items]
+    
+    def _embed_cached(self, modality: str, items: list, encode) -> np.ndarray:
+        # Encode only the items missing from the cache, in one batch
+        keys = self._cache_keys(modality, items)
+        vectors = [self.cache.get(key) for key in keys]
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], i)
+        if missing:
+            embeddings = encode([items[i] for i in missing.values()])
+            computed = dict(zip(missing, embeddings))
+            for key, embedding in computed.items():
+                self.cache.put(key, embedding)
+            vectors = [computed[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        return np.stack(vectors).astype(np.float32, copy=False)
+    
+    def lookup_cached(self, modality: str, items: list) -> Optional[np.ndarray]:
+        """Embeddings for ``items`` if every one of them is cached, else None"""
+        if self.cache is None:
+            return None
+        try:
+            keys = self._cache_keys(modality, items)
+        except Exception:
+            return None
+        vectors = []
+        for key in keys:
+            vector = self.cache.get(key)
+            if vector is None:
+                return None
+            vectors.append(vector)
+        return np.stack(vectors)
+    
+    def save_cache(self):
+        if self.cache is not None and self.cache.persist_path is not None:
+            self.cache.save()
+    
+    def embed_text(self, texts: Union[str, List[str]], use_cache: bool = True) -> np.ndarray:
         if isinstance(texts, str):
             texts = [texts]
         
@@ -62,6 +178,11 @@ class MultimodalEmbedder:
         # Clean texts
         cleaned_texts = [str(text).strip() for text in texts]
         
+        if use_cache and self.cache is not None:
+            return self._embed_cached("text", cleaned_texts, self._encode_texts)
+        return self._encode_texts(cleaned_texts)
+    
+    def _encode_texts(self, cleaned_texts: List[str]) -> np.ndarray:
         try:
             embeddings = self.text_model.encode(cleaned_texts, convert_to_numpy=True)
             return embeddings
@@ -69,10 +190,16 @@ class MultimodalEmbedder:
             logger.error(f"Error encoding texts {cleaned_texts}: {e}")
             raise ValueError(f"Failed to encode text: {str(e)}")
     
-    def embed_image(self, images: Union[Image.Image, List[Image.Image], str, List[str]]) -> np.ndarray:
+    def embed_image(self, images: Union[Image.Image, List[Image.Image], str, List[str]],
+                    use_cache: bool = True) -> np.ndarray:
         if isinstance(images, (str, Image.Image)):
             images = [images]
         
+        if use_cache and self.cache is not None:
+            return self._embed_cached("image", list(images), self._encode_images)
+        return self._encode_images(images)
+    
+    def _encode_images(self, images: List[Union[Image.Image, str]]) -> np.ndarray:
         # Load images if paths are provided
         loaded_images = []
         for img in images:
@@ -82,6 +209,7 @@ class MultimodalEmbedder:
                 loaded_images.append(img)
         
         # Process images with CLIP
+        import torch
         inputs = self.clip_processor(images=loaded_images, return_tensors="pt").to(self.device)
         
         with torch.no_grad():
@@ -95,6 +223,15 @@ class MultimodalEmbedder:
     
     def embed_multimodal(self, texts: Union[str, List[str]], 
                         images: Union[Image.Image, List[Image.Image], str, List[str]]) -> np.ndarray:
+        return self.embed_multimodal_components(texts, images)["multimodal"]
+    
+    def embed_multimodal_components(self, texts: Union[str, List[str]],
+                                    images: Union[Image.Image, List[Image.Image], str, List[str]]) -> Dict[str, np.ndarray]:
+        """Normalized CLIP "image", "text" and fused "multimodal" embeddings for (text, image) pairs.
+        
+        Runs the vision and text towers once each; the image embeddings equal
+        embed_image() and the fused ones equal the full CLIPModel forward.
+        """
         if isinstance(texts, str):
             texts = [texts]
         if isinstance(images, (str, Image.Image)):
@@ -109,23 +246,27 @@ class MultimodalEmbedder:
                 loaded_images.append(img)
         
         # Process with CLIP
+        import torch
         inputs = self.clip_processor(text=texts, images=loaded_images, 
-                                   return_tensors="pt", padding=True).to(self.device)
+                                   return_tensors="pt", padding=True, truncation=True).to(self.device)
         
         with torch.no_grad():
-            outputs = self.clip_model(**inputs)
-            # Combine image and text features
-            image_embeds = outputs.image_embeds
-            text_embeds = outputs.text_embeds
+            image_embeds = self.clip_model.get_image_features(pixel_values=inputs["pixel_values"])
+            text_embeds = self.clip_model.get_text_features(
+                input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]
+            )
+            image_embeds = image_embeds / image_embeds.norm(p=2, dim=-1, keepdim=True)
+            text_embeds = text_embeds / text_embeds.norm(p=2, dim=-1, keepdim=True)
             
             # Average pooling of image and text embeddings
-            multimodal_embeds = (image_embeds + text_embeds) / 2
-            multimodal_embeds = multimodal_embeds.cpu().numpy()
+            multimodal_embeds = ((image_embeds + text_embeds) / 2).cpu().numpy()
+            image_embeds = image_embeds.cpu().numpy()
+            text_embeds = text_embeds.cpu().numpy()
         
         # Normalize
         multimodal_embeds = multimodal_embeds / np.linalg.norm(multimodal_embeds, axis=1, keepdims=True)
         
-        return multimodal_embeds
+        return {"image": image_embeds, "text": text_embeds, "multimodal": multimodal_embeds}
     
     def compute_similarity(self, query_embedding: np.ndarray, 
                           document_embeddings: np.ndarray) -> np.ndarray:
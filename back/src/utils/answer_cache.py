@@ -0,0 +1,125 @@
+import time
+import threading
+import logging
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .scoring import normalize_rows
+from .image_hash import hamming_distance
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedAnswer:
+    def __init__(self, group: Hashable, embedding: np.ndarray, answer: str):
+        self.group = group
+        self.embedding = embedding
+        self.answer = answer
+        self.created_at = time.monotonic()
+
+
+class SemanticAnswerCache:
+    """LRU/TTL cache of chat answers, grouped by (video_file_name, frame hash),
+    the frame hash being the perceptual hash from ``image_hash.dhash``.
+
+    A question hits when a cached question of a matching group (same video,
+    frame hashes at most ANSWER_CACHE_FRAME_MAX_DISTANCE bits apart) has an
+    embedding cosine similarity of at least ANSWER_CACHE_SIMILARITY_THRESHOLD.
+    Groups hold only a handful of questions, so lookups are a small matmul.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 threshold: Optional[float] = None, frame_max_distance: Optional[int] = None):
+        self.max_entries = max_entries or settings.ANSWER_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ANSWER_CACHE_TTL_SECONDS
+        self.threshold = threshold if threshold is not None else settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+        self.frame_max_distance = (
+            frame_max_distance if frame_max_distance is not None else settings.ANSWER_CACHE_FRAME_MAX_DISTANCE
+        )
+        self.entries: "OrderedDict[int, _CachedAnswer]" = OrderedDict()
+        # video_file_name -> frame hash (None without a frame) -> entry ids
+        self.groups: Dict[Optional[str], Dict[Optional[int], List[int]]] = {}
+        self._ids = count()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _matching_groups(self, video: Optional[str], frame: Optional[int]) -> List[List[int]]:
+        frames = self.groups.get(video, {})
+        if frame is None:
+            return [frames[None]] if None in frames else []
+        return [
+            entry_ids for cached_frame, entry_ids in frames.items()
+            if cached_frame is not None and hamming_distance(cached_frame, frame) <= self.frame_max_distance
+        ]
+
+    def _remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id)
+        video, frame = entry.group
+        frames = self.groups[video]
+        frames[frame].remove(entry_id)
+        if not frames[frame]:
+            del frames[frame]
+            if not frames:
+                del self.groups[video]
+
+    def lookup(self, video: Optional[str], frame: Optional[int],
+               embedding: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Cached (answer, similarity) of the most similar question, if any"""
+        query = normalize_rows(embedding)[0]
+        now = time.monotonic()
+        with self._lock:
+            candidates = []
+            for entry_ids in self._matching_groups(video, frame):
+                for entry_id in list(entry_ids):
+                    if now - self.entries[entry_id].created_at > self.ttl_seconds:
+                        self._remove(entry_id)
+                    else:
+                        candidates.append(entry_id)
+            if candidates:
+                scores = np.stack([self.entries[entry_id].embedding for entry_id in candidates]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.entries.move_to_end(candidates[best])
+                    self.hits += 1
+                    return self.entries[candidates[best]].answer, float(scores[best])
+            self.misses += 1
+            return None
+
+    def store(self, video: Optional[str], frame: Optional[int], embedding: np.ndarray, answer: str):
+        entry_id = next(self._ids)
+        entry = _CachedAnswer((video, frame), normalize_rows(embedding)[0], answer)
+        with self._lock:
+            # The new answer supersedes cached answers to the same question
+            for old_id in list(self.groups.get(video, {}).get(frame, [])):
+                if float(self.entries[old_id].embedding @ entry.embedding) >= self.threshold:
+                    self._remove(old_id)
+            self.entries[entry_id] = entry
+            self.groups.setdefault(video, {}).setdefault(frame, []).append(entry_id)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "videos": len(self.groups),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "similarity_threshold": self.threshold
+            }
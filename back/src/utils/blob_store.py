@@ -0,0 +1,170 @@
+import io
+import os
+import uuid
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Optional
+
+from PIL import Image
+from pymongo import ReturnDocument
+
+from ..config import settings
+from ..database.mongodb_client import MongoDBClient
+from .uploads import iter_capped
+
+logger = logging.getLogger(__name__)
+
+
+def is_digest(value: str) -> bool:
+    return len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+
+class BlobStore:
+    """Content-addressed file store for uploaded images.
+
+    Files live at ``<root>/ab/cd/<sha256>`` and identical bytes are stored
+    once. The "blobs" collection keeps one row per digest with its content
+    type, size and a reference count; the file is removed when the last
+    reference is released.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or settings.BLOBS_DIR)
+        self.db_client = MongoDBClient()
+        self.db_client.connect(verify=False)
+        self.collection = self.db_client.get_collection("blobs")
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    @staticmethod
+    def url(digest: str) -> str:
+        return f"/blobs/{digest}"
+
+    def put(self, data: bytes, content_type: Optional[str] = None) -> str:
+        """Store bytes (if new) and add one reference; returns the SHA-256 hex digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        # The reference is taken before the file is checked, so a concurrent release()
+        # of the last reference either sees it or finishes before the check
+        self._add_reference(digest, len(data), self._sniff_content_type(io.BytesIO(data)) or content_type)
+        try:
+            path = self.path(digest)
+            if not path.exists():
+                temp_path = self._temp_path()
+                try:
+                    temp_path.write_bytes(data)
+                    self._move_into_place(temp_path, path)
+                finally:
+                    temp_path.unlink(missing_ok=True)
+        except Exception:
+            self.release(digest)
+            raise
+        return digest
+
+    def put_stream(self, stream: BinaryIO, content_type: Optional[str] = None,
+                   max_bytes: Optional[int] = None) -> str:
+        """Like put() for a file object, hashed and written in 1 MB chunks;
+        raises UploadTooLarge past ``max_bytes`` without keeping anything"""
+        temp_path = self._temp_path()
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in iter_capped(stream, max_bytes or settings.MAX_IMAGE_UPLOAD_BYTES):
+                    sha256.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            digest = sha256.hexdigest()
+            self._add_reference(digest, size, self._sniff_content_type(temp_path) or content_type)
+            try:
+                path = self.path(digest)
+                if not path.exists():
+                    self._move_into_place(temp_path, path)
+            except Exception:
+                self.release(digest)
+                raise
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return digest
+
+    def _temp_path(self) -> Path:
+        # Interrupted writes leave .tmp-* files that cleanup_stale_uploads removes
+        self.root.mkdir(parents=True, exist_ok=True)
+        return self.root / f".tmp-{uuid.uuid4().hex}"
+
+    def _move_into_place(self, temp_path: Path, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, path)
+
+    def _add_reference(self, digest: str, size: int, content_type: Optional[str]):
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {"_id": digest},
+            {
+                "$inc": {"refcount": 1},
+                "$set": {"last_referenced_at": now},
+                "$setOnInsert": {
+                    "size": size,
+                    "content_type": content_type or "application/octet-stream",
+                    "created_at": now
+                }
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    def _sniff_content_type(source) -> Optional[str]:
+        try:
+            with Image.open(source) as image:
+                return Image.MIME.get(image.format)
+        except Exception:
+            return None
+
+    def acquire(self, digest: str):
+        self.collection.update_one({"_id": digest}, {"$inc": {"refcount": 1}})
+
+    def release(self, digest: str) -> bool:
+        """Drop one reference; returns True if that removed the blob"""
+        blob = self.collection.find_one_and_update(
+            {"_id": digest}, {"$inc": {"refcount": -1}}, return_document=ReturnDocument.AFTER
+        )
+        if blob is None or blob["refcount"] > 0:
+            return False
+        # Only the caller whose delete succeeds removes the file
+        if self.collection.delete_one({"_id": digest, "refcount": {"$lte": 0}}).deleted_count == 0:
+            return False
+        self._remove_file(digest)
+        logger.info(f"Deleted blob {digest}")
+        return True
+
+    def _remove_file(self, digest: str):
+        # Moved aside first: a put() that re-referenced the digest meanwhile may already
+        # have seen the file, so it is moved back if the row exists again
+        path = self.path(digest)
+        temp_path = self._temp_path()
+        try:
+            os.replace(path, temp_path)
+        except FileNotFoundError:
+            return
+        if self.collection.find_one({"_id": digest}, {"_id": 1}) is not None:
+            os.replace(temp_path, path)
+        else:
+            temp_path.unlink(missing_ok=True)
+
+    def release_many(self, digests: Iterable[Optional[str]]) -> int:
+        return sum(1 for digest in digests if digest and self.release(digest))
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        if not is_digest(digest):
+            return None
+        return self.collection.find_one({"_id": digest})
+
+    def stats(self) -> Dict[str, Any]:
+        totals = list(self.collection.aggregate([
+            {"$group": {"_id": None, "blobs": {"$sum": 1}, "bytes": {"$sum": "$size"}, "references": {"$sum": "$refcount"}}}
+        ]))
+        if not totals:
+            return {"blobs": 0, "bytes": 0, "references": 0}
+        return {key: totals[0][key] for key in ("blobs", "bytes", "references")}
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Streaming bulk ingestion
+Records (dicts with ``text``, ``image_path`` or ``image_base64``, optional
+``metadata`` and ``content_type``) are pulled lazily from any iterator,
+images are decoded on a thread pool one batch ahead, every batch is
+embedded with one forward pass per model and documents are written with
+unordered insert_many in chunks on a background thread.
+
+    python -m src.utils.bulk_ingestion frames.ndjson [more.ndjson ...]
+"""
+
+import io
+import sys
+import json
+import time
+import base64
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from PIL import Image
+from pymongo.errors import BulkWriteError
+
+from ..config import settings
+from ..database.schemas import Document, ContentType
+from .blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+# Runs ``func(*args, **kwargs)`` somewhere else (e.g. the model executor) and returns its result
+EmbedRunner = Callable[..., Any]
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def iter_ndjson(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Parse NDJSON from an iterable of byte chunks without buffering the whole body.
+
+    Malformed lines are yielded as InvalidRecord so they are reported per
+    record instead of aborting the stream.
+    """
+    # Only the new chunk is scanned for newlines; the partial last line is kept as
+    # pieces, so a long (base64) line spread over many chunks is joined just once
+    pending: List[bytes] = []
+    line_number = 0
+    for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            line = b"".join(pending) + chunk[start:end] if pending else chunk[start:end]
+            pending = []
+            start = end + 1
+            line_number += 1
+            if line.strip():
+                yield _parse_line(line, line_number)
+        if start < len(chunk):
+            pending.append(chunk[start:])
+    tail = b"".join(pending)
+    if tail.strip():
+        yield _parse_line(tail, line_number + 1)
+
+
+def _parse_line(line: bytes, line_number: int) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return InvalidRecord(f"line {line_number}: invalid JSON ({e})")
+
+
+class _Item:
+    def __init__(self, position: int, record: Any):
+        self.position = position
+        self.record = record
+        self.text: Optional[str] = None
+        self.image: Optional[Image.Image] = None
+        self.image_path: Optional[str] = None
+        self.image_hash: Optional[str] = None
+        self.content_type: Optional[ContentType] = None
+        self.error: Optional[str] = None
+
+
+class BulkIngestPipeline:
+    """Decode -> embed -> write pipeline with bounded memory.
+
+    At most two embedding batches of decoded images and ``write_batch_size``
+    pending documents are held at once, and only one insert_many is in flight.
+    """
+
+    def __init__(self, ingestion, batch_size: Optional[int] = None, write_batch_size: Optional[int] = None,
+                 decode_workers: Optional[int] = None, progress_callback: Optional[ProgressCallback] = None,
+                 embed_runner: Optional[EmbedRunner] = None, image_root: Optional[Path] = None):
+        self.ingestion = ingestion
+        self.embedder = ingestion.embedder
+        self.collection = ingestion.collection
+        self.batch_size = batch_size or settings.BULK_INGEST_BATCH_SIZE
+        self.write_batch_size = write_batch_size or settings.BULK_INGEST_WRITE_BATCH_SIZE
+        self.decode_workers = decode_workers or settings.BULK_INGEST_DECODE_WORKERS
+        self.progress_callback = progress_callback
+        # Only the per-batch forward passes go through the runner, not the whole stream
+        self.embed_runner = embed_runner or (lambda func, *args, **kwargs: func(*args, **kwargs))
+        # ``image_path`` must resolve inside this directory; None trusts any path (CLI use)
+        self.image_root = Path(image_root).resolve() if image_root is not None else None
+        self.stats: Dict[str, Any] = {
+            "received": 0,
+            "embedded": 0,
+            "inserted": 0,
+            "failed": 0,
+            "batches": 0,
+            "errors": [],
+            "elapsed_seconds": 0.0,
+            "docs_per_second": 0.0
+        }
+        self._started = 0.0
+        self._lock = threading.Lock()
+        # Blob references taken for records whose documents are not written yet, by position
+        self._unwritten: Dict[int, str] = {}
+
+    def run(self, records: Iterable[Any]) -> Dict[str, Any]:
+        try:
+            return self._run(records)
+        finally:
+            # An aborted stream (client gone, embed/write error) leaves decoded records that
+            # never got a document; the pools have drained by now, so nothing else takes them
+            if self._unwritten:
+                logger.warning(f"Releasing {len(self._unwritten)} blob references of unwritten bulk records")
+                self._release_unwritten(list(self._unwritten))
+
+    def _run(self, records: Iterable[Any]) -> Dict[str, Any]:
+        self._started = time.perf_counter()
+        pending_docs: List[Dict[str, Any]] = []
+        pending_positions: List[int] = []
+        write_future: Optional[Future] = None
+
+        with ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="bulk-decode") as decode_pool, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-write") as write_pool:
+            batches = self._batches(records)
+            next_batch = next(batches, None)
+            decoding = self._submit_decode(decode_pool, next_batch)
+
+            while decoding is not None:
+                items = [future.result() for future in decoding]
+                # Decode the next batch while this one is embedded
+                next_batch = next(batches, None)
+                decoding = self._submit_decode(decode_pool, next_batch)
+
+                for item, doc in zip(*self._embed_batch(items)):
+                    pending_docs.append(doc)
+                    pending_positions.append(item.position)
+
+                if len(pending_docs) >= self.write_batch_size:
+                    if write_future is not None:
+                        write_future.result()
+                    write_future = write_pool.submit(self._write, pending_docs, pending_positions)
+                    pending_docs, pending_positions = [], []
+
+                self.stats["batches"] += 1
+                self._report_progress()
+
+            if write_future is not None:
+                write_future.result()
+            if pending_docs:
+                self._write(pending_docs, pending_positions)
+
+        self._report_progress()
+        logger.info(
+            f"Bulk ingest finished: {self.stats['inserted']} inserted, {self.stats['failed']} failed "
+            f"in {self.stats['elapsed_seconds']:.1f}s"
+        )
+        return self.stats
+
+    def _batches(self, records: Iterable[Any]) -> Iterator[List[_Item]]:
+        batch: List[_Item] = []
+        for record in records:
+            batch.append(_Item(self.stats["received"], record))
+            self.stats["received"] += 1
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _submit_decode(self, pool: ThreadPoolExecutor, batch: Optional[List[_Item]]) -> Optional[List[Future]]:
+        if batch is None:
+            return None
+        return [pool.submit(self._prepare, item) for item in batch]
+
+    def _prepare(self, item: _Item) -> _Item:
+        try:
+            record = item.record
+            if isinstance(record, InvalidRecord):
+                raise record
+            if not isinstance(record, dict):
+                raise InvalidRecord(f"record must be an object, got {type(record).__name__}")
+
+            text = record.get("text")
+            if text is not None:
+                if not isinstance(text, str) or not text.strip():
+                    raise InvalidRecord("text must be a non-empty string")
+                item.text = text.strip()
+
+            data = None
+            if record.get("image_base64"):
+                data = base64.b64decode(record["image_base64"])
+                item.image = Image.open(io.BytesIO(data)).convert("RGB")
+            elif record.get("image_path"):
+                image_path = self._resolve_image_path(record["image_path"])
+                with Image.open(image_path) as image:
+                    item.image = image.convert("RGB")
+                item.image_path = str(image_path)
+
+            if item.text is None and item.image is None:
+                raise InvalidRecord("record needs text, image_path or image_base64")
+            if not isinstance(record.get("metadata") or {}, dict):
+                raise InvalidRecord("metadata must be an object")
+
+            if record.get("content_type"):
+                item.content_type = ContentType(record["content_type"])
+            elif item.text is not None and item.image is not None:
+                item.content_type = ContentType.MULTIMODAL
+            elif item.image is not None:
+                item.content_type = ContentType.IMAGE
+            else:
+                item.content_type = ContentType.TEXT
+
+            # Stored only once the record is valid, so a rejected record holds no blob
+            # reference; repeated images in a backfill are stored once
+            if data is not None:
+                item.image_hash = self.ingestion.blob_store.put(data)
+                with self._lock:
+                    self._unwritten[item.position] = item.image_hash
+                item.image_path = str(self.ingestion.blob_store.path(item.image_hash))
+        except Exception as e:
+            item.error = str(e)
+            item.image = None
+        return item
+
+    def _resolve_image_path(self, image_path: Any) -> Path:
+        if not isinstance(image_path, str):
+            raise InvalidRecord("image_path must be a string")
+        if self.image_root is None:
+            return Path(image_path)
+        resolved = (self.image_root / image_path).resolve()
+        if not resolved.is_relative_to(self.image_root):
+            raise InvalidRecord("image_path must be inside the uploads directory")
+        return resolved
+
+    def _release_unwritten(self, positions: Iterable[int]):
+        with self._lock:
+            digests = [self._unwritten.pop(position, None) for position in positions]
+        self.ingestion.blob_store.release_many(digests)
+
+    def _embed_batch(self, items: List[_Item]):
+        for item in items:
+            if item.error:
+                self._record_error(item.position, item.error)
+        items = [item for item in items if not item.error]
+        if not items:
+            return [], []
+
+        with_text = [item for item in items if item.text is not None]
+        with_both = [item for item in with_text if item.image is not None]
+        image_only = [item for item in items if item.image is not None and item.text is None]
+
+        def embed():
+            # One forward pass per model and tower for the whole batch; pairs get their
+            # image and fused embeddings from the same CLIP vision pass
+            text_embeddings = self.embedder.embed_text(
+                [item.text for item in with_text], use_cache=False
+            ) if with_text else []
+            image_embeddings = self.embedder.embed_image(
+                [item.image for item in image_only], use_cache=False
+            ) if image_only else []
+            pair_embeddings = self.embedder.embed_multimodal_components(
+                [item.text for item in with_both], [item.image for item in with_both]
+            ) if with_both else {"image": [], "multimodal": []}
+            return text_embeddings, image_embeddings, pair_embeddings
+
+        try:
+            text_embeddings, image_embeddings, pair_embeddings = self.embed_runner(embed)
+        except Exception as e:
+            logger.error(f"Failed to embed bulk batch of {len(items)} records: {e}")
+            for item in items:
+                self._record_error(item.position, f"embedding failed: {e}")
+            self._release_unwritten(item.position for item in items)
+            return [], []
+
+        vectors: Dict[int, Dict[str, List[float]]] = {id(item): {} for item in items}
+        for item, embedding in zip(with_text, text_embeddings):
+            vectors[id(item)]["text_embedding"] = embedding.tolist()
+        for item, embedding in zip(image_only, image_embeddings):
+            vectors[id(item)]["image_embedding"] = embedding.tolist()
+        for item, image_embedding, multimodal_embedding in zip(
+                with_both, pair_embeddings["image"], pair_embeddings["multimodal"]):
+            vectors[id(item)]["image_embedding"] = image_embedding.tolist()
+            vectors[id(item)]["multimodal_embedding"] = multimodal_embedding.tolist()
+
+        now = datetime.utcnow()
+        docs = []
+        for item in items:
+            document = Document(
+                content_type=item.content_type,
+                text_content=item.text,
+                image_path=item.image_path,
+                image_hash=item.image_hash,
+                image_url=BlobStore.url(item.image_hash) if item.image_hash else None,
+                metadata=item.record.get("metadata") or {},
+                created_at=now,
+                updated_at=now,
+                **vectors[id(item)]
+            )
+            docs.append(self.ingestion._to_mongo(document))
+            # Decoded pixels are no longer needed once embedded
+            item.image = None
+
+        self.stats["embedded"] += len(items)
+        return items, docs
+
+    def _write(self, docs: List[Dict[str, Any]], positions: List[int]):
+        failed_indexes = set()
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed_indexes.add(error["index"])
+                self._record_error(positions[error["index"]], error.get("errmsg", "write failed"))
+            self._release_unwritten(positions[i] for i in failed_indexes)
+        except Exception as e:
+            logger.error(f"Failed to write bulk chunk of {len(docs)} documents: {e}")
+            for position in positions:
+                self._record_error(position, f"write failed: {e}")
+            self._release_unwritten(positions)
+            return
+
+        # The written documents now own their blob references
+        with self._lock:
+            for position in positions:
+                self._unwritten.pop(position, None)
+
+        # insert_many sets _id on each document before sending
+        for i, doc in enumerate(docs):
+            if i not in failed_indexes:
+                self.ingestion.index_registry.add_document(doc["_id"], doc)
+        with self._lock:
+            self.stats["inserted"] += len(docs) - len(failed_indexes)
+
+    def _record_error(self, position: int, message: str):
+        # Called from both the embedding and the writer thread
+        with self._lock:
+            self.stats["failed"] += 1
+            if len(self.stats["errors"]) < settings.BULK_INGEST_MAX_ERRORS_REPORTED:
+                self.stats["errors"].append({"record": position, "error": message})
+
+    def _report_progress(self):
+        elapsed = time.perf_counter() - self._started
+        self.stats["elapsed_seconds"] = round(elapsed, 3)
+        self.stats["docs_per_second"] = round(self.stats["inserted"] / elapsed, 1) if elapsed > 0 else 0.0
+        if self.stats["batches"] % 50 == 0:
+            logger.info(
+                f"Bulk ingest progress: {self.stats['received']} received, {self.stats['inserted']} inserted, "
+                f"{self.stats['failed']} failed"
+            )
+        if self.progress_callback is not None:
+            with self._lock:
+                snapshot = {**self.stats, "errors": list(self.stats["errors"])}
+            self.progress_callback(snapshot)
+
+
+def _iter_files(paths: List[str]) -> Iterator[Any]:
+    for path in paths:
+        if path == "-":
+            yield from iter_ndjson(iter(lambda: sys.stdin.buffer.read(1 << 20), b""))
+            continue
+        with open(path, "rb") as f:
+            yield from iter_ndjson(iter(lambda: f.read(1 << 20), b""))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .data_ingestion import DataIngestion
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Bulk ingest NDJSON records into multimodal_documents")
+    parser.add_argument("files", nargs="+", help="NDJSON files ('-' for stdin)")
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_INGEST_BATCH_SIZE,
+                        help="Records per embedding batch")
+    parser.add_argument("--write-batch-size", type=int, default=settings.BULK_INGEST_WRITE_BATCH_SIZE,
+                        help="Documents per insert_many")
+    parser.add_argument("--decode-workers", type=int, default=settings.BULK_INGEST_DECODE_WORKERS)
+
+    args = parser.parse_args()
+
+    stats = DataIngestion().bulk_ingest(
+        _iter_files(args.files), args.batch_size, args.write_batch_size, args.decode_workers
+    )
+    print(json.dumps(stats, indent=2))
+    if stats["failed"]:
+        sys.exit(1)
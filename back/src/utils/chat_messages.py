@@ -0,0 +1,147 @@
+import time
+import base64
+import logging
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+from ..config import settings
+from ..database.mongodb_client import MongoDBClient
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRoomMigrating(RuntimeError):
+    pass
+
+
+class ChatMessageStore:
+    """Append-only chat room messages in the "user_chat_messages" collection.
+
+    Message ``seq`` n of a room lives in bucket ``n // bucket_size``, one
+    document per ``(user_id, room_id, bucket)``. Saving a turn pushes only the
+    new messages into at most a couple of buckets, and reading a page touches
+    only the buckets that cover it, so neither grows with the room.
+    """
+
+    def __init__(self, bucket_size: Optional[int] = None):
+        self.bucket_size = bucket_size or settings.CHAT_MESSAGE_BUCKET_SIZE
+        self.db_client = MongoDBClient()
+        self.db_client.connect(verify=False)
+        self.collection = self.db_client.get_collection("user_chat_messages")
+
+    def create_indexes(self):
+        self.collection.create_index(
+            [("user_id", 1), ("room_id", 1), ("bucket", 1)], unique=True, name="idx_room_message_buckets"
+        )
+
+    def append(self, user_id: str, room_id: str, first_seq: int, messages: List[Dict[str, Any]]) -> int:
+        """Store ``messages`` as seq first_seq, first_seq + 1, ...; one upsert per touched bucket"""
+        now = datetime.utcnow()
+        operations = []
+        numbered = enumerate(messages, start=first_seq)
+        for bucket, group in groupby(numbered, key=lambda item: item[0] // self.bucket_size):
+            docs = [{**message, "seq": seq} for seq, message in group]
+            operations.append(UpdateOne(
+                {"user_id": user_id, "room_id": room_id, "bucket": bucket},
+                {
+                    "$push": {"messages": {"$each": docs}},
+                    "$inc": {"count": len(docs)},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"created_at": now}
+                },
+                upsert=True
+            ))
+        if operations:
+            self.collection.bulk_write(operations, ordered=True)
+        return len(messages)
+
+    def page(self, user_id: str, room_id: str, end_seq: int, limit: int) -> List[Dict[str, Any]]:
+        """Messages with seq in [end_seq - limit, end_seq), oldest first"""
+        start_seq = max(0, end_seq - limit)
+        if end_seq <= start_seq:
+            return []
+        buckets = self.collection.find(
+            {
+                "user_id": user_id,
+                "room_id": room_id,
+                "bucket": {"$gte": start_seq // self.bucket_size, "$lte": (end_seq - 1) // self.bucket_size}
+            },
+            {"messages": 1}
+        ).sort("bucket", 1)
+        messages = [
+            message
+            for bucket in buckets
+            for message in bucket.get("messages", [])
+            if start_seq <= message.get("seq", -1) < end_seq
+        ]
+        messages.sort(key=lambda message: message["seq"])
+        return messages
+
+    def reserve(self, rooms_collection, user_id: str, room_id: str, update: Dict[str, Any],
+                projection: Dict[str, Any], blob_store=None) -> Optional[Dict[str, Any]]:
+        """Apply a save's room upsert (which reserves seqs with ``$max`` on
+        ``stats.message_count``) and return the room as it was before, or None if new.
+
+        A legacy room with embedded ``messages`` has no message_count yet, so it is
+        migrated first (which sets the count to the legacy messages and drops this
+        reservation) and the upsert is repeated. While another save is migrating it,
+        this waits up to CHAT_ROOM_MIGRATION_WAIT_SECONDS, then raises ChatRoomMigrating.
+        """
+        key = {"user_id": user_id, "room_id": room_id}
+        projection = {**projection, "messages": {"$slice": 1}, "migrating": 1}
+        deadline = time.monotonic() + settings.CHAT_ROOM_MIGRATION_WAIT_SECONDS
+        while True:
+            previous = rooms_collection.find_one_and_update(
+                key, update, projection=projection, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+            if previous is None or "messages" not in previous:
+                return previous
+            if not previous.get("migrating"):
+                self.migrate_room(rooms_collection, user_id, room_id, blob_store)
+            elif time.monotonic() > deadline:
+                raise ChatRoomMigrating(f"Messages of chat room {room_id} are still being migrated")
+            else:
+                time.sleep(0.1)
+
+    def migrate_room(self, rooms_collection, user_id: str, room_id: str, blob_store=None) -> int:
+        """Move a room saved with embedded ``messages`` (and a base64
+        ``captured_frame``) to the bucketed layout; returns the messages moved"""
+        key = {"user_id": user_id, "room_id": room_id}
+        # The marker keeps concurrent saves of the same legacy room from migrating it twice
+        room = rooms_collection.find_one_and_update(
+            {**key, "messages": {"$exists": True}, "migrating": {"$exists": False}},
+            {"$set": {"migrating": True}},
+            projection={"messages": 1, "captured_frame": 1, "image_hash": 1}
+        )
+        if room is None:
+            return 0
+
+        messages = room.get("messages") or []
+        # $set, not $max: saves that reserved seqs while the room was still legacy
+        # did not append anything (see reserve), so the legacy count is the truth
+        update = {"$unset": {"messages": "", "migrating": ""}, "$set": {"stats.message_count": len(messages)}}
+        try:
+            self.append(user_id, room_id, 0, messages)
+            if messages:
+                update["$set"]["last_message"] = messages[-1]
+            frame = room.get("captured_frame")
+            if blob_store is not None and frame and not room.get("image_hash"):
+                try:
+                    data = base64.b64decode(frame.split(',')[1] if ',' in frame else frame)
+                except ValueError as e:
+                    logger.warning(f"Keeping undecodable captured_frame of room {room_id}: {e}")
+                else:
+                    update["$set"]["image_hash"] = blob_store.put(data)
+                    update["$unset"].update({"captured_frame": "", "video_context.captured_frame": ""})
+        except Exception:
+            self.delete_room(user_id, room_id)
+            rooms_collection.update_one(key, {"$unset": {"migrating": ""}})
+            raise
+        rooms_collection.update_one(key, update)
+        return len(messages)
+
+    def delete_room(self, user_id: str, room_id: str) -> int:
+        return self.collection.delete_many({"user_id": user_id, "room_id": room_id}).deleted_count
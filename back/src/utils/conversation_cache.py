@@ -0,0 +1,217 @@
+import time
+import threading
+import logging
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .scoring import rank_embeddings
+from .vector_index import FlatIndex, QuantizedIndex, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Returns (document ids, embeddings) for every conversation of a user
+ConversationLoader = Callable[[str], Tuple[List[Any], List[Any]]]
+# Returns (document ids, full-precision embeddings) for the given conversation ids
+VectorLoader = Callable[[List[Any]], Tuple[List[Any], List[Any]]]
+
+
+class _UserEntry:
+    def __init__(self, index: Optional[VectorIndex], id_map: Dict[str, Any]):
+        self.index = index
+        self.id_map = id_map
+        self.loaded_at = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        if self.index is None:
+            return 0
+        return self.index.nbytes
+
+
+class ConversationEmbeddingCache:
+    """LRU cache of each user's combined_embedding matrix.
+
+    A search only needs the query encode plus one matmul against the cached
+    float32 matrix; MongoDB is read once per user until the entry is evicted,
+    expires or is invalidated. With ``quantization`` the cache keeps int8 or
+    binary codes instead and rescores the candidates from MongoDB.
+
+    Loads run outside the lock; appends, removals and invalidations for a user
+    that is being loaded are recorded and replayed on the loaded entry before it
+    is published, since the loader's snapshot may predate them.
+    """
+
+    def __init__(self, max_users: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, quantization: Optional[str] = None):
+        self.max_users = max_users or settings.CONVERSATION_CACHE_MAX_USERS
+        self.max_bytes = max_bytes or settings.CONVERSATION_CACHE_MAX_BYTES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.CONVERSATION_CACHE_TTL_SECONDS
+        self.quantization = quantization if quantization is not None else settings.CONVERSATION_CACHE_QUANTIZATION
+        self.entries: "OrderedDict[str, _UserEntry]" = OrderedDict()
+        # user_id -> changes seen while loads of that user were in flight, and how many loads
+        self._pending: Dict[str, List[Tuple[str, Any, Any]]] = {}
+        self._loads: Counter = Counter()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+    def _load(self, user_id: str, loader: ConversationLoader) -> _UserEntry:
+        doc_ids, embeddings = loader(user_id)
+        index = None
+        id_map = {}
+        vectors = [(doc_id, embedding) for doc_id, embedding in zip(doc_ids, embeddings)
+                   if embedding is not None and len(embedding)]
+        if vectors:
+            matrix = np.asarray([embedding for _, embedding in vectors], dtype=np.float32)
+            index = self._new_index(matrix.shape[1])
+            index.add([str(doc_id) for doc_id, _ in vectors], matrix)
+            id_map = {str(doc_id): doc_id for doc_id, _ in vectors}
+        logger.info(f"Loaded {len(id_map)} conversation embeddings into cache for user {user_id}")
+        return _UserEntry(index, id_map)
+
+    def _new_index(self, dim: int) -> VectorIndex:
+        return QuantizedIndex(dim, self.quantization) if self.quantization else FlatIndex(dim)
+
+    def _get_entry(self, user_id: str, loader: ConversationLoader) -> _UserEntry:
+        with self._lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                self._drop(user_id)
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            self._loads[user_id] += 1
+            pending = self._pending.setdefault(user_id, [])
+
+        entry = None
+        try:
+            entry = self._load(user_id, loader)
+        finally:
+            with self._lock:
+                self._loads[user_id] -= 1
+                if not self._loads[user_id]:
+                    del self._loads[user_id]
+                    self._pending.pop(user_id, None)
+                if entry is not None and self._replay(entry, pending):
+                    self._drop(user_id)
+                    self.entries[user_id] = entry
+                    self.total_bytes += entry.nbytes
+                    self._evict()
+        return entry
+
+    def _replay(self, entry: _UserEntry, changes: List[Tuple[str, Any, Any]]) -> bool:
+        """Apply changes made during a load; False if the user was invalidated meanwhile"""
+        for change, doc_id, vector in changes:
+            if change == "invalidate":
+                return False
+            if change == "add":
+                self._add_to_entry(entry, doc_id, vector)
+            else:
+                self._remove_from_entry(entry, [doc_id])
+        return True
+
+    def _add_to_entry(self, entry: _UserEntry, doc_id: Any, vector: np.ndarray):
+        if entry.index is None:
+            entry.index = self._new_index(vector.shape[1])
+        entry.index.add([str(doc_id)], vector)
+        entry.id_map[str(doc_id)] = doc_id
+
+    def _remove_from_entry(self, entry: _UserEntry, doc_ids: Iterable[Any]):
+        if entry.index is None:
+            return
+        for doc_id in doc_ids:
+            entry.index.remove(str(doc_id))
+            entry.id_map.pop(str(doc_id), None)
+
+    def _drop(self, user_id: str):
+        entry = self.entries.pop(user_id, None)
+        if entry is not None:
+            self.total_bytes -= entry.nbytes
+
+    def _evict(self):
+        while self.entries and (len(self.entries) > self.max_users or self.total_bytes > self.max_bytes):
+            user_id, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry.nbytes
+            logger.info(f"Evicted conversation embeddings of user {user_id} from cache")
+
+    def search(self, user_id: str, query_embedding: np.ndarray, top_k: int,
+               loader: ConversationLoader, threshold: Optional[float] = None,
+               candidate_ids: Optional[Iterable[Any]] = None,
+               vector_loader: Optional[VectorLoader] = None) -> List[Tuple[Any, float]]:
+        """Return (document id, score) pairs for the best top_k conversations of a user,
+        optionally scoring only ``candidate_ids``. Quantized entries are rescored with
+        the vectors from ``vector_loader`` when one is given."""
+        entry = self._get_entry(user_id, loader)
+        if entry.index is None or len(entry.index) == 0:
+            return []
+
+        rescore = vector_loader is not None and isinstance(entry.index, QuantizedIndex)
+        k = top_k
+        if rescore:
+            k = max(top_k * settings.VECTOR_INDEX_CANDIDATE_FACTOR, settings.VECTOR_INDEX_MIN_CANDIDATES) * entry.index.oversample
+
+        if candidate_ids is not None:
+            doc_ids, scores = entry.index.search_subset(
+                query_embedding, [str(doc_id) for doc_id in candidate_ids], k
+            )
+        else:
+            doc_ids, scores = entry.index.search(query_embedding, k)
+
+        if rescore:
+            rescored_ids, embeddings = vector_loader([entry.id_map[doc_id] for doc_id in doc_ids])
+            ranked = rank_embeddings(query_embedding, embeddings, top_k, threshold)
+            return [(rescored_ids[position], score) for position, score in ranked]
+        return [
+            (entry.id_map[doc_id], float(score))
+            for doc_id, score in zip(doc_ids, scores)
+            if threshold is None or score >= threshold
+        ]
+
+    def append(self, user_id: str, doc_id: Any, embedding: List[float]):
+        """Add a newly saved conversation if the user is cached; otherwise it is picked up on load."""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            if user_id in self._pending:
+                self._pending[user_id].append(("add", doc_id, vector))
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return
+            self.total_bytes -= entry.nbytes
+            self._add_to_entry(entry, doc_id, vector)
+            self.total_bytes += entry.nbytes
+            self._evict()
+
+    def remove(self, user_id: str, doc_ids: Iterable[Any]):
+        doc_ids = list(doc_ids)
+        with self._lock:
+            if user_id in self._pending:
+                self._pending[user_id].extend(("remove", doc_id, None) for doc_id in doc_ids)
+            entry = self.entries.get(user_id)
+            if entry is None or entry.index is None:
+                return
+            self.total_bytes -= entry.nbytes
+            self._remove_from_entry(entry, doc_ids)
+            self.total_bytes += entry.nbytes
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            if user_id in self._pending:
+                self._pending[user_id].append(("invalidate", None, None))
+            self._drop(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self.entries),
+                "bytes": self.total_bytes,
+                "quantization": self.quantization,
+                "hits": self.hits,
+                "misses": self.misses
+            }
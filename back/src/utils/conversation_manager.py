@@ -3,9 +3,11 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from ..database.mongodb_client import MongoDBClient
+from ..database.embedding_codec import encode_document_embeddings
+from ..database.queries import fetch_embeddings, fetch_documents_by_ids
 from ..database.schemas import ConversationData, ConversationSearchRequest, ConversationSearchResult
 from ..models.embeddings import MultimodalEmbedder
-import numpy as np
+from .scoring import rank_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -39,9 +41,9 @@ class ConversationManager:
                          timestamp: float = 0.0) -> str:
         combined_text = f"{question} {answer}"
         
-        question_embedding = self.embedder.embed_text(question)[0].tolist()
-        answer_embedding = self.embedder.embed_text(answer)[0].tolist()
-        combined_embedding = self.embedder.embed_text(combined_text)[0].tolist()
+        question_embedding = self.embedder.embed_text(question, use_cache=False)[0].tolist()
+        answer_embedding = self.embedder.embed_text(answer, use_cache=False)[0].tolist()
+        combined_embedding = self.embedder.embed_text(combined_text, use_cache=False)[0].tolist()
         
         # Create a unique filter to prevent duplicates
         filter_query = {
@@ -61,6 +63,8 @@ class ConversationManager:
             "created_at": datetime.utcnow()
         }
         
+        encode_document_embeddings(conversation_data)
+        
         # Use upsert to update if exists, insert if not
         result = self.collection.update_one(
             filter_query,
@@ -96,78 +100,41 @@ class ConversationManager:
                 logger.error(f"Error generating query embedding: {e}")
                 raise
             
-            # Find all conversations
-            conversations = list(self.collection.find({}))
-            logger.info(f"Found {len(conversations)} conversations to search")
+            # Phase one: rank using only _id and combined_embedding
+            doc_ids, embeddings = fetch_embeddings(self.collection, {}, "combined_embedding")
+            logger.info(f"Found {len(doc_ids)} conversations to search")
             
-            if not conversations:
+            if not doc_ids:
                 logger.info("No conversations found")
                 return []
             
-            results = []
-            for i, conv in enumerate(conversations):
+            ranked = rank_embeddings(query_embedding, embeddings, top_k)
+            scores = {doc_ids[position]: similarity for position, similarity in ranked}
+            
+            # Phase two: full documents for the final top_k only
+            conversations = fetch_documents_by_ids(self.collection, [doc_ids[position] for position, _ in ranked])
+            
+            final_results = []
+            for conv in conversations:
                 try:
-                    # Validate conversation data
-                    if not conv.get('_id'):
-                        logger.warning(f"Conversation {i} missing _id, skipping")
-                        continue
-                    
                     # Convert ObjectId to string for Pydantic validation
                     conv_data = conv.copy()
-                    if '_id' in conv_data:
-                        conv_data['_id'] = str(conv_data['_id'])
-                        
-                    # Create conversation object
+                    conv_data['_id'] = str(conv_data['_id'])
                     conv_obj = ConversationData(**conv_data)
                     
-                    # Check if embedding exists
-                    if not conv_obj.combined_embedding:
-                        logger.warning(f"Conversation {conv_obj.id} has no combined_embedding, skipping")
-                        continue
-                        
-                    # Convert embedding to numpy array
-                    try:
-                        doc_embedding = np.array(conv_obj.combined_embedding)
-                        if doc_embedding.size == 0:
-                            logger.warning(f"Conversation {conv_obj.id} has empty embedding, skipping")
-                            continue
-                    except Exception as e:
-                        logger.error(f"Error converting embedding for conversation {conv_obj.id}: {e}")
-                        continue
-                    
-                    # Compute similarity
-                    try:
-                        similarity = self.embedder.compute_similarity(
-                            query_embedding.reshape(1, -1), 
-                            doc_embedding.reshape(1, -1)
-                        )[0]
-                        
-                        if np.isnan(similarity) or np.isinf(similarity):
-                            logger.warning(f"Invalid similarity score for conversation {conv_obj.id}: {similarity}")
-                            similarity = 0.0
-                            
-                    except Exception as e:
-                        logger.error(f"Error computing similarity for conversation {conv_obj.id}: {e}")
-                        similarity = 0.0
-                    
-                    # Create search result
-                    results.append(ConversationSearchResult(
+                    final_results.append(ConversationSearchResult(
                         conversation_id=str(conv_obj.id),
                         question=conv_obj.question or '',
                         answer=conv_obj.answer or '',
                         question_image=conv_obj.question_image,
-                        score=float(similarity),
+                        score=scores[conv['_id']],
                         timestamp=conv_obj.timestamp or 0.0
                     ))
                     
                 except Exception as e:
-                    logger.error(f"Error processing conversation {i}: {e}")
+                    logger.error(f"Error processing conversation {conv.get('_id')}: {e}")
                     continue
             
-            # Sort results by similarity score
-            results.sort(key=lambda x: x.score, reverse=True)
-            final_results = results[:top_k]
-            
             logger.info(f"Returning {len(final_results)} search results")
             return final_results
             
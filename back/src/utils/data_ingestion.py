@@ -1,13 +1,19 @@
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 from datetime import datetime
+from pathlib import Path
 from PIL import Image
 import numpy as np
+from bson import ObjectId
 
 from ..database.mongodb_client import MongoDBClient
+from ..database.embedding_codec import encode_document_embeddings
 from ..database.schemas import Document, ContentType
 from ..models.embeddings import MultimodalEmbedder
+from .vector_index import VectorIndexRegistry
+from .blob_store import BlobStore
+from .bulk_ingestion import BulkIngestPipeline, ProgressCallback, EmbedRunner
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +24,8 @@ class DataIngestion:
         self.db_client.connect()
         self.collection = self.db_client.get_collection("multimodal_documents")
         self.embedder = MultimodalEmbedder()
+        self.index_registry = VectorIndexRegistry()
+        self.blob_store = BlobStore()
         
         self._create_indexes()
     
@@ -27,6 +35,11 @@ class DataIngestion:
         self.collection.create_index([("metadata.category", 1)])
         logger.info("Created database indexes")
     
+    def _to_mongo(self, document: Document) -> Dict[str, Any]:
+        # Exclude by field name so MongoDB assigns the _id
+        doc_dict = document.dict(by_alias=True, exclude={"id"})
+        return encode_document_embeddings(doc_dict)
+    
     def ingest_text(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         # Validate input
         if not isinstance(text, str):
@@ -37,7 +50,7 @@ class DataIngestion:
         logger.info(f"Ingesting text: '{text[:50]}...' (length: {len(text)})")
         
         try:
-            text_embedding = self.embedder.embed_text(text)[0].tolist()
+            text_embedding = self.embedder.embed_text(text, use_cache=False)[0].tolist()
         except Exception as e:
             logger.error(f"Error creating embedding for text '{text[:50]}...': {e}")
             raise
@@ -50,51 +63,61 @@ class DataIngestion:
         )
         
         try:
-            doc_dict = document.dict(by_alias=True, exclude={"_id"})
+            doc_dict = self._to_mongo(document)
             # Ensure no null values for required fields
             if not doc_dict.get('text_content'):
                 raise ValueError("text_content cannot be empty")
             
             result = self.collection.insert_one(doc_dict)
+            self.index_registry.add_document(result.inserted_id, doc_dict)
             logger.info(f"Ingested text document with ID: {result.inserted_id}")
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Error inserting document to MongoDB: {e}")
             raise
     
-    def ingest_image(self, image_path: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    def ingest_image(self, image_path: str, metadata: Optional[Dict[str, Any]] = None,
+                     image_hash: Optional[str] = None) -> str:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image not found: {image_path}")
         
-        image_embedding = self.embedder.embed_image(image_path)[0].tolist()
+        image_embedding = self.embedder.embed_image(image_path, use_cache=False)[0].tolist()
         
         document = Document(
             content_type=ContentType.IMAGE,
             image_path=image_path,
+            image_hash=image_hash,
+            image_url=BlobStore.url(image_hash) if image_hash else None,
             image_embedding=image_embedding,
             metadata=metadata or {},
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
         
-        doc_dict = document.dict(by_alias=True, exclude={"_id"})
+        doc_dict = self._to_mongo(document)
         result = self.collection.insert_one(doc_dict)
+        self.index_registry.add_document(result.inserted_id, doc_dict)
         logger.info(f"Ingested image document with ID: {result.inserted_id}")
         return str(result.inserted_id)
     
     def ingest_multimodal(self, text: str, image_path: str, 
-                         metadata: Optional[Dict[str, Any]] = None) -> str:
+                         metadata: Optional[Dict[str, Any]] = None,
+                         image_hash: Optional[str] = None) -> str:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image not found: {image_path}")
         
-        text_embedding = self.embedder.embed_text(text)[0].tolist()
-        image_embedding = self.embedder.embed_image(image_path)[0].tolist()
-        multimodal_embedding = self.embedder.embed_multimodal(text, image_path)[0].tolist()
+        text_embedding = self.embedder.embed_text(text, use_cache=False)[0].tolist()
+        # One CLIP vision pass serves both the image and the fused embedding
+        clip_embeddings = self.embedder.embed_multimodal_components(text, image_path)
+        image_embedding = clip_embeddings["image"][0].tolist()
+        multimodal_embedding = clip_embeddings["multimodal"][0].tolist()
         
         document = Document(
             content_type=ContentType.MULTIMODAL,
             text_content=text,
             image_path=image_path,
+            image_hash=image_hash,
+            image_url=BlobStore.url(image_hash) if image_hash else None,
             text_embedding=text_embedding,
             image_embedding=image_embedding,
             multimodal_embedding=multimodal_embedding,
@@ -103,8 +126,9 @@ class DataIngestion:
             updated_at=datetime.utcnow()
         )
         
-        doc_dict = document.dict(by_alias=True, exclude={"_id"})
+        doc_dict = self._to_mongo(document)
         result = self.collection.insert_one(doc_dict)
+        self.index_registry.add_document(result.inserted_id, doc_dict)
         logger.info(f"Ingested multimodal document with ID: {result.inserted_id}")
         return str(result.inserted_id)
     
@@ -113,7 +137,7 @@ class DataIngestion:
         if metadata_list and len(metadata_list) != len(texts):
             raise ValueError("Length of metadata_list must match length of texts")
         
-        text_embeddings = self.embedder.embed_text(texts)
+        text_embeddings = self.embedder.embed_text(texts, use_cache=False)
         
         documents = []
         for i, (text, embedding) in enumerate(zip(texts, text_embeddings)):
@@ -126,13 +150,26 @@ class DataIngestion:
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow()
             )
-            doc_dict = document.dict(by_alias=True, exclude={"_id"})
+            doc_dict = self._to_mongo(document)
             documents.append(doc_dict)
         
         result = self.collection.insert_many(documents)
+        for doc_id, doc_dict in zip(result.inserted_ids, documents):
+            self.index_registry.add_document(doc_id, doc_dict)
         logger.info(f"Batch ingested {len(result.inserted_ids)} text documents")
         return [str(id) for id in result.inserted_ids]
     
+    def bulk_ingest(self, records: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                    write_batch_size: Optional[int] = None, decode_workers: Optional[int] = None,
+                    progress_callback: Optional[ProgressCallback] = None,
+                    embed_runner: Optional[EmbedRunner] = None, image_root: Optional[Path] = None) -> Dict[str, Any]:
+        """Stream records ({"text", "image_path" | "image_base64", "metadata", "content_type"})
+        through batched embedding and unordered chunked inserts; returns ingest statistics"""
+        pipeline = BulkIngestPipeline(
+            self, batch_size, write_batch_size, decode_workers, progress_callback, embed_runner, image_root
+        )
+        return pipeline.run(records)
+    
     def update_document_metadata(self, document_id: str, metadata: Dict[str, Any]) -> bool:
         result = self.collection.update_one(
             {"_id": document_id},
@@ -146,5 +183,11 @@ class DataIngestion:
         return result.modified_count > 0
     
     def delete_document(self, document_id: str) -> bool:
-        result = self.collection.delete_one({"_id": document_id})
-        return result.deleted_count > 0
\ No newline at end of file
+        object_id = ObjectId(document_id) if ObjectId.is_valid(document_id) else document_id
+        document = self.collection.find_one_and_delete({"_id": object_id}, projection={"image_hash": 1})
+        if document is None:
+            return False
+        self.index_registry.remove_document(document_id)
+        if document.get("image_hash"):
+            self.blob_store.release(document["image_hash"])
+        return True
\ No newline at end of file
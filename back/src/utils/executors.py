@@ -0,0 +1,92 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(RuntimeError):
+    pass
+
+
+class BoundedExecutor:
+    """Thread pool for blocking work called from async handlers, with backpressure.
+
+    At most ``max_pending`` calls may be running or queued; further callers
+    wait up to ``queue_timeout`` seconds for a slot without blocking the
+    event loop and then get ExecutorBusyError.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int, queue_timeout: Optional[float] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        return self._semaphore
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        semaphore = self._get_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ExecutorBusyError(f"{self.name} executor is saturated ({self.max_pending} calls pending)")
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+# Model inference (torch releases the GIL during forward passes)
+inference_executor = BoundedExecutor(
+    "inference",
+    max_workers=settings.INFERENCE_WORKERS,
+    max_pending=settings.INFERENCE_MAX_PENDING,
+    queue_timeout=settings.EXECUTOR_QUEUE_TIMEOUT_SECONDS
+)
+
+# Blocking PyMongo calls and disk I/O
+io_executor = BoundedExecutor(
+    "io",
+    max_workers=settings.IO_WORKERS,
+    max_pending=settings.IO_MAX_PENDING,
+    queue_timeout=settings.EXECUTOR_QUEUE_TIMEOUT_SECONDS
+)
+
+
+async def run_inference(func: Callable[..., Any], *args, **kwargs) -> Any:
+    return await inference_executor.run(func, *args, **kwargs)
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    return await io_executor.run(func, *args, **kwargs)
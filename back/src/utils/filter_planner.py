@@ -0,0 +1,171 @@
+import json
+import time
+import threading
+import logging
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Operators accepted inside a metadata_filter value; anything else (e.g. $where) is rejected
+FILTER_OPERATORS = {"$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin", "$exists"}
+
+
+def build_metadata_query(metadata_filter: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Translate a metadata_filter into ``metadata.<key>`` predicates.
+
+    Scalars are equality matches, lists mean ``$in`` and dicts may use the
+    comparison operators in FILTER_OPERATORS, e.g.
+    ``{"category": "news", "year": {"$gte": 2020}, "source": ["a", "b"]}``.
+    """
+    query = {}
+    for key, value in (metadata_filter or {}).items():
+        if not isinstance(key, str) or not key or key.startswith("$"):
+            raise ValueError(f"Invalid metadata filter key: {key!r}")
+        if isinstance(value, dict):
+            unknown = set(value) - FILTER_OPERATORS
+            if unknown or not value:
+                raise ValueError(f"Unsupported operators for metadata.{key}: {sorted(unknown) or 'none'}")
+            query[f"metadata.{key}"] = value
+        elif isinstance(value, list):
+            query[f"metadata.{key}"] = {"$in": value}
+        else:
+            query[f"metadata.{key}"] = value
+    return query
+
+
+class FilterPlan:
+    def __init__(self, strategy: str, matches: Optional[int] = None, selectivity: Optional[float] = None,
+                 candidate_ids: Optional[List[Any]] = None):
+        # "none" (no filter), "prefilter" (score only matching ids) or "postfilter"
+        # (search the whole index, then intersect with the filter in MongoDB)
+        self.strategy = strategy
+        self.matches = matches
+        self.selectivity = selectivity
+        self.candidate_ids = candidate_ids
+
+    def candidate_k(self, k: int) -> int:
+        """Widen a post-filter candidate pool so enough candidates survive the filter"""
+        if self.strategy != "postfilter" or not self.selectivity:
+            return k
+        return min(max(k, int(k / self.selectivity)), max(k, settings.FILTER_POSTFILTER_MAX_CANDIDATES))
+
+
+class FilterPlanner:
+    """Chooses between pre- and post-filtering for filtered vector searches
+    and keeps compound ``(content_type, metadata.<key>)`` indexes for the
+    metadata keys that are actually filtered on.
+
+    Match counts are estimated with a capped ``count_documents`` and cached
+    per filter for FILTER_ESTIMATE_TTL_SECONDS.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.key_counts: Counter = Counter()
+        self.plan_counts: Counter = Counter()
+        self.indexed_keys = set()
+        self.estimates: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._total: Optional[Tuple[float, int]] = None
+        self._lock = threading.Lock()
+        self._load_existing_indexes()
+
+    def _load_existing_indexes(self):
+        try:
+            for info in self.collection.index_information().values():
+                fields = [field for field, _ in info["key"]]
+                for field in fields[:2]:
+                    if field.startswith("metadata."):
+                        self.indexed_keys.add(field[len("metadata."):])
+        except Exception as e:
+            logger.warning(f"Could not read existing indexes: {e}")
+
+    def record(self, metadata_filter: Optional[Dict[str, Any]]):
+        """Count filtered keys and index the ones that are used often enough"""
+        to_create = []
+        with self._lock:
+            for key in metadata_filter or {}:
+                self.key_counts[key] += 1
+                if (key not in self.indexed_keys and self.key_counts[key] >= settings.METADATA_INDEX_MIN_QUERIES
+                        and settings.METADATA_INDEX_AUTO_CREATE
+                        and len(self.indexed_keys) < settings.METADATA_INDEX_MAX_KEYS):
+                    self.indexed_keys.add(key)
+                    to_create.append(key)
+        for key in to_create:
+            # Index builds can take a while on large collections; never block the search
+            threading.Thread(target=self._create_index, args=(key,), daemon=True).start()
+
+    def _create_index(self, key: str):
+        try:
+            name = self.collection.create_index([("content_type", 1), (f"metadata.{key}", 1)])
+            logger.info(f"Created metadata filter index {name}")
+        except Exception as e:
+            logger.error(f"Failed to create index for metadata.{key}: {e}")
+            with self._lock:
+                self.indexed_keys.discard(key)
+
+    def advice(self) -> List[Dict[str, Any]]:
+        """Frequently filtered keys that still have no index"""
+        with self._lock:
+            return [
+                {"keys": [["content_type", 1], [f"metadata.{key}", 1]], "queries": count}
+                for key, count in self.key_counts.most_common()
+                if key not in self.indexed_keys and count >= settings.METADATA_INDEX_MIN_QUERIES
+            ]
+
+    def _total_documents(self) -> int:
+        now = time.monotonic()
+        if self._total is None or now - self._total[0] > settings.FILTER_ESTIMATE_TTL_SECONDS:
+            self._total = (now, self.collection.estimated_document_count())
+        return self._total[1]
+
+    def _estimate_matches(self, mongo_query: Dict[str, Any]) -> int:
+        signature = json.dumps(mongo_query, sort_keys=True, default=str)
+        now = time.monotonic()
+        with self._lock:
+            cached = self.estimates.get(signature)
+            if cached is not None and now - cached[0] <= settings.FILTER_ESTIMATE_TTL_SECONDS:
+                self.estimates.move_to_end(signature)
+                return cached[1]
+
+        # Counting stops just past the pre-filter limit; beyond it the exact number does not matter
+        matches = self.collection.count_documents(mongo_query, limit=settings.FILTER_PREFILTER_MAX_IDS + 1)
+        with self._lock:
+            self.estimates[signature] = (now, matches)
+            while len(self.estimates) > 1024:
+                self.estimates.popitem(last=False)
+        return matches
+
+    def _count_plan(self, strategy: str):
+        with self._lock:
+            self.plan_counts[strategy] += 1
+
+    def plan(self, mongo_query: Dict[str, Any]) -> FilterPlan:
+        if not mongo_query:
+            self._count_plan("none")
+            return FilterPlan("none")
+
+        total = max(self._total_documents(), 1)
+        matches = self._estimate_matches(mongo_query)
+        selectivity = min(matches / total, 1.0)
+        if matches <= settings.FILTER_PREFILTER_MAX_IDS and selectivity <= settings.FILTER_PREFILTER_MAX_SELECTIVITY:
+            candidate_ids = [doc["_id"] for doc in self.collection.find(mongo_query, {"_id": 1})]
+            self._count_plan("prefilter")
+            return FilterPlan("prefilter", len(candidate_ids), selectivity, candidate_ids)
+
+        self._count_plan("postfilter")
+        return FilterPlan("postfilter", matches, selectivity)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            key_counts = dict(self.key_counts)
+            indexed_keys = sorted(self.indexed_keys)
+            plans = dict(self.plan_counts)
+        return {
+            "filtered_keys": key_counts,
+            "indexed_keys": indexed_keys,
+            "plans": plans,
+            "advice": self.advice()
+        }
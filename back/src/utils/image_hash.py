@@ -0,0 +1,15 @@
+import numpy as np
+from PIL import Image
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a
+    (hash_size + 1) x hash_size grayscale thumbnail"""
+    thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
@@ -0,0 +1,86 @@
+from typing import Any, Callable, Dict, Optional
+
+from .jobs import JobContext, JobQueue
+
+ServiceFactory = Callable[[str], Any]
+
+
+def _default_service_factory() -> ServiceFactory:
+    # Standalone workers build their own services on first use
+    services: Dict[str, Any] = {}
+
+    def get_service(name: str):
+        if name not in services:
+            if name == "ingestion":
+                from .data_ingestion import DataIngestion
+                services[name] = DataIngestion()
+            elif name == "video":
+                from .video_ingestion import VideoIngestion
+                services[name] = VideoIngestion()
+            else:
+                raise ValueError(f"Unknown service: {name}")
+        return services[name]
+
+    return get_service
+
+
+def _release_on_failure(get_service: ServiceFactory, params: Dict[str, Any], ingest: Callable[[], Any]):
+    # The upload's blob reference is owned by the document the job was meant to create
+    try:
+        return ingest()
+    except Exception:
+        if params.get("image_hash"):
+            get_service("ingestion").blob_store.release(params["image_hash"])
+        raise
+
+
+def _release_upload(get_service: ServiceFactory) -> Callable[[Dict[str, Any]], None]:
+    def release(params: Dict[str, Any]):
+        if params.get("image_hash"):
+            get_service("ingestion").blob_store.release(params["image_hash"])
+    return release
+
+
+def register_default_handlers(queue: JobQueue, get_service: Optional[ServiceFactory] = None):
+    """Register the ingestion job types; ``get_service`` maps "ingestion"/"video" to service instances"""
+    get_service = get_service or _default_service_factory()
+
+    def ingest_text(params: Dict[str, Any], context: JobContext):
+        doc_id = get_service("ingestion").ingest_text(params["text"], params.get("metadata"))
+        return {"document_id": doc_id}
+
+    def ingest_image(params: Dict[str, Any], context: JobContext):
+        doc_id = _release_on_failure(get_service, params, lambda: get_service("ingestion").ingest_image(
+            params["image_path"], params.get("metadata"), params.get("image_hash")
+        ))
+        return {"document_id": doc_id, "file_path": params["image_path"]}
+
+    def ingest_multimodal(params: Dict[str, Any], context: JobContext):
+        doc_id = _release_on_failure(get_service, params, lambda: get_service("ingestion").ingest_multimodal(
+            params["text"], params["image_path"], params.get("metadata"), params.get("image_hash")
+        ))
+        return {"document_id": doc_id}
+
+    def save_frame(params: Dict[str, Any], context: JobContext):
+        frame_id = _release_on_failure(get_service, params, lambda: get_service("ingestion").ingest_image(
+            params["image_path"], params.get("metadata"), params.get("image_hash")
+        ))
+        return {"frame_id": frame_id, "timestamp": params["timestamp"], "image_path": params["image_path"]}
+
+    def extract_video_frames(params: Dict[str, Any], context: JobContext):
+        return get_service("video").extract_frames(
+            params["video_id"],
+            params.get("sample_fps"),
+            params.get("sampling"),
+            progress_callback=context.report_progress,
+            is_cancelled=context.is_cancelled
+        )
+
+    queue.register("ingest_text", ingest_text)
+    # Jobs cancelled before they run, or given up on after their worker died, still hold
+    # the upload's blob reference
+    release_upload = _release_upload(get_service)
+    queue.register("ingest_image", ingest_image, on_abandon=release_upload)
+    queue.register("ingest_multimodal", ingest_multimodal, on_abandon=release_upload)
+    queue.register("save_frame", save_frame, on_abandon=release_upload)
+    queue.register("extract_video_frames", extract_video_frames)
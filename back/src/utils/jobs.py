@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Background job queue backed by the MongoDB "jobs" collection
+Jobs are claimed atomically with find_one_and_update, so any number of API
+processes and standalone workers can share the queue without a broker.
+
+    python -m src.utils.jobs --workers 2   # standalone worker process
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from ..config import settings
+from ..database.mongodb_client import MongoDBClient
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting and cooperative cancellation"""
+
+    def __init__(self, queue: "JobQueue", job: Dict[str, Any]):
+        self.queue = queue
+        self.job_id = job["_id"]
+        self.params = job.get("params", {})
+        self._last_cancel_check = 0.0
+        self._cancelled = False
+
+    def report_progress(self, **progress):
+        self.queue.collection.update_one(
+            {"_id": self.job_id},
+            {"$set": {f"progress.{key}": value for key, value in progress.items()}}
+        )
+
+    def is_cancelled(self) -> bool:
+        # Polled from the handler's loop; at most one read per JOB_CANCEL_CHECK_SECONDS
+        now = time.monotonic()
+        if not self._cancelled and now - self._last_cancel_check >= settings.JOB_CANCEL_CHECK_SECONDS:
+            self._last_cancel_check = now
+            job = self.queue.collection.find_one({"_id": self.job_id}, {"cancel_requested": 1})
+            self._cancelled = bool(job and job.get("cancel_requested"))
+        return self._cancelled
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+
+JobHandler = Callable[[Dict[str, Any], JobContext], Any]
+# Called with a job's params when it ends without its handler finishing (cancelled before it
+# ran, or failed after its worker died), to release what the submitter took for it
+AbandonHook = Callable[[Dict[str, Any]], None]
+
+
+class JobQueue:
+    """Persistent job table plus an in-process pool of worker threads.
+
+    ``type_limits`` caps how many jobs of a type run at once in this process
+    (e.g. one video extraction), on top of the ``workers`` thread count.
+    """
+
+    def __init__(self, workers: Optional[int] = None, type_limits: Optional[Dict[str, int]] = None):
+        self.db_client = MongoDBClient()
+        self.db_client.connect(verify=False)
+        self.collection = self.db_client.get_collection("jobs")
+        self.workers = workers if workers is not None else settings.JOB_WORKERS
+        self.type_limits = type_limits if type_limits is not None else dict(settings.JOB_TYPE_CONCURRENCY)
+        self.handlers: Dict[str, JobHandler] = {}
+        self.abandon_hooks: Dict[str, AbandonHook] = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._running: Dict[ObjectId, str] = {}
+        self._indexes_created = False
+
+    def _create_indexes(self):
+        if self._indexes_created:
+            return
+        self.collection.create_index([("status", 1), ("created_at", 1)])
+        self.collection.create_index([("type", 1), ("status", 1)])
+        # Finished jobs are removed by MongoDB after the retention period
+        self.collection.create_index("finished_at", expireAfterSeconds=settings.JOB_RETENTION_SECONDS)
+        self._indexes_created = True
+
+    def register(self, job_type: str, handler: JobHandler, on_abandon: Optional[AbandonHook] = None):
+        self.handlers[job_type] = handler
+        if on_abandon is not None:
+            self.abandon_hooks[job_type] = on_abandon
+
+    def _run_abandon_hook(self, job: Dict[str, Any]):
+        hook = self.abandon_hooks.get(job["type"])
+        if hook is None:
+            return
+        try:
+            hook(job.get("params", {}))
+        except Exception as e:
+            logger.error(f"Cleanup of abandoned {job['type']} job {job['_id']} failed: {e}")
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> str:
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        self._create_indexes()
+        now = datetime.utcnow()
+        result = self.collection.insert_one({
+            "type": job_type,
+            "params": params,
+            "status": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "cancel_requested": False,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "heartbeat_at": None,
+            "worker": None
+        })
+        self._wakeup.set()
+        logger.info(f"Queued {job_type} job {result.inserted_id}")
+        return str(result.inserted_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not ObjectId.is_valid(job_id):
+            return None
+        return self.collection.find_one({"_id": ObjectId(job_id)}, {"params": 0})
+
+    def list_jobs(self, status: Optional[str] = None, job_type: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {}
+        if status:
+            query["status"] = status
+        if job_type:
+            query["type"] = job_type
+        return list(self.collection.find(query, {"params": 0}).sort("created_at", -1).limit(limit))
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job immediately; ask a running job to stop at its next check"""
+        if not ObjectId.is_valid(job_id):
+            return None
+        object_id = ObjectId(job_id)
+        now = datetime.utcnow()
+        job = self.collection.find_one_and_update(
+            {"_id": object_id, "status": "queued"},
+            {"$set": {"status": "cancelled", "cancel_requested": True, "finished_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            # The handler will never run, so nothing else releases what the job holds
+            self._run_abandon_hook(job)
+            job.pop("params", None)
+            return job
+        return self.collection.find_one_and_update(
+            {"_id": object_id, "status": "running"},
+            {"$set": {"cancel_requested": True}},
+            projection={"params": 0},
+            return_document=ReturnDocument.AFTER
+        ) or self.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        counts = Counter()
+        for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        with self._lock:
+            running_here = Counter(self._running.values())
+        return {
+            "workers": self.workers,
+            "type_limits": self.type_limits,
+            "jobs_by_status": {status: counts.get(status, 0) for status in JOB_STATUSES},
+            "running_in_process": dict(running_here)
+        }
+
+    # Worker side
+
+    def start(self):
+        if self._threads or self.workers <= 0:
+            return
+        self._create_indexes()
+        self.requeue_stale()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"Started {self.workers} job workers ({self.worker_id})")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            running = Counter(self._running.values())
+            excluded = [job_type for job_type, limit in self.type_limits.items() if running[job_type] >= limit]
+            types = [job_type for job_type in self.handlers if job_type not in excluded]
+            if not types:
+                return None
+            now = datetime.utcnow()
+            job = self.collection.find_one_and_update(
+                {"status": "queued", "type": {"$in": types}},
+                {
+                    "$set": {"status": "running", "started_at": now, "heartbeat_at": now, "worker": self.worker_id},
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if job is not None:
+                self._running[job["_id"]] = job["type"]
+            return job
+
+    def _work(self):
+        last_stale_check = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.error(f"Failed to claim job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+                self._wakeup.clear()
+                if time.monotonic() - last_stale_check > settings.JOB_STALE_SECONDS:
+                    last_stale_check = time.monotonic()
+                    self.requeue_stale()
+                continue
+
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._running.pop(job["_id"], None)
+                # A slot of this type may have been freed for another worker
+                self._wakeup.set()
+
+    def _run(self, job: Dict[str, Any]):
+        context = JobContext(self, job)
+        update: Dict[str, Any]
+        try:
+            if job.get("cancel_requested"):
+                self._run_abandon_hook(job)
+                raise JobCancelled(f"Job {job['_id']} was cancelled")
+            result = self.handlers[job["type"]](job.get("params", {}), context)
+            update = {"status": "succeeded", "result": result}
+            logger.info(f"{job['type']} job {job['_id']} succeeded")
+        except JobCancelled:
+            update = {"status": "cancelled"}
+            logger.info(f"{job['type']} job {job['_id']} cancelled")
+        except Exception as e:
+            update = {"status": "failed", "error": str(e)}
+            logger.error(f"{job['type']} job {job['_id']} failed: {e}")
+        update["finished_at"] = datetime.utcnow()
+        # Only while this worker still owns this attempt; a stale worker must not
+        # overwrite a job that was since requeued, reclaimed or finished elsewhere
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": "running", "worker": self.worker_id, "attempts": job["attempts"]},
+            {"$set": update}
+        )
+        if result.matched_count == 0:
+            logger.warning(
+                f"{job['type']} job {job['_id']} is no longer owned by this worker; dropped its {update['status']} result"
+            )
+
+    def _heartbeat(self):
+        # Lets other processes tell a live long-running job from one whose worker died
+        while not self._stop.wait(settings.JOB_HEARTBEAT_SECONDS):
+            with self._lock:
+                job_ids = list(self._running)
+            if job_ids:
+                try:
+                    self.collection.update_many(
+                        {"_id": {"$in": job_ids}}, {"$set": {"heartbeat_at": datetime.utcnow()}}
+                    )
+                except Exception as e:
+                    logger.warning(f"Job heartbeat failed: {e}")
+
+    def requeue_stale(self) -> int:
+        """Requeue running jobs whose worker stopped sending heartbeats"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        stale = {"status": "running", "heartbeat_at": {"$lt": cutoff}}
+        # One by one, so that each job given up on releases what it holds (its upload)
+        failed = 0
+        exhausted = {**stale, "attempts": {"$gte": settings.JOB_MAX_ATTEMPTS}}
+        for job in self.collection.find(exhausted, {"type": 1, "params": 1}):
+            result = self.collection.update_one(
+                {**stale, "_id": job["_id"]},
+                {"$set": {"status": "failed", "error": "Worker stopped responding", "finished_at": datetime.utcnow()}}
+            )
+            if result.modified_count:
+                failed += 1
+                self._run_abandon_hook(job)
+        requeued = self.collection.update_many(
+            stale, {"$set": {"status": "queued", "worker": None, "started_at": None}}
+        )
+        if requeued.modified_count or failed:
+            logger.warning(
+                f"Requeued {requeued.modified_count} stale jobs, failed {failed} after too many attempts"
+            )
+        return requeued.modified_count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .job_handlers import register_default_handlers
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Run background job workers without the API server")
+    parser.add_argument("--workers", type=int, default=max(settings.JOB_WORKERS, 1))
+    args = parser.parse_args()
+
+    queue = JobQueue(workers=args.workers)
+    register_default_handlers(queue)
+    queue.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        queue.stop()
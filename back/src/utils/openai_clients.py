@@ -0,0 +1,142 @@
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class OpenAIClientPool:
+    """Bounded LRU of long-lived AsyncOpenAI clients keyed by user_id.
+
+    Every client shares one keep-alive httpx connection pool (and SSL
+    context), so a chat turn reuses an open TLS connection instead of
+    handshaking again. A client is rebuilt when the user's key changes.
+    """
+
+    def __init__(self, max_clients: Optional[int] = None):
+        self.max_clients = max_clients or settings.OPENAI_CLIENT_POOL_SIZE
+        self.clients: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self.http_client = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Separate from _lock: create() is also called outside get()
+        self._http_client_lock = threading.Lock()
+
+    def _shared_http_client(self):
+        import httpx
+        import openai
+        with self._http_client_lock:
+            if self.http_client is None:
+                self.http_client = openai.DefaultAsyncHttpxClient(
+                    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(
+                        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY_SECONDS
+                    )
+                )
+            return self.http_client
+
+    def create(self, api_key: str):
+        """Client on the shared connections that is not kept in the pool (e.g. to test an unsaved key)"""
+        import openai
+        return openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            http_client=self._shared_http_client()
+        )
+
+    def get(self, user_id: str, api_key: str):
+        fingerprint = _fingerprint(api_key)
+        with self._lock:
+            entry = self.clients.get(user_id)
+            if entry is not None and entry[0] == fingerprint:
+                self.clients.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            client = self.create(api_key)
+            self.clients[user_id] = (fingerprint, client)
+            self.clients.move_to_end(user_id)
+            # Evicted clients only hold configuration; the connections stay in the shared pool
+            while len(self.clients) > self.max_clients:
+                self.clients.popitem(last=False)
+                self.evictions += 1
+            return client
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self.clients.pop(user_id, None)
+
+    async def aclose(self):
+        with self._lock, self._http_client_lock:
+            self.clients.clear()
+            http_client, self.http_client = self.http_client, None
+        if http_client is not None:
+            await http_client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self.clients),
+                "max_clients": self.max_clients,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class UserRecordCache:
+    """Short-TTL cache of ``users`` documents for per-request lookups (API key,
+    key status). Writers call invalidate(); other workers see changes after
+    at most USER_CACHE_TTL_SECONDS."""
+
+    def __init__(self, collection, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.collection = collection
+        self.max_entries = max_entries or settings.USER_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.USER_CACHE_TTL_SECONDS
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+
+        user = self.collection.find_one({"user_id": user_id})
+        # Unknown users are not cached, so a registration is visible right away
+        if user is not None:
+            with self._lock:
+                self.entries[user_id] = (now, user)
+                self.entries.move_to_end(user_id)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            return dict(user)
+        return None
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self.entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,55 @@
+import numpy as np
+
+QUANTIZATION_MODES = ("int8", "binary")
+
+# Rows converted to float32 at a time when scoring int8 codes (small enough to stay in cache)
+SCORE_CHUNK_ROWS = 2048
+
+# Number of set bits of every byte value
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def code_size(dim: int, mode: str) -> int:
+    """Bytes per vector for ``mode``"""
+    if mode == "int8":
+        return dim
+    if mode == "binary":
+        return (dim + 7) // 8
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+
+def quantize_int8(vectors: np.ndarray):
+    """Symmetric per-vector scalar quantization: ``vector ~= codes * scale``.
+
+    Returns int8 codes and one float32 scale per row.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def int8_scores(query: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Approximate dot products of a float query with int8 codes"""
+    scores = np.empty(codes.shape[0], dtype=np.float32)
+    for start in range(0, codes.shape[0], SCORE_CHUNK_ROWS):
+        chunk = codes[start:start + SCORE_CHUNK_ROWS].astype(np.float32)
+        scores[start:start + SCORE_CHUNK_ROWS] = chunk @ query
+    return scores * scales
+
+
+def binary_codes(vectors: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed eight to a byte"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return np.packbits(vectors > 0, axis=1)
+
+
+def hamming_distances(query_code: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    return _POPCOUNT[np.bitwise_xor(codes, query_code)].sum(axis=1, dtype=np.int32)
+
+
+def binary_scores(query: np.ndarray, codes: np.ndarray, dim: int) -> np.ndarray:
+    """Hamming distance mapped to [-1, 1] so it ranks like a similarity"""
+    distances = hamming_distances(binary_codes(query.reshape(1, -1))[0], codes)
+    return 1.0 - 2.0 * distances.astype(np.float32) / dim
@@ -1,33 +1,46 @@
 import numpy as np
 from typing import List, Optional, Dict, Any, Union
 from PIL import Image
+from bson import ObjectId
 import logging
 
+from ..config import settings
 from ..database.mongodb_client import MongoDBClient
+from ..database.queries import fetch_embeddings, fetch_documents_by_ids
 from ..database.schemas import SearchQuery, SearchResult, Document, ContentType
 from ..models.embeddings import MultimodalEmbedder
+from .filter_planner import FilterPlanner, build_metadata_query
+from .scoring import rank_embeddings
+from .vector_index import VectorIndexRegistry
 
 logger = logging.getLogger(__name__)
 
 
+def _to_object_id(doc_id: str):
+    return ObjectId(doc_id) if ObjectId.is_valid(doc_id) else doc_id
+
+
 class MultimodalRetriever:
-    def __init__(self):
+    def __init__(self, embedder=None):
         self.db_client = MongoDBClient()
         self.db_client.connect()
         self.collection = self.db_client.get_collection("multimodal_documents")
-        self.embedder = MultimodalEmbedder()
+        # Any object with MultimodalEmbedder's embed_* methods, e.g. an EmbeddingScheduler
+        self.embedder = embedder or MultimodalEmbedder()
+        self.index_registry = VectorIndexRegistry()
+        self.filter_planner = FilterPlanner(self.collection)
     
-    def search(self, query: SearchQuery) -> List[SearchResult]:
-        if query.query_text and query.query_image_path:
-            query_embedding = self.embedder.embed_multimodal(
-                query.query_text, query.query_image_path
-            )[0]
+    def search(self, query: SearchQuery, query_image: Optional[Image.Image] = None) -> List[SearchResult]:
+        # An already decoded query image takes precedence over query_image_path
+        image = query_image if query_image is not None else query.query_image_path
+        if query.query_text and image is not None:
+            query_embedding = self.embedder.embed_multimodal(query.query_text, image)[0]
             embedding_field = "multimodal_embedding"
         elif query.query_text:
             query_embedding = self.embedder.embed_text(query.query_text)[0]
             embedding_field = "text_embedding"
-        elif query.query_image_path:
-            query_embedding = self.embedder.embed_image(query.query_image_path)[0]
+        elif image is not None:
+            query_embedding = self.embedder.embed_image(image)[0]
             embedding_field = "image_embedding"
         else:
             raise ValueError("Either query_text or query_image_path must be provided")
@@ -38,52 +51,52 @@ class MultimodalRetriever:
             mongo_query["content_type"] = query.content_type
         
         if query.metadata_filter:
-            for key, value in query.metadata_filter.items():
-                mongo_query[f"metadata.{key}"] = value
+            mongo_query.update(build_metadata_query(query.metadata_filter))
+            self.filter_planner.record(query.metadata_filter)
+        
+        index = None if query.exact else self.index_registry.get_index(embedding_field, self.collection)
         
-        documents = list(self.collection.find(mongo_query))
+        if index is not None:
+            # Only rescore the approximate nearest neighbours
+            candidate_k = max(
+                query.top_k * settings.VECTOR_INDEX_CANDIDATE_FACTOR,
+                settings.VECTOR_INDEX_MIN_CANDIDATES
+            ) * index.oversample
+            plan = self.filter_planner.plan(mongo_query)
+            if plan.strategy == "prefilter":
+                # Selective filter: score only the matching documents
+                candidate_ids, _ = index.search_subset(
+                    query_embedding, [str(doc_id) for doc_id in plan.candidate_ids], candidate_k
+                )
+            else:
+                candidate_ids, _ = index.search(query_embedding, plan.candidate_k(candidate_k))
+            if not candidate_ids:
+                return []
+            mongo_query["_id"] = {"$in": [_to_object_id(doc_id) for doc_id in candidate_ids]}
+        
+        # Phase one: rank using only _id and the query's embedding field
+        doc_ids, embeddings = fetch_embeddings(self.collection, mongo_query, embedding_field)
         
-        if not documents:
+        if not doc_ids:
             return []
         
+        ranked = rank_embeddings(query_embedding, embeddings, query.top_k, query.threshold or None)
+        scores = {doc_ids[position]: similarity for position, similarity in ranked}
+        
+        # Phase two: full documents for the final top_k only
+        documents = fetch_documents_by_ids(self.collection, [doc_ids[position] for position, _ in ranked])
+        
         results = []
         for doc in documents:
-            doc_obj = Document(**doc)
-            
-            # Get appropriate embedding based on query type
-            if embedding_field == "multimodal_embedding" and doc_obj.multimodal_embedding:
-                doc_embedding = np.array(doc_obj.multimodal_embedding)
-            elif embedding_field == "text_embedding" and doc_obj.text_embedding:
-                doc_embedding = np.array(doc_obj.text_embedding)
-            elif embedding_field == "image_embedding" and doc_obj.image_embedding:
-                doc_embedding = np.array(doc_obj.image_embedding)
-            else:
-                continue
-            
-            # Calculate cosine similarity
-            similarity = self.embedder.compute_similarity(
-                query_embedding.reshape(1, -1), 
-                doc_embedding.reshape(1, -1)
-            )[0]
-            
-            # Calculate distance (1 - similarity for cosine)
-            distance = 1 - similarity
-            
-            # Apply threshold filter if specified
-            if query.threshold and similarity < query.threshold:
-                continue
-            
+            similarity = scores[doc["_id"]]
+            doc["_id"] = str(doc["_id"])
             results.append(SearchResult(
-                document=doc_obj,
-                score=float(similarity),
-                distance=float(distance)
+                document=Document(**doc),
+                score=similarity,
+                distance=1 - similarity
             ))
         
-        # Sort by score (descending)
-        results.sort(key=lambda x: x.score, reverse=True)
-        
-        # Return top_k results
-        return results[:query.top_k]
+        return results
     
     def search_by_text(self, text: str, top_k: int = 10, 
                       content_type: Optional[ContentType] = None) -> List[SearchResult]:
@@ -94,26 +107,28 @@ class MultimodalRetriever:
         )
         return self.search(query)
     
-    def search_by_image(self, image_path: str, top_k: int = 10,
-                       content_type: Optional[ContentType] = None) -> List[SearchResult]:
+    def search_by_image(self, image: Union[str, Image.Image], top_k: int = 10,
+                       content_type: Optional[ContentType] = None,
+                       metadata_filter: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
         query = SearchQuery(
-            query_image_path=image_path,
+            query_image_path=image if isinstance(image, str) else None,
             top_k=top_k,
-            content_type=content_type
+            content_type=content_type,
+            metadata_filter=metadata_filter
         )
-        return self.search(query)
+        return self.search(query, None if isinstance(image, str) else image)
     
-    def search_multimodal(self, text: str, image_path: str, top_k: int = 10) -> List[SearchResult]:
+    def search_multimodal(self, text: str, image: Union[str, Image.Image], top_k: int = 10) -> List[SearchResult]:
         query = SearchQuery(
             query_text=text,
-            query_image_path=image_path,
+            query_image_path=image if isinstance(image, str) else None,
             top_k=top_k,
             content_type=ContentType.MULTIMODAL
         )
-        return self.search(query)
+        return self.search(query, None if isinstance(image, str) else image)
     
     def hybrid_search(self, text: Optional[str] = None, 
-                     image_path: Optional[str] = None,
+                     image: Optional[Union[str, Image.Image]] = None,
                      text_weight: float = 0.5,
                      top_k: int = 10) -> List[SearchResult]:
         results_dict = {}
@@ -133,9 +148,9 @@ class MultimodalRetriever:
                     results_dict[doc_id]['text_score'] = result.score * text_weight
         
         # Image search
-        if image_path:
+        if image is not None:
             image_weight = 1 - text_weight
-            image_results = self.search_by_image(image_path, top_k=top_k*2)
+            image_results = self.search_by_image(image, top_k=top_k*2)
             for result in image_results:
                 doc_id = str(result.document.id)
                 if doc_id not in results_dict:
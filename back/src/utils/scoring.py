@@ -0,0 +1,74 @@
+import logging
+from typing import List, Optional, Sequence, Tuple, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def stack_embeddings(embeddings: Sequence[Any], dim: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack embeddings into one contiguous float32 matrix.
+
+    Returns the matrix and the positions in ``embeddings`` it was built from;
+    missing, empty or wrong-sized embeddings are skipped.
+    """
+    rows = []
+    positions = []
+    for position, embedding in enumerate(embeddings):
+        if embedding is None or len(embedding) == 0:
+            continue
+        if dim is None:
+            dim = len(embedding)
+        elif len(embedding) != dim:
+            logger.warning(f"Skipping embedding at {position} with dimension {len(embedding)}, expected {dim}")
+            continue
+        rows.append(embedding)
+        positions.append(position)
+
+    if not rows:
+        return np.empty((0, dim or 0), dtype=np.float32), np.empty(0, dtype=np.int64)
+    matrix = np.ascontiguousarray(np.asarray(rows, dtype=np.float32))
+    return matrix, np.asarray(positions, dtype=np.int64)
+
+
+def cosine_scores(query_embedding: np.ndarray, matrix: np.ndarray, normalized: bool = False) -> np.ndarray:
+    """Cosine similarity of one query against every row of ``matrix`` in a single matmul."""
+    if matrix.shape[0] == 0:
+        return np.empty(0, dtype=np.float32)
+    query = normalize_rows(query_embedding)[0]
+    if not normalized:
+        matrix = normalize_rows(matrix)
+    scores = matrix @ query
+    return np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int, threshold: Optional[float] = None) -> np.ndarray:
+    """Indices of the top_k scores (descending) at or above ``threshold``."""
+    candidates = np.arange(scores.shape[0])
+    if threshold is not None:
+        candidates = candidates[scores >= threshold]
+    if top_k <= 0 or candidates.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if candidates.size > top_k:
+        partition = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+        candidates = candidates[partition]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def rank_embeddings(query_embedding: np.ndarray, embeddings: Sequence[Any], top_k: int,
+                    threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+    """Score raw embeddings against a query and return (position, score) for the best top_k."""
+    matrix, positions = stack_embeddings(embeddings, dim=int(np.asarray(query_embedding).size))
+    scores = cosine_scores(query_embedding, matrix)
+    top = top_k_indices(scores, top_k, threshold)
+    return [(int(positions[i]), float(scores[i])) for i in top]
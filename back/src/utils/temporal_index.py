@@ -0,0 +1,144 @@
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .scoring import cosine_scores, normalize_rows, stack_embeddings, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+# Returns (ids, timestamps, embeddings or None) for one timeline key
+TimelineLoader = Callable[[Hashable], Tuple[List[Any], List[float], Optional[List[Any]]]]
+
+
+class TemporalIndex:
+    """Items of one video kept sorted by timestamp.
+
+    A time window is a contiguous slice found with two binary searches, and
+    when embeddings are kept their rows follow the same order, so a windowed
+    vector search is a single matmul over that slice.
+    """
+
+    def __init__(self, ids: Sequence[Any], timestamps: Sequence[float], embeddings: Optional[Sequence[Any]] = None):
+        ids = list(ids)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.vectors: Optional[np.ndarray] = None
+        if embeddings is not None:
+            matrix, positions = stack_embeddings(embeddings)
+            ids = [ids[i] for i in positions]
+            timestamps = timestamps[positions]
+            self.vectors = normalize_rows(matrix) if len(positions) else None
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamps = timestamps[order]
+        self.ids = [ids[i] for i in order]
+        if self.vectors is not None:
+            self.vectors = np.ascontiguousarray(self.vectors[order])
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + (self.vectors.nbytes if self.vectors is not None else 0)
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None) -> slice:
+        """Positions with start <= timestamp <= end (either bound may be open)"""
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, start, side="left"))
+        hi = len(self.ids) if end is None else int(np.searchsorted(self.timestamps, end, side="right"))
+        return slice(lo, max(lo, hi))
+
+    def ids_in_range(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Any]:
+        return self.ids[self.window(start, end)]
+
+    def search(self, query_embedding: np.ndarray, top_k: int, start: Optional[float] = None,
+               end: Optional[float] = None, threshold: Optional[float] = None) -> List[Tuple[Any, float]]:
+        if self.vectors is None:
+            return []
+        window = self.window(start, end)
+        scores = cosine_scores(query_embedding, self.vectors[window], normalized=True)
+        top = top_k_indices(scores, top_k, threshold)
+        return [(self.ids[window.start + i], float(scores[i])) for i in top]
+
+    def add(self, doc_id: Any, timestamp: float):
+        # Only used for timelines without embeddings (conversations)
+        position = int(np.searchsorted(self.timestamps, timestamp, side="right"))
+        self.timestamps = np.insert(self.timestamps, position, timestamp)
+        self.ids.insert(position, doc_id)
+
+    def remove(self, doc_ids: Iterable[Any]):
+        removed = set(doc_ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in removed]
+        if len(keep) == len(self.ids):
+            return
+        self.timestamps = self.timestamps[keep]
+        self.ids = [self.ids[i] for i in keep]
+        if self.vectors is not None:
+            self.vectors = self.vectors[keep]
+
+
+class TemporalIndexCache:
+    """LRU/TTL cache of TemporalIndex objects for hot videos, keyed e.g. by
+    (user_id, video_id); cold keys are rebuilt from MongoDB by ``loader``"""
+
+    def __init__(self, loader: TimelineLoader, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.loader = loader
+        self.max_entries = max_entries or settings.TEMPORAL_INDEX_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.TEMPORAL_INDEX_TTL_SECONDS
+        self.entries: "OrderedDict[Hashable, TemporalIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable) -> TemporalIndex:
+        with self._lock:
+            index = self.entries.get(key)
+            if index is not None and time.monotonic() - index.loaded_at > self.ttl_seconds:
+                del self.entries[key]
+                index = None
+            if index is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+        index = TemporalIndex(*self.loader(key))
+        with self._lock:
+            self.entries[key] = index
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        logger.info(f"Loaded temporal index for {key} ({len(index)} items)")
+        return index
+
+    def add(self, key: Hashable, doc_id: Any, timestamp: float):
+        """Add an item if the key is cached; otherwise it is picked up on load."""
+        with self._lock:
+            index = self.entries.get(key)
+            if index is not None:
+                index.add(doc_id, timestamp)
+
+    def remove(self, key: Hashable, doc_ids: Iterable[Any]):
+        with self._lock:
+            index = self.entries.get(key)
+            if index is not None:
+                index.remove(doc_ids)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "items": sum(len(index) for index in self.entries.values()),
+                "bytes": sum(index.nbytes for index in self.entries.values()),
+                "hits": self.hits,
+                "misses": self.misses
+            }
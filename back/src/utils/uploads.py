@@ -0,0 +1,93 @@
+import io
+import time
+import logging
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+
+from PIL import Image
+from fastapi import UploadFile
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the {limit // (1024 * 1024)} MB limit")
+        self.limit = limit
+
+
+def check_upload_size(file: UploadFile, max_bytes: int):
+    # Multipart parsing already knows the size; reject before reading anything
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Read an upload into memory chunk by chunk, stopping as soon as it exceeds ``max_bytes``"""
+    check_upload_size(file, max_bytes)
+    chunks = []
+    total = 0
+    while True:
+        # Spooled uploads that went to disk are read on a worker thread by Starlette
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def decode_image(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    return image.convert("RGB")
+
+
+def iter_capped(stream: BinaryIO, max_bytes: int) -> Iterable[bytes]:
+    total = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        yield chunk
+
+
+def copy_upload(file: UploadFile, path: Path, max_bytes: int) -> int:
+    """Stream an upload to ``path`` in 1 MB chunks; a partial file is removed on failure"""
+    check_upload_size(file, max_bytes)
+    written = 0
+    try:
+        with open(path, "wb") as buffer:
+            for chunk in iter_capped(file.file, max_bytes):
+                buffer.write(chunk)
+                written += len(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return written
+
+
+def cleanup_stale_uploads(max_age_seconds: Optional[float] = None) -> int:
+    """Remove temporary upload files older than ``max_age_seconds``: query images
+    written by older versions and temp files of interrupted blob writes"""
+    max_age_seconds = max_age_seconds if max_age_seconds is not None else settings.UPLOAD_TEMP_TTL_SECONDS
+    cutoff = time.time() - max_age_seconds
+    candidates = list(settings.UPLOADS_DIR.glob("query_*")) + list(settings.BLOBS_DIR.glob(".tmp-*"))
+    removed = 0
+    for path in candidates:
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not remove stale upload {path}: {e}")
+    if removed:
+        logger.info(f"Removed {removed} stale temporary uploads")
+    return removed
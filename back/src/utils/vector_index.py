@@ -0,0 +1,498 @@
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple, Any, Iterable
+
+import numpy as np
+
+from ..config import settings
+from ..database.embedding_codec import decode_embedding
+from ..database.queries import fetch_embeddings
+from .scoring import normalize_rows as _normalize, top_k_indices
+from .quantization import QUANTIZATION_MODES, code_size, quantize_int8, int8_scores, binary_codes, binary_scores
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_FIELDS = ("text_embedding", "image_embedding", "multimodal_embedding")
+
+
+class _VectorStore:
+    """Growable matrix (float32 unless ``dtype`` says otherwise) with O(1) swap-remove by id."""
+
+    def __init__(self, dim: int, capacity: int = 1024, dtype=np.float32):
+        self.dim = dim
+        self.vectors = np.empty((capacity, dim), dtype=dtype)
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _reserve(self, size: int):
+        if size <= self.vectors.shape[0]:
+            return
+        capacity = max(size, self.vectors.shape[0] * 2)
+        grown = np.empty((capacity, self.dim), dtype=self.vectors.dtype)
+        grown[:len(self.ids)] = self.vectors[:len(self.ids)]
+        self.vectors = grown
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        for doc_id, vector in zip(ids, vectors):
+            if doc_id in self.positions:
+                self.vectors[self.positions[doc_id]] = vector
+                continue
+            self._reserve(len(self.ids) + 1)
+            self.vectors[len(self.ids)] = vector
+            self.positions[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+
+    def remove(self, doc_id: str) -> bool:
+        position = self.positions.pop(doc_id, None)
+        if position is None:
+            return False
+        last = len(self.ids) - 1
+        if position != last:
+            moved_id = self.ids[last]
+            self.vectors[position] = self.vectors[last]
+            self.ids[position] = moved_id
+            self.positions[moved_id] = position
+        self.ids.pop()
+        return True
+
+    def matrix(self) -> np.ndarray:
+        return self.vectors[:len(self.ids)]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.ids) * self.dim * self.vectors.itemsize
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        size = len(self.ids)
+        if size == 0 or k <= 0:
+            return [], np.empty(0, dtype=np.float32)
+        scores = self.matrix() @ query
+        top = top_k_indices(scores, k)
+        return [self.ids[i] for i in top], scores[top]
+
+    def search_subset(self, query: np.ndarray, ids: Iterable[str], k: int) -> Tuple[List[str], np.ndarray]:
+        positions = np.asarray([self.positions[doc_id] for doc_id in ids if doc_id in self.positions], dtype=np.int64)
+        if positions.size == 0 or k <= 0:
+            return [], np.empty(0, dtype=np.float32)
+        scores = self.vectors[positions] @ query
+        top = top_k_indices(scores, k)
+        return [self.ids[positions[i]] for i in top], scores[top]
+
+
+class VectorIndex:
+    """Common interface for in-memory cosine similarity indexes."""
+
+    # Approximate indexes ask callers to rescore this many times more candidates
+    oversample = 1
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._lock = threading.RLock()
+
+    def build(self, ids: List[str], vectors: np.ndarray):
+        self.add(ids, vectors)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        raise NotImplementedError
+
+    def remove(self, doc_id: str) -> bool:
+        raise NotImplementedError
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        raise NotImplementedError
+
+    def search_subset(self, query: np.ndarray, ids: Iterable[str], k: int) -> Tuple[List[str], np.ndarray]:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def nbytes(self) -> int:
+        raise NotImplementedError
+
+
+class FlatIndex(VectorIndex):
+    """Exact brute-force index over a single contiguous matrix."""
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+        self.store = _VectorStore(dim)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        with self._lock:
+            self.store.add(ids, _normalize(vectors))
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            return self.store.remove(doc_id)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        with self._lock:
+            return self.store.search(_normalize(query)[0], k)
+
+    def search_subset(self, query: np.ndarray, ids: Iterable[str], k: int) -> Tuple[List[str], np.ndarray]:
+        """Score only the given ids, e.g. the items inside a time window"""
+        with self._lock:
+            return self.store.search_subset(_normalize(query)[0], ids, k)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    @property
+    def nbytes(self) -> int:
+        return self.store.nbytes
+
+
+class QuantizedIndex(VectorIndex):
+    """Flat index that keeps compact codes instead of float32 rows.
+
+    "int8" stores one byte per dimension plus a per-vector scale (~4x
+    smaller), "binary" stores only the sign bits (32x smaller) and ranks by
+    Hamming distance. Scores are approximate, so callers fetch
+    ``oversample`` times more candidates and rescore them with the
+    full-precision vectors kept in MongoDB.
+    """
+
+    def __init__(self, dim: int, mode: str = "int8"):
+        super().__init__(dim)
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.mode = mode
+        self.oversample = settings.VECTOR_INDEX_BINARY_OVERSAMPLE if mode == "binary" else 1
+        self.codes = _VectorStore(code_size(dim, mode), dtype=np.int8 if mode == "int8" else np.uint8)
+        # Kept in step with ``codes``: same ids, same swap-removes
+        self.scales = _VectorStore(1) if mode == "int8" else None
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        vectors = _normalize(vectors)
+        with self._lock:
+            if self.mode == "int8":
+                codes, scales = quantize_int8(vectors)
+                self.codes.add(ids, codes)
+                self.scales.add(ids, scales.reshape(-1, 1))
+            else:
+                self.codes.add(ids, binary_codes(vectors))
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            if self.scales is not None:
+                self.scales.remove(doc_id)
+            return self.codes.remove(doc_id)
+
+    def _scores(self, query: np.ndarray, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        codes = self.codes.matrix() if positions is None else self.codes.vectors[positions]
+        if self.mode == "int8":
+            scales = self.scales.matrix()[:, 0] if positions is None else self.scales.vectors[positions, 0]
+            return int8_scores(query, codes, scales)
+        return binary_scores(query, codes, self.dim)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        query = _normalize(query)[0]
+        with self._lock:
+            if len(self.codes) == 0 or k <= 0:
+                return [], np.empty(0, dtype=np.float32)
+            scores = self._scores(query)
+            top = top_k_indices(scores, k)
+            return [self.codes.ids[i] for i in top], scores[top]
+
+    def search_subset(self, query: np.ndarray, ids: Iterable[str], k: int) -> Tuple[List[str], np.ndarray]:
+        query = _normalize(query)[0]
+        with self._lock:
+            positions = np.asarray(
+                [self.codes.positions[doc_id] for doc_id in ids if doc_id in self.codes.positions], dtype=np.int64
+            )
+            if positions.size == 0 or k <= 0:
+                return [], np.empty(0, dtype=np.float32)
+            scores = self._scores(query, positions)
+            top = top_k_indices(scores, k)
+            return [self.codes.ids[positions[i]] for i in top], scores[top]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index: spherical k-means centroids with one store per list.
+
+    Until the index has seen enough vectors to train ``nlist`` centroids it
+    behaves like a FlatIndex, so small collections keep exact results.
+    """
+
+    def __init__(self, dim: int, nlist: int = 256, nprobe: int = 16,
+                 train_iterations: int = 10, min_points_per_list: int = 39):
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.min_points_per_list = min_points_per_list
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[_VectorStore] = []
+        self.assignments: Dict[str, int] = {}
+        self.pending = _VectorStore(dim)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def train_size(self) -> int:
+        """Vectors needed before the centroids are trained"""
+        return self.nlist * self.min_points_per_list
+
+    def build(self, ids: List[str], vectors: np.ndarray):
+        vectors = _normalize(vectors)
+        with self._lock:
+            if not self.is_trained and len(ids) >= self.train_size:
+                self._train(vectors)
+            self._add_normalized(ids, vectors)
+
+    def _train(self, vectors: np.ndarray):
+        rng = np.random.default_rng(0)
+        sample_size = min(len(vectors), self.nlist * 256)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, self.nlist, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=self.nlist)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+            centroids = _normalize(sums)
+
+        self.centroids = centroids
+        self.lists = [_VectorStore(self.dim, capacity=64) for _ in range(self.nlist)]
+
+        # Re-home anything that arrived before training
+        if len(self.pending):
+            pending_ids, pending_vectors = list(self.pending.ids), self.pending.matrix().copy()
+            self.pending = _VectorStore(self.dim)
+            self._add_normalized(pending_ids, pending_vectors)
+        logger.info(f"Trained IVF index with {self.nlist} lists on {sample_size} vectors")
+
+    def _add_normalized(self, ids: List[str], vectors: np.ndarray):
+        for doc_id in ids:
+            self._remove_locked(doc_id)
+
+        if not self.is_trained:
+            self.pending.add(ids, vectors)
+            # A collection that started small is trained as soon as it has grown enough
+            if len(self.pending) >= self.train_size:
+                self._train(self.pending.matrix().copy())
+            return
+
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        for list_no in np.unique(assignment):
+            rows = np.where(assignment == list_no)[0]
+            self.lists[list_no].add([ids[i] for i in rows], vectors[rows])
+            for i in rows:
+                self.assignments[ids[i]] = int(list_no)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        with self._lock:
+            self._add_normalized(list(ids), _normalize(vectors))
+
+    def _remove_locked(self, doc_id: str) -> bool:
+        list_no = self.assignments.pop(doc_id, None)
+        if list_no is not None:
+            return self.lists[list_no].remove(doc_id)
+        return self.pending.remove(doc_id)
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._remove_locked(doc_id)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        query = _normalize(query)[0]
+        with self._lock:
+            if not self.is_trained:
+                return self.pending.search(query, k)
+
+            nprobe = min(self.nprobe, self.nlist)
+            centroid_scores = self.centroids @ query
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+            candidate_ids: List[str] = []
+            candidate_scores: List[np.ndarray] = []
+            for list_no in probe:
+                ids, scores = self.lists[list_no].search(query, k)
+                candidate_ids.extend(ids)
+                candidate_scores.append(scores)
+
+        if not candidate_ids:
+            return [], np.empty(0, dtype=np.float32)
+        scores = np.concatenate(candidate_scores)
+        order = np.argsort(-scores)[:k]
+        return [candidate_ids[i] for i in order], scores[order]
+
+    def search_subset(self, query: np.ndarray, ids: Iterable[str], k: int) -> Tuple[List[str], np.ndarray]:
+        """Score only the given ids, looked up in whichever list holds them"""
+        query = _normalize(query)[0]
+        with self._lock:
+            by_store: Dict[int, List[str]] = {}
+            for doc_id in ids:
+                by_store.setdefault(self.assignments.get(doc_id, -1), []).append(doc_id)
+
+            candidate_ids: List[str] = []
+            candidate_scores: List[np.ndarray] = []
+            for list_no, store_ids in by_store.items():
+                store = self.pending if list_no < 0 else self.lists[list_no]
+                found, scores = store.search_subset(query, store_ids, k)
+                candidate_ids.extend(found)
+                candidate_scores.append(scores)
+
+        if not candidate_ids:
+            return [], np.empty(0, dtype=np.float32)
+        scores = np.concatenate(candidate_scores)
+        order = np.argsort(-scores)[:k]
+        return [candidate_ids[i] for i in order], scores[order]
+
+    def __len__(self) -> int:
+        return len(self.assignments) + len(self.pending)
+
+    @property
+    def nbytes(self) -> int:
+        return self.pending.nbytes + sum(store.nbytes for store in self.lists) + (
+            self.centroids.nbytes if self.centroids is not None else 0
+        )
+
+
+def create_index(dim: int, index_type: Optional[str] = None, quantization: Optional[str] = None) -> VectorIndex:
+    index_type = index_type or settings.VECTOR_INDEX_TYPE
+    quantization = quantization if quantization is not None else settings.VECTOR_INDEX_QUANTIZATION
+    if quantization:
+        # Compact codes are scanned in full; they replace the float32 index type
+        return QuantizedIndex(dim, quantization)
+    if index_type == "flat":
+        return FlatIndex(dim)
+    if index_type == "ivf":
+        return IVFIndex(dim, nlist=settings.VECTOR_INDEX_NLIST, nprobe=settings.VECTOR_INDEX_NPROBE)
+    raise ValueError(f"Unknown vector index type: {index_type}")
+
+
+class VectorIndexRegistry:
+    """Process-wide set of indexes, one per embedding field of multimodal_documents.
+
+    Indexes are built lazily from MongoDB on first use and kept in sync by
+    DataIngestion on insert and delete. Inserts and deletes that arrive while an
+    index is being built are queued and applied before it is published, since the
+    build cursor may already have passed them.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(VectorIndexRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if VectorIndexRegistry._initialized:
+            return
+
+        self.indexes: Dict[str, VectorIndex] = {}
+        # field -> ("add", doc_id, vector) / ("remove", doc_id, None) seen during its build
+        self._building: Dict[str, List[Tuple[str, str, Optional[np.ndarray]]]] = {}
+        self._lock = threading.Lock()
+        # Guards indexes/_building for add/remove; _lock is held for a whole build
+        self._pending_lock = threading.Lock()
+
+        VectorIndexRegistry._initialized = True
+
+    def get_index(self, field: str, collection) -> Optional[VectorIndex]:
+        if field not in self.indexes:
+            with self._lock:
+                if field not in self.indexes:
+                    with self._pending_lock:
+                        self._building[field] = []
+                    index = None
+                    try:
+                        index = self._build_index(field, collection)
+                    finally:
+                        with self._pending_lock:
+                            pending = self._building.pop(field)
+                            if index is not None:
+                                self._apply_pending(index, pending)
+                                self.indexes[field] = index
+                    if index is None:
+                        # Documents queued meanwhile are in MongoDB for the next build
+                        return None
+        return self.indexes[field]
+
+    @staticmethod
+    def _apply_pending(index: VectorIndex, pending: List[Tuple[str, str, Optional[np.ndarray]]]):
+        for operation, doc_id, vector in pending:
+            if operation == "add":
+                index.add([doc_id], vector)
+            else:
+                index.remove(doc_id)
+        if pending:
+            logger.info(f"Applied {len(pending)} changes made during the index build")
+
+    def _build_index(self, field: str, collection) -> Optional[VectorIndex]:
+        doc_ids, embeddings = fetch_embeddings(
+            collection, {}, field, batch_size=settings.VECTOR_INDEX_BUILD_BATCH_SIZE
+        )
+        ids = [str(doc_id) for doc_id, vector in zip(doc_ids, embeddings) if vector is not None and len(vector)]
+        vectors = [vector for vector in embeddings if vector is not None and len(vector)]
+
+        if not vectors:
+            logger.info(f"No documents with {field}, vector index not built yet")
+            return None
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        index = create_index(matrix.shape[1])
+        index.build(ids, matrix)
+        logger.info(f"Built {type(index).__name__} for {field} with {len(index)} vectors")
+        return index
+
+    def add_document(self, doc_id: Any, doc: Dict[str, Any]):
+        for field in EMBEDDING_FIELDS:
+            vector = decode_embedding(doc.get(field))
+            if vector is None or not len(vector):
+                continue
+            vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+            with self._pending_lock:
+                index = self.indexes.get(field)
+                if index is None:
+                    if field in self._building:
+                        self._building[field].append(("add", str(doc_id), vector))
+                    # Otherwise built from MongoDB on first search, which will include this document
+                    continue
+            index.add([str(doc_id)], vector)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            field: {
+                "type": type(index).__name__,
+                "quantization": getattr(index, "mode", None),
+                "vectors": len(index),
+                "bytes": index.nbytes,
+                "bytes_per_vector": round(index.nbytes / len(index), 1) if len(index) else 0
+            }
+            for field, index in list(self.indexes.items())
+        }
+
+    def remove_document(self, doc_id: Any):
+        with self._pending_lock:
+            indexes = list(self.indexes.values())
+            for pending in self._building.values():
+                pending.append(("remove", str(doc_id), None))
+        for index in indexes:
+            index.remove(str(doc_id))
+
+    def reset(self, fields: Optional[Iterable[str]] = None):
+        with self._lock, self._pending_lock:
+            for field in list(fields or self.indexes.keys()):
+                self.indexes.pop(field, None)
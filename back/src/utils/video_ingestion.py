@@ -0,0 +1,235 @@
+import time
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+from bson import ObjectId
+
+try:
+    import cv2
+except ImportError:  # frame extraction is unavailable without opencv-python-headless
+    cv2 = None
+
+from ..config import settings
+from ..database.mongodb_client import MongoDBClient
+from ..database.embedding_codec import decode_embedding, encode_document_embeddings
+from ..database.queries import fetch_documents_by_ids
+from ..database.schemas import VideoInfo, FrameData
+from ..models.embeddings import MultimodalEmbedder
+from .image_hash import dhash, hamming_distance
+from .jobs import JobCancelled
+from .temporal_index import TemporalIndexCache
+
+logger = logging.getLogger(__name__)
+
+
+class FrameSampler:
+    """Chooses which sampled frames to keep.
+
+    In "fps" mode every candidate is kept. In "keyframes" mode a candidate is
+    kept only if its dHash differs from the last kept frame by at least
+    ``hash_threshold`` bits, or ``max_gap`` seconds have passed since then.
+    """
+
+    def __init__(self, mode: Optional[str] = None, hash_threshold: Optional[int] = None,
+                 max_gap: Optional[float] = None):
+        self.mode = mode or settings.VIDEO_FRAME_SAMPLING
+        self.hash_threshold = hash_threshold if hash_threshold is not None else settings.VIDEO_KEYFRAME_HASH_THRESHOLD
+        self.max_gap = max_gap if max_gap is not None else settings.VIDEO_KEYFRAME_MAX_GAP_SECONDS
+        self.last_hash: Optional[int] = None
+        self.last_timestamp: Optional[float] = None
+        self.skipped = 0
+
+    def keep(self, image: Image.Image, timestamp: float) -> Tuple[bool, int]:
+        frame_hash = dhash(image)
+        if self.mode == "keyframes" and self.last_hash is not None:
+            changed = hamming_distance(frame_hash, self.last_hash) >= self.hash_threshold
+            if not changed and timestamp - self.last_timestamp < self.max_gap:
+                self.skipped += 1
+                return False, frame_hash
+        self.last_hash = frame_hash
+        self.last_timestamp = timestamp
+        return True, frame_hash
+
+
+class VideoIngestion:
+    def __init__(self, embedder=None):
+        self.db_client = MongoDBClient()
+        self.db_client.connect()
+        self.videos = self.db_client.get_collection("videos")
+        self.frames = self.db_client.get_collection("video_frames")
+        self.embedder = embedder or MultimodalEmbedder()
+        # Keyed by (video_id, updated_at) so a re-processed video is reloaded
+        self.frame_timelines = TemporalIndexCache(self._load_frame_timeline)
+
+        self._create_indexes()
+
+    def _create_indexes(self):
+        self.frames.create_index([("video_id", 1), ("timestamp", 1)])
+        self.videos.create_index("created_at")
+        logger.info("Created video indexes")
+
+    def register_video(self, title: str, filename: str, file_path: str,
+                       metadata: Optional[Dict[str, Any]] = None) -> str:
+        video = VideoInfo(title=title, filename=filename, file_path=file_path, metadata=metadata or {})
+        result = self.videos.insert_one(video.dict(by_alias=True, exclude={"id"}))
+        logger.info(f"Registered video {filename} with ID: {result.inserted_id}")
+        return str(result.inserted_id)
+
+    def get_video(self, video_id: str) -> Optional[Dict[str, Any]]:
+        if not ObjectId.is_valid(video_id):
+            return None
+        return self.videos.find_one({"_id": ObjectId(video_id)})
+
+    def _update_video(self, video_id: str, fields: Dict[str, Any]):
+        fields["updated_at"] = datetime.utcnow()
+        self.videos.update_one({"_id": ObjectId(video_id)}, {"$set": fields})
+
+    def _load_frame_timeline(self, key):
+        video_id, _ = key
+        ids, timestamps, embeddings = [], [], []
+        cursor = self.frames.find(
+            {"video_id": video_id}, {"_id": 1, "timestamp": 1, "image_embedding": 1}
+        ).sort("timestamp", 1)
+        for frame in cursor:
+            ids.append(frame["_id"])
+            timestamps.append(frame["timestamp"])
+            embeddings.append(decode_embedding(frame.get("image_embedding")))
+        return ids, timestamps, embeddings
+
+    def search_frames(self, video_id: str, query_embedding: np.ndarray, top_k: int = 10,
+                      start_time: Optional[float] = None, end_time: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """Rank the frames of one video inside [start_time, end_time] against an image embedding"""
+        video = self.get_video(video_id)
+        if video is None:
+            return None
+        timeline = self.frame_timelines.get((video_id, video.get("updated_at")))
+        ranked = timeline.search(query_embedding, top_k, start_time, end_time)
+        scores = dict(ranked)
+        frames = fetch_documents_by_ids(self.frames, [frame_id for frame_id, _ in ranked], {"image_embedding": 0})
+        for frame in frames:
+            frame["score"] = scores[frame["_id"]]
+        return frames
+
+    def _iter_frames(self, capture, fps: float, sample_fps: float) -> Iterator[Tuple[int, float, np.ndarray]]:
+        # grab() every frame (needed for inter-frame codecs) but only convert the sampled ones
+        step = max(1, round(fps / sample_fps)) if fps > 0 else 1
+        frame_number = -1
+        while capture.grab():
+            frame_number += 1
+            if frame_number % step:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            timestamp = frame_number / fps if fps > 0 else capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            yield frame_number, timestamp, frame
+
+    def _save_frame(self, image: Image.Image, video_id: str, frame_number: int) -> str:
+        frame_dir = settings.VIDEO_FRAMES_DIR / video_id
+        frame_dir.mkdir(parents=True, exist_ok=True)
+        frame_path = frame_dir / f"frame_{frame_number:08d}.jpg"
+        stored = image.copy()
+        stored.thumbnail((settings.VIDEO_FRAME_MAX_SIDE, settings.VIDEO_FRAME_MAX_SIDE))
+        stored.save(frame_path, "JPEG", quality=settings.VIDEO_FRAME_JPEG_QUALITY)
+        return str(frame_path)
+
+    def _flush(self, video_id: str, batch: List[Dict[str, Any]]) -> int:
+        embeddings = self.embedder.embed_image([item["image"] for item in batch], use_cache=False)
+        docs = []
+        for item, embedding in zip(batch, embeddings):
+            frame = FrameData(
+                video_id=video_id,
+                frame_number=item["frame_number"],
+                timestamp=item["timestamp"],
+                image_path=item["image_path"],
+                image_embedding=embedding.tolist(),
+                metadata={"dhash": f"{item['dhash']:016x}", "content_type": "frame"}
+            )
+            docs.append(encode_document_embeddings(frame.dict(by_alias=True, exclude={"id"})))
+        self.frames.insert_many(docs, ordered=False)
+        return len(docs)
+
+    def extract_frames(self, video_id: str, sample_fps: Optional[float] = None, sampling: Optional[str] = None,
+                       progress_callback: Optional[Callable[..., None]] = None,
+                       is_cancelled: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """Decode the stored video, keep sampled/key frames, embed them in batches
+        and store them as FrameData rows; the video document tracks progress"""
+        video = self.get_video(video_id)
+        if video is None:
+            raise ValueError(f"Video not found: {video_id}")
+        if cv2 is None:
+            self._update_video(video_id, {"status": "failed", "error": "opencv-python-headless is not installed"})
+            raise RuntimeError("Frame extraction requires opencv-python-headless")
+
+        sample_fps = sample_fps or settings.VIDEO_SAMPLE_FPS
+        sampler = FrameSampler(mode=sampling)
+        started = time.perf_counter()
+        capture = cv2.VideoCapture(video["file_path"])
+        if not capture.isOpened():
+            self._update_video(video_id, {"status": "failed", "error": "Could not open video file"})
+            raise ValueError(f"Could not open video file: {video['file_path']}")
+
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+            frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            self._update_video(video_id, {
+                "status": "processing",
+                "error": None,
+                "fps": fps,
+                "frame_count": frame_count,
+                "width": int(capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+                "height": int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0),
+                "duration": frame_count / fps if fps > 0 else None,
+                "frames_indexed": 0
+            })
+            video_duration = frame_count / fps if fps > 0 else None
+            # Re-processing replaces earlier frames
+            self.frames.delete_many({"video_id": video_id})
+
+            batch: List[Dict[str, Any]] = []
+            indexed = 0
+            for frame_number, timestamp, frame in self._iter_frames(capture, fps, sample_fps):
+                if is_cancelled is not None and is_cancelled():
+                    raise JobCancelled(f"Frame extraction of video {video_id} was cancelled")
+                image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                keep, frame_hash = sampler.keep(image, timestamp)
+                if not keep:
+                    continue
+                batch.append({
+                    "image": image,
+                    "frame_number": frame_number,
+                    "timestamp": timestamp,
+                    "dhash": frame_hash,
+                    "image_path": self._save_frame(image, video_id, frame_number)
+                })
+                if len(batch) >= settings.VIDEO_EMBED_BATCH_SIZE:
+                    indexed += self._flush(video_id, batch)
+                    batch = []
+                    self._update_video(video_id, {"frames_indexed": indexed, "processed_seconds": timestamp})
+                    if progress_callback is not None:
+                        progress_callback(frames_indexed=indexed, processed_seconds=timestamp, duration=video_duration)
+            if batch:
+                indexed += self._flush(video_id, batch)
+        except JobCancelled:
+            self._update_video(video_id, {"status": "cancelled"})
+            raise
+        except Exception as e:
+            self._update_video(video_id, {"status": "failed", "error": str(e)})
+            raise
+        finally:
+            capture.release()
+
+        elapsed = time.perf_counter() - started
+        self._update_video(video_id, {"status": "ready", "frames_indexed": indexed})
+        logger.info(
+            f"Indexed {indexed} frames of video {video_id} ({sampler.skipped} near-duplicates skipped) in {elapsed:.1f}s"
+        )
+        return {
+            "video_id": video_id,
+            "frames_indexed": indexed,
+            "frames_skipped": sampler.skipped,
+            "elapsed_seconds": round(elapsed, 3)
+        }
@@ -0,0 +1,200 @@
+import io
+import math
+import base64
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from ..config import settings
+from .image_hash import dhash
+
+logger = logging.getLogger(__name__)
+
+# How the vision models bill an image: "low" is a flat 512x512 view; "high" fits the
+# image in 2048x2048, shrinks the shortest side to 768 and counts 512px tiles
+LOW_DETAIL_SIZE = 512
+HIGH_DETAIL_MAX_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+TILE_SIZE = 512
+
+def high_detail_size(width: int, height: int) -> Tuple[int, int]:
+    """Size the API scales a "high" detail image to (it never upscales)"""
+    scale = min(1.0, HIGH_DETAIL_MAX_SIDE / max(width, height))
+    short_side = min(width, height) * scale
+    if short_side > HIGH_DETAIL_SHORT_SIDE:
+        scale *= HIGH_DETAIL_SHORT_SIDE / short_side
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def tile_count(width: int, height: int) -> int:
+    return math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+
+
+def estimate_vision_tokens(width: int, height: int, detail: str) -> int:
+    if detail == "low":
+        return settings.VISION_BASE_TOKENS
+    return settings.VISION_BASE_TOKENS + settings.VISION_TILE_TOKENS * tile_count(*high_detail_size(width, height))
+
+
+def snap_to_tiles(width: int, height: int) -> Tuple[int, int]:
+    """Shrink slightly (not below VISION_TILE_SNAP_MIN_SCALE) when that drops a row or column of tiles"""
+    best = (width, height)
+    for side in (width, height):
+        tiles = math.ceil(side / TILE_SIZE)
+        if tiles <= 1:
+            continue
+        scale = (tiles - 1) * TILE_SIZE / side
+        if scale >= settings.VISION_TILE_SNAP_MIN_SCALE:
+            candidate = (max(1, math.floor(width * scale)), max(1, math.floor(height * scale)))
+            if tile_count(*candidate) < tile_count(*best):
+                best = candidate
+    return best
+
+
+def edge_density(image: Image.Image) -> float:
+    """Mean absolute neighbour difference of a 256px grayscale copy, in [0, 1]"""
+    gray = image.convert("L")
+    gray.thumbnail((256, 256))
+    pixels = np.asarray(gray, dtype=np.float32) / 255.0
+    if pixels.shape[0] < 2 or pixels.shape[1] < 2:
+        return 0.0
+    return float((np.abs(np.diff(pixels, axis=0)).mean() + np.abs(np.diff(pixels, axis=1)).mean()) / 2)
+
+
+class PreparedFrame:
+    def __init__(self, data_url: str, detail: str, phash: int, original_size: Tuple[int, int],
+                 size: Tuple[int, int], original_bytes: int, encoded_bytes: int):
+        self.data_url = data_url
+        self.detail = detail
+        self.phash = phash
+        self.original_size = original_size
+        self.size = size
+        self.original_bytes = original_bytes
+        self.encoded_bytes = encoded_bytes
+        # What forwarding the frame unchanged with "detail": "high" would have cost
+        self.original_tokens = estimate_vision_tokens(*original_size, "high")
+        self.tokens = estimate_vision_tokens(*size, detail)
+
+    def report(self, cached: bool) -> Dict[str, Any]:
+        return {
+            "detail": self.detail,
+            "original_size": list(self.original_size),
+            "size": list(self.size),
+            "original_bytes": self.original_bytes,
+            "bytes": self.encoded_bytes,
+            "bytes_saved": self.original_bytes - self.encoded_bytes,
+            "original_tokens": self.original_tokens,
+            "tokens": self.tokens,
+            "tokens_saved": self.original_tokens - self.tokens,
+            "cached": cached
+        }
+
+
+class FramePreprocessor:
+    """Prepares captured frames for vision requests: decode once, downscale to
+    what the model will look at, pick ``detail`` and re-encode compactly.
+
+    Results are cached (LRU) by the SHA-256 of the frame string, so follow-up
+    questions about the same paused frame skip the work entirely.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.VISION_FRAME_CACHE_MAX_ENTRIES
+        self.entries: "OrderedDict[str, PreparedFrame]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+        self.details: Dict[str, int] = {"low": 0, "high": 0}
+        self._lock = threading.Lock()
+
+    def prepare(self, captured_frame: str) -> Tuple[PreparedFrame, bool]:
+        """(prepared frame, whether it came from the cache); ValueError if it is not an image"""
+        key = hashlib.sha256(captured_frame.encode()).hexdigest()
+        with self._lock:
+            frame = self.entries.get(key)
+            if frame is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if frame is None:
+            frame = self._process(captured_frame)
+            with self._lock:
+                self.misses += 1
+                self.entries[key] = frame
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            cached = False
+        else:
+            cached = True
+        with self._lock:
+            self.bytes_saved += frame.original_bytes - frame.encoded_bytes
+            self.tokens_saved += frame.original_tokens - frame.tokens
+            self.details[frame.detail] += 1
+        return frame, cached
+
+    def _choose_detail(self, image: Image.Image, original_size: Tuple[int, int]) -> str:
+        if settings.VISION_DETAIL in ("low", "high"):
+            return settings.VISION_DETAIL
+        # "low" sees a 512x512 version, so a frame that already fits loses nothing,
+        # and near-uniform frames (fades, black screens) have no detail to tile
+        if max(original_size) <= LOW_DETAIL_SIZE:
+            return "low"
+        if edge_density(image) < settings.VISION_LOW_DETAIL_MAX_EDGE_DENSITY:
+            return "low"
+        return "high"
+
+    def _process(self, captured_frame: str) -> PreparedFrame:
+        try:
+            data = base64.b64decode(captured_frame.split(',')[1] if ',' in captured_frame else captured_frame)
+            image = Image.open(io.BytesIO(data))
+            original_size = image.size
+            # JPEG frames are decoded directly at a reduced scale when that is enough
+            image.draft("RGB", high_detail_size(*original_size))
+            image = image.convert("RGB")
+        except Exception as e:
+            raise ValueError(f"captured_frame is not a valid image: {e}")
+
+        detail = self._choose_detail(image, original_size)
+        if detail == "low":
+            scale = min(1.0, LOW_DETAIL_SIZE / max(original_size))
+            size = (max(1, round(original_size[0] * scale)), max(1, round(original_size[1] * scale)))
+        else:
+            size = snap_to_tiles(*high_detail_size(*original_size))
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        image_format = settings.VISION_IMAGE_FORMAT.upper()
+        image.save(buffer, image_format, quality=settings.VISION_IMAGE_QUALITY)
+        encoded = buffer.getvalue()
+        mime_type = "image/webp" if image_format == "WEBP" else "image/jpeg"
+        data_url = f"data:{mime_type};base64,{base64.b64encode(encoded).decode()}"
+
+        # Already small enough: keep the frame as sent rather than re-encoding it bigger
+        if size == original_size and len(encoded) >= len(data) and captured_frame.startswith("data:image/"):
+            data_url, encoded = captured_frame, data
+
+        frame = PreparedFrame(data_url, detail, dhash(image), original_size, size, len(data), len(encoded))
+        logger.debug(
+            f"Prepared frame {original_size} -> {size} ({detail}): {len(data)} -> {len(encoded)} bytes, "
+            f"~{frame.original_tokens} -> {frame.tokens} tokens"
+        )
+        return frame
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "details": dict(self.details),
+                "bytes_saved": self.bytes_saved,
+                "tokens_saved": self.tokens_saved
+            }
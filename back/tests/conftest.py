@@ -0,0 +1,14 @@
+import pytest
+
+from src.database import mongodb_client
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """In-memory MongoDB behind the shared client, fresh for each test"""
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(mongodb_client, "MongoClient", lambda *args, **kwargs: client)
+    monkeypatch.setattr(mongodb_client, "_shared_client", None)
+    monkeypatch.setattr(mongodb_client, "_shared_refs", 0)
+    return client
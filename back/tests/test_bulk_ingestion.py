@@ -0,0 +1,10 @@
+from src.utils.bulk_ingestion import InvalidRecord, iter_ndjson
+
+
+def test_iter_ndjson_joins_lines_split_across_chunks():
+    chunks = [b'{"a": 1}\n{"b"', b': "', b'xyz"}\n\n', b'not json\n{"c": 3}']
+    records = list(iter_ndjson(chunks))
+
+    assert records[:2] == [{"a": 1}, {"b": "xyz"}]
+    assert isinstance(records[2], InvalidRecord) and "line 4" in str(records[2])
+    assert records[3] == {"c": 3}
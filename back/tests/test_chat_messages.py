@@ -0,0 +1,32 @@
+from src.config import settings
+from src.utils.chat_messages import ChatMessageStore
+
+
+def save(store, rooms, messages, base_seq=0):
+    """The reserve-then-append sequence of POST /chatrooms/save"""
+    end_seq = base_seq + len(messages)
+    previous = store.reserve(
+        rooms, "u1", "r1",
+        {"$set": {"name": "room"}, "$max": {"stats.message_count": end_seq}},
+        {"stats": 1}
+    ) or {}
+    stored_count = previous.get("stats", {}).get("message_count", 0)
+    new_messages = messages[stored_count - base_seq:]
+    store.append("u1", "r1", stored_count, new_messages)
+    return len(new_messages)
+
+
+def test_first_save_of_legacy_room_appends_only_new_messages(mongo):
+    rooms = mongo[settings.MONGODB_DB_NAME]["user_chat_rooms"]
+    legacy = [{"content": f"m{i}"} for i in range(3)]
+    rooms.insert_one({"user_id": "u1", "room_id": "r1", "messages": legacy})
+    store = ChatMessageStore()
+
+    appended = save(store, rooms, legacy + [{"content": "m3"}])
+
+    assert appended == 1
+    messages = store.page("u1", "r1", end_seq=100, limit=100)
+    assert [(m["seq"], m["content"]) for m in messages] == [(0, "m0"), (1, "m1"), (2, "m2"), (3, "m3")]
+    room = rooms.find_one({"room_id": "r1"})
+    assert "messages" not in room and "migrating" not in room
+    assert room["stats"]["message_count"] == 4
@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.utils.conversation_cache import ConversationEmbeddingCache
+
+
+def unit(seed: int) -> np.ndarray:
+    vector = np.random.default_rng(seed).standard_normal(8).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_conversations_saved_during_a_cold_load_are_searchable():
+    cache = ConversationEmbeddingCache(quantization="")
+    old, new = unit(0), unit(1)
+
+    def loader(user_id):
+        # The conversation is saved after the loader's snapshot was taken
+        cache.append(user_id, "new", new.tolist())
+        return ["old"], [old.tolist()]
+
+    assert cache.search("u1", new, 1, loader)[0][0] == "new"
+    # Served from the published entry, without another load
+    assert cache.search("u1", new, 1, lambda user_id: ([], []))[0][0] == "new"
+    assert cache.stats()["misses"] == 1
+    assert cache._pending == {}
+
+
+def test_invalidation_during_a_load_keeps_the_snapshot_unpublished():
+    cache = ConversationEmbeddingCache(quantization="")
+
+    def loader(user_id):
+        cache.invalidate(user_id)
+        return ["old"], [unit(0).tolist()]
+
+    assert cache.search("u1", unit(0), 1, loader)[0][0] == "old"
+    assert cache.stats()["users"] == 0
@@ -0,0 +1,29 @@
+import numpy as np
+
+from src.models.embedding_scheduler import EmbeddingScheduler
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.encoded = []
+
+    def embed_text(self, texts):
+        self.encoded.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_cancelled_request_is_skipped_and_worker_keeps_serving():
+    embedder = FakeEmbedder()
+    scheduler = EmbeddingScheduler(embedder, max_batch_size=8, max_wait_ms=100)
+    try:
+        cancelled = scheduler._submit("text", ["gone"])
+        assert cancelled.cancel()
+
+        result = scheduler._submit("text", ["kept"]).result(timeout=5)
+        assert result.shape == (1, 4)
+        assert ["gone"] not in embedder.encoded
+        assert scheduler._workers["text"].is_alive()
+
+        assert scheduler.embed_text("again").shape == (1, 4)
+    finally:
+        scheduler.stop()
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from src.config import settings
+from src.utils.jobs import JobQueue
+
+
+def test_requeue_stale_releases_uploads_of_jobs_it_gives_up_on(mongo):
+    released = []
+    queue = JobQueue(workers=0)
+    queue.register(
+        "ingest_image", lambda params, context: None,
+        on_abandon=lambda params: released.append(params["image_hash"])
+    )
+    long_ago = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS * 2)
+
+    for attempts, image_hash in ((settings.JOB_MAX_ATTEMPTS, "exhausted"), (1, "retried")):
+        job_id = queue.submit("ingest_image", {"image_hash": image_hash})
+        queue.collection.update_one(
+            {"_id": queue.get(job_id)["_id"]},
+            {"$set": {"status": "running", "attempts": attempts, "heartbeat_at": long_ago}}
+        )
+
+    assert queue.requeue_stale() == 1
+    assert released == ["exhausted"]
+    statuses = {job["status"] for job in queue.list_jobs()}
+    assert statuses == {"failed", "queued"}
+
+    # Already failed: a second sweep must not release it again
+    queue.requeue_stale()
+    assert released == ["exhausted"]
@@ -0,0 +1,53 @@
+import numpy as np
+
+from src.utils import vector_index
+from src.utils.vector_index import IVFIndex, VectorIndexRegistry
+
+
+def random_vectors(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def test_ivf_index_trains_once_incremental_adds_cross_the_threshold():
+    index = IVFIndex(dim=16, nlist=4, nprobe=4, min_points_per_list=10)
+    vectors = random_vectors(60, 16)
+    ids = [f"doc{i}" for i in range(60)]
+
+    index.build(ids[:10], vectors[:10])
+    assert not index.is_trained
+
+    for start in range(10, 60, 5):
+        index.add(ids[start:start + 5], vectors[start:start + 5])
+        assert index.is_trained == (start + 5 >= index.train_size)
+
+    assert index.is_trained
+    assert len(index) == 60
+    assert len(index.pending) == 0
+    assert set(index.assignments) == set(ids)
+
+    # nprobe == nlist, so the trained index is still exact
+    found, scores = index.search(vectors[42], 1)
+    assert found == ["doc42"]
+    assert np.isclose(scores[0], 1.0, atol=1e-5)
+
+
+def test_registry_keeps_changes_made_while_an_index_builds(monkeypatch):
+    registry = VectorIndexRegistry()
+    registry.reset()
+    vectors = random_vectors(3, 16, seed=1)
+
+    def fetch_during_concurrent_writes(collection, query, field, batch_size):
+        # The build cursor has passed these documents when they are inserted / deleted
+        registry.add_document("late", {"text_embedding": vectors[2].tolist()})
+        registry.remove_document("deleted")
+        return ["kept", "deleted"], [vectors[0].tolist(), vectors[1].tolist()]
+
+    monkeypatch.setattr(vector_index, "fetch_embeddings", fetch_during_concurrent_writes)
+    try:
+        index = registry.get_index("text_embedding", collection=None)
+        assert len(index) == 2
+        assert index.search(vectors[2], 1)[0] == ["late"]
+        assert "deleted" not in index.search(vectors[1], 2)[0]
+        assert registry._building == {}
+    finally:
+        registry.reset()
@@ -1,26 +1,53 @@
 import api from '../client';
 
-// 채팅방 저장
+// 채팅방별로 서버에 저장된 메시지 수 (다음 저장 때는 그 이후 메시지만 전송)
+const savedMessageCounts = new Map();
+
+export const markChatRoomSaved = (roomId, messageCount) => {
+  savedMessageCounts.set(roomId.toString(), messageCount);
+};
+
+// 채팅방 저장 (새 메시지만 추가)
 export const saveChatRoom = async (chatRoom, videoId) => {
   if (!videoId) {
     return { skipped: true };
   }
 
-  const requestBody = {
-    room_id: chatRoom.id.toString(),
+  const roomId = chatRoom.id.toString();
+  const savedCount = savedMessageCounts.get(roomId);
+
+  const buildRequestBody = (baseSeq) => ({
+    room_id: roomId,
     name: chatRoom.name,
-    messages: chatRoom.messages,
-    captured_frame: chatRoom.capturedFrame,
+    messages: chatRoom.messages.slice(baseSeq),
+    base_seq: baseSeq,
+    // 프레임은 처음 저장할 때만 전송
+    captured_frame: savedCount === undefined ? chatRoom.capturedFrame : null,
     frame_time: chatRoom.frameTime ? chatRoom.frameTime.toISOString() : null,
     video_current_time: chatRoom.videoCurrentTime,
     video_id: videoId,
-  };
-
-  const response = await api.post('/chatrooms/save', requestBody, {
-    headers: {
-      'Content-Type': 'application/json',
-    },
   });
+
+  const post = (baseSeq) =>
+    api.post('/chatrooms/save', buildRequestBody(baseSeq), {
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+  const baseSeq = Math.min(savedCount || 0, chatRoom.messages.length);
+  let response;
+  try {
+    response = await post(baseSeq);
+  } catch (error) {
+    // 서버에 저장된 메시지 수와 어긋나면 전체 메시지로 다시 저장
+    if (error.response?.status !== 409 || baseSeq === 0) {
+      throw error;
+    }
+    response = await post(0);
+  }
+
+  markChatRoomSaved(roomId, response.data.message_count);
   return response.data;
 };
 
@@ -36,6 +63,26 @@ export const getAllChatRooms = async () => {
   return response.data;
 };
 
+// 채팅방 상세 조회 (메시지는 최근 것부터 페이지 단위, beforeSeq 이전 메시지)
+export const getChatRoomDetails = async (roomId, { limit, beforeSeq } = {}) => {
+  const params = {};
+  if (limit) params.limit = limit;
+  if (beforeSeq !== undefined && beforeSeq !== null) params.before_seq = beforeSeq;
+  const response = await api.get(`/chatrooms/${roomId}/details`, { params });
+  return response.data;
+};
+
+// 채팅방의 모든 메시지 조회
+export const getAllChatRoomMessages = async (roomId) => {
+  let page = await getChatRoomDetails(roomId);
+  let messages = page.messages;
+  while (page.has_more) {
+    page = await getChatRoomDetails(roomId, { beforeSeq: page.first_seq });
+    messages = [...page.messages, ...messages];
+  }
+  return messages;
+};
+
 // 채팅방 삭제
 export const deleteChatRoom = async (roomId) => {
   const response = await api.delete(`/chatrooms/${roomId}`);
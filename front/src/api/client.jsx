@@ -12,18 +12,25 @@ const api = axios.create({
   timeout: 5000,
 });
 
-// 요청 인터셉터 (토큰 자동 주입, 사용자 ID 자동 추가)
-api.interceptors.request.use((config) => {
+// 인증 헤더 (axios를 거치지 않는 fetch 요청에도 사용)
+export const getAuthHeaders = () => {
+  const headers = {};
   const token = localStorage.getItem('auth_token');
 
   if (token) {
-    config.headers.Authorization = `Bearer ${token}`;
+    headers.Authorization = `Bearer ${token}`;
   }
 
   if (currentUser?.id) {
-    config.headers['X-User-ID'] = currentUser.id;
+    headers['X-User-ID'] = currentUser.id;
   }
 
+  return headers;
+};
+
+// 요청 인터셉터 (토큰 자동 주입, 사용자 ID 자동 추가)
+api.interceptors.request.use((config) => {
+  Object.assign(config.headers, getAuthHeaders());
   return config;
 });
 
@@ -191,13 +191,13 @@ const ConversationHistory = ({ onSelectChatRoom, className = '', refreshTrigger
                       : chatRoom.name}
                   </div>
                   <div className={styles.messageCount}>
-                    메시지 {chatRoom.messages?.length || 0}개
+                    메시지 {chatRoom.message_count || 0}개
                   </div>
                   <div className={styles.lastMessage}>
-                    {chatRoom.messages && chatRoom.messages.length > 0
-                      ? chatRoom.messages[chatRoom.messages.length - 1].text.length > 30
-                        ? `${chatRoom.messages[chatRoom.messages.length - 1].text.substring(0, 30)}...`
-                        : chatRoom.messages[chatRoom.messages.length - 1].text
+                    {chatRoom.last_message?.text
+                      ? chatRoom.last_message.text.length > 30
+                        ? `${chatRoom.last_message.text.substring(0, 30)}...`
+                        : chatRoom.last_message.text
                       : '메시지가 없습니다'}
                   </div>
                 </div>
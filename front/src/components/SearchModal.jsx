@@ -156,7 +156,11 @@ const SearchModal = ({ onClose }) => {
                             {result.question_image && (
                               <div className={styles.questionImage}>
                                 <img
-                                  src={result.question_image}
+                                  src={
+                                    result.question_image.startsWith('/')
+                                      ? `http://localhost:8000${result.question_image}`
+                                      : result.question_image
+                                  }
                                   alt='질문 관련 이미지'
                                   className={styles.conversationImagePreview}
                                   onError={(e) => {
@@ -199,7 +203,11 @@ const SearchModal = ({ onClose }) => {
                               <div className={styles.imagePreview}>
                                 <strong>이미지:</strong>
                                 <img
-                                  src={`http://localhost:8000/uploads/${result.image_path.split('/').pop()}`}
+                                  src={
+                                    result.image_url
+                                      ? `http://localhost:8000${result.image_url}`
+                                      : `http://localhost:8000/uploads/${result.image_path.split('/').pop()}`
+                                  }
                                   alt='RAG 문서 이미지'
                                   className={styles.ragImagePreview}
                                   onError={(e) => {
@@ -1,6 +1,7 @@
 import { useState, useRef, useEffect } from 'react';
 import { useAuth } from '../utils/authContext';
 import { getApiKeyStatus } from '../api/users';
+import { getAllChatRoomMessages, markChatRoomSaved } from '../api/chatrooms';
 import VideoPlayer from '../components/VideoPlayer';
 import ChatSection from '../components/ChatSection';
 import ChatRoomList from '../components/ChatRoomList';
@@ -152,14 +153,25 @@ function MainPage() {
     setCurrentChatRoomId
   );
 
-  const handleSelectChatRoom = (selectedChatRoom) => {
+  const handleSelectChatRoom = async (selectedChatRoom) => {
     if (!selectedChatRoom) {
       return;
     }
 
     const normalizedRoomId = selectedChatRoom.room_id || selectedChatRoom.id || Date.now().toString();
 
-    const processedMessages = (selectedChatRoom.messages || []).map((message, index) => ({
+    // 목록에는 메시지가 없으므로 상세 조회로 페이지 단위로 불러옴
+    let messages = selectedChatRoom.messages || [];
+    if (selectedChatRoom.room_id) {
+      try {
+        messages = await getAllChatRoomMessages(selectedChatRoom.room_id);
+        markChatRoomSaved(normalizedRoomId, messages.length);
+      } catch (error) {
+        console.error('Failed to load chat room messages:', error);
+      }
+    }
+
+    const processedMessages = messages.map((message, index) => ({
       ...message,
       id: message.id || `${normalizedRoomId}-msg-${index}`,
       timestamp: message.timestamp instanceof Date ? message.timestamp : new Date(message.timestamp || Date.now()),
@@ -56,6 +56,15 @@ export const addMessageToChatRoom = (chatRooms, roomId, message) => {
   return chatRooms.map((room) => (room.id === roomId ? { ...room, messages: [...room.messages, message] } : room));
 };
 
+// 채팅방의 메시지 수정 (스트리밍 중인 응답 갱신)
+export const updateMessageInChatRoom = (chatRooms, roomId, messageId, changes) => {
+  return chatRooms.map((room) =>
+    room.id === roomId
+      ? { ...room, messages: room.messages.map((message) => (message.id === messageId ? { ...message, ...changes } : message)) }
+      : room
+  );
+};
+
 // 채팅방 삭제
 export const deleteChatRoomById = (chatRooms, roomId) => {
   return chatRooms.filter((room) => room.id !== roomId);
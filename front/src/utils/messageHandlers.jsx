@@ -1,7 +1,6 @@
-import { callOpenAI } from './openai';
-import { getCurrentChatRoom, addMessageToChatRoom } from './chatRoomManager';
+import { streamOpenAI } from './openai';
+import { getCurrentChatRoom, addMessageToChatRoom, updateMessageInChatRoom } from './chatRoomManager';
 import { saveChatRoom } from '../api/chatrooms';
-import { saveConversation } from '../api/conversations';
 import { saveApiKey, deleteApiKey } from '../api/users';
 
 // 메시지 전송 핸들러
@@ -55,16 +54,35 @@ export const createSendMessageHandler = (
     if (isApiKeySet) {
       setIsLoading(true);
       try {
-        const aiResponse = await callOpenAI(currentMessage, videoFile, currentRoom.capturedFrame);
+        const responseId = currentRoom.messages.length + 2;
+        setChatRooms((prev) =>
+          addMessageToChatRoom(prev, currentChatRoomId, { id: responseId, text: '', sender: 'ai', timestamp: new Date() })
+        );
+
+        // 토큰이 도착하는 대로 응답을 표시하고, 완료된 응답은 서버가 검색 가능한 대화로 저장
+        const { text: aiResponse, conversationId } = await streamOpenAI(
+          {
+            message: currentMessage,
+            videoFile,
+            capturedFrame: currentRoom.capturedFrame,
+            videoId,
+            timestamp: currentRoom.videoCurrentTime,
+            saveConversation: true,
+          },
+          (partialText) => {
+            setIsLoading(false);
+            setChatRooms((prev) => updateMessageInChatRoom(prev, currentChatRoomId, responseId, { text: partialText }));
+          }
+        );
 
         const responseMessage = {
-          id: currentRoom.messages.length + 2,
+          id: responseId,
           text: aiResponse,
           sender: 'ai',
           timestamp: new Date(),
         };
 
-        setChatRooms((prev) => addMessageToChatRoom(prev, currentChatRoomId, responseMessage));
+        setChatRooms((prev) => updateMessageInChatRoom(prev, currentChatRoomId, responseId, responseMessage));
 
         const roomToSaveAfterAI = {
           ...roomToSaveAfterUser,
@@ -77,22 +95,13 @@ export const createSendMessageHandler = (
           console.error('Failed to save chat room to backend:', error);
         }
 
-        try {
-          await saveConversation(
-            currentMessage, // question
-            aiResponse, // answer
-            currentRoom.capturedFrame, // question_image
-            currentRoom.videoCurrentTime, // timestamp
-            videoId // video_id for shared frame storage
-          );
+        if (conversationId) {
           console.log('✅ Conversation saved successfully - now searchable!');
-          
+
           // 대화 저장 성공 시 ConversationHistory 새로고침 트리거
           if (onConversationSaved) {
             onConversationSaved();
           }
-        } catch (error) {
-          console.error('❌ Failed to save conversation to backend:', error);
         }
       } catch (error) {
         const errorMessage = {
@@ -1,4 +1,15 @@
-import api from '../api/client';
+import api, { getAuthHeaders } from '../api/client';
+
+const errorMessageForStatus = (status, detail) => {
+  if (status === 400) {
+    return 'OpenAI API 키가 설정되지 않았습니다. API 키를 설정해주세요.';
+  } else if (status === 401) {
+    return 'OpenAI API 키가 올바르지 않습니다. API 키를 확인해주세요.';
+  } else if (status === 429) {
+    return 'OpenAI API 요청 한도가 초과되었습니다. 잠시 후 다시 시도해주세요.';
+  }
+  return detail || 'API 호출 중 오류가 발생했습니다.';
+};
 
 export const callOpenAI = async (message, videoFile, capturedFrame) => {
   try {
@@ -13,21 +24,80 @@ export const callOpenAI = async (message, videoFile, capturedFrame) => {
     console.error('OpenAI API 호출 오류:', error);
     
     if (error.response) {
-      const errorMsg = error.response.data.detail || 'API 호출 중 오류가 발생했습니다.';
-      if (error.response.status === 400) {
-        return 'OpenAI API 키가 설정되지 않았습니다. API 키를 설정해주세요.';
-      } else if (error.response.status === 401) {
-        return 'OpenAI API 키가 올바르지 않습니다. API 키를 확인해주세요.';
-      } else if (error.response.status === 429) {
-        return 'OpenAI API 요청 한도가 초과되었습니다. 잠시 후 다시 시도해주세요.';
-      }
-      return errorMsg;
+      return errorMessageForStatus(error.response.status, error.response.data.detail);
     }
     
     return '죄송합니다. API 호출 중 오류가 발생했습니다.';
   }
 };
 
+// 응답을 토큰 단위로 받는 스트리밍 호출 (SSE). 토큰이 올 때마다 onToken(지금까지의 응답)을 호출하고,
+// 완료되면 { text, conversationId }를 반환. saveConversation이면 서버가 완료된 응답을 대화로 저장
+export const streamOpenAI = async (
+  { message, videoFile, capturedFrame, videoId = null, timestamp = 0, saveConversation = false },
+  onToken,
+  signal
+) => {
+  let text = '';
+  try {
+    const response = await fetch('/openai/chat/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...getAuthHeaders() },
+      body: JSON.stringify({
+        message,
+        captured_frame: capturedFrame,
+        video_file_name: videoFile ? videoFile.name : null,
+        video_id: videoId,
+        timestamp,
+        save_conversation: saveConversation,
+      }),
+      signal,
+    });
+
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
+      return { text: errorMessageForStatus(response.status, data.detail), conversationId: null };
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // 이벤트는 빈 줄로 구분됨
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = 'message';
+        let data = '';
+        rawEvent.split('\n').forEach((line) => {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        const payload = data ? JSON.parse(data) : {};
+
+        if (event === 'delta') {
+          text += payload.content;
+          onToken(text);
+        } else if (event === 'done') {
+          return { text: payload.message, conversationId: payload.conversation_id || null };
+        } else if (event === 'error') {
+          return { text: text || errorMessageForStatus(500, payload.detail), conversationId: null };
+        }
+      }
+    }
+    return { text, conversationId: null };
+  } catch (error) {
+    console.error('OpenAI 스트리밍 호출 오류:', error);
+    return { text: text || '죄송합니다. API 호출 중 오류가 발생했습니다.', conversationId: null };
+  }
+};
+
 export const captureVideoFrame = (videoRef, videoUrl) => {
   if (!videoRef.current || !videoUrl) {
     console.log('비디오가 없음');